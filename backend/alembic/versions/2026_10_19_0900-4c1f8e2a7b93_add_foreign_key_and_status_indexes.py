@@ -0,0 +1,54 @@
+"""Add foreign key and status indexes
+
+Revision ID: 4c1f8e2a7b93
+Revises: da0789f6dfa2
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1f8e2a7b93'
+down_revision = 'da0789f6dfa2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_athletes_user_id'), 'athletes', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_athletes_coach_id'), 'athletes', ['coach_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_programs_athlete_id'), 'programs', ['athlete_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_programs_created_by'), 'programs', ['created_by'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_program_configs_program_id'), 'program_configs', ['program_id'], unique=False, postgresql_concurrently=True)
+
+        # Partial indexes for the active-program lookups (enum stores the member name)
+        op.create_index('ix_programs_athlete_id_active', 'programs', ['athlete_id'], unique=False,
+                        postgresql_where=sa.text("status = 'ACTIVE'"), postgresql_concurrently=True)
+        op.create_index('ix_programs_created_by_active', 'programs', ['created_by'], unique=False,
+                        postgresql_where=sa.text("status = 'ACTIVE'"), postgresql_concurrently=True)
+
+        # Build the unique index without locking writes, then attach it as the constraint.
+        # It also covers lookups by program_id alone, so no separate program_id index.
+        op.create_index('uq_program_weeks_program_id_week_number', 'program_weeks', ['program_id', 'week_number'],
+                        unique=True, postgresql_concurrently=True)
+
+    op.execute(
+        'ALTER TABLE program_weeks ADD CONSTRAINT uq_program_weeks_program_id_week_number '
+        'UNIQUE USING INDEX uq_program_weeks_program_id_week_number'
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_program_weeks_program_id_week_number', 'program_weeks', type_='unique')
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_programs_created_by_active', table_name='programs', postgresql_concurrently=True)
+        op.drop_index('ix_programs_athlete_id_active', table_name='programs', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_program_configs_program_id'), table_name='program_configs', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_programs_created_by'), table_name='programs', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_programs_athlete_id'), table_name='programs', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_athletes_coach_id'), table_name='athletes', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_athletes_user_id'), table_name='athletes', postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""Cascade program child deletes
+
+Revision ID: 8d2b6f4e1a57
+Revises: 4c1f8e2a7b93
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2b6f4e1a57'
+down_revision = '4c1f8e2a7b93'
+branch_labels = None
+depends_on = None
+
+CHILD_TABLES = ['program_configs', 'program_weeks']
+
+
+def upgrade() -> None:
+    for table in CHILD_TABLES:
+        op.drop_constraint(f'{table}_program_id_fkey', table, type_='foreignkey')
+        op.create_foreign_key(f'{table}_program_id_fkey', table, 'programs', ['program_id'], ['id'],
+                              ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    for table in CHILD_TABLES:
+        op.drop_constraint(f'{table}_program_id_fkey', table, type_='foreignkey')
+        op.create_foreign_key(f'{table}_program_id_fkey', table, 'programs', ['program_id'], ['id'])
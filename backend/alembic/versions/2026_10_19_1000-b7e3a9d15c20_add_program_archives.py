@@ -0,0 +1,34 @@
+"""Add program_archives cold storage table
+
+Revision ID: b7e3a9d15c20
+Revises: 8d2b6f4e1a57
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3a9d15c20'
+down_revision = '8d2b6f4e1a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('program_archives',
+    sa.Column('program_id', sa.UUID(), nullable=False),
+    sa.Column('format_version', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('raw_size', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['program_id'], ['programs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('program_id')
+    )
+    # Payloads are already zlib-compressed; skip TOAST's own compression attempt
+    op.execute('ALTER TABLE program_archives ALTER COLUMN payload SET STORAGE EXTERNAL')
+
+
+def downgrade() -> None:
+    op.drop_table('program_archives')
@@ -0,0 +1,24 @@
+"""Add version to programs
+
+Revision ID: 3f9c0d7e52a1
+Revises: b7e3a9d15c20
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c0d7e52a1'
+down_revision = 'b7e3a9d15c20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('programs', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('programs', 'version')
@@ -0,0 +1,51 @@
+"""Add jobs table for the background job runner
+
+Revision ID: 6a4d2c8e9f13
+Revises: 3f9c0d7e52a1
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '6a4d2c8e9f13'
+down_revision = '3f9c0d7e52a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED', name='jobstatus'), nullable=False),
+    sa.Column('params', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('progress_done', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('progress_total', sa.Integer(), nullable=True),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('max_attempts', sa.Integer(), server_default='3', nullable=False),
+    sa.Column('idempotency_key', sa.String(), nullable=True),
+    sa.Column('created_by', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index(op.f('ix_jobs_created_by'), 'jobs', ['created_by'], unique=False)
+    op.create_index('ix_jobs_unfinished', 'jobs', ['created_at'], unique=False,
+                    postgresql_where=sa.text("status IN ('QUEUED', 'RUNNING')"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_unfinished', table_name='jobs')
+    op.drop_index(op.f('ix_jobs_created_by'), table_name='jobs')
+    op.drop_table('jobs')
+    op.execute('DROP TYPE jobstatus')
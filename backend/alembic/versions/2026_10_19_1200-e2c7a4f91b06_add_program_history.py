@@ -0,0 +1,42 @@
+"""Add program_events and program_snapshots for program history
+
+Revision ID: e2c7a4f91b06
+Revises: 9b5e1d7c3f48
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c7a4f91b06'
+down_revision = '9b5e1d7c3f48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('program_events',
+    sa.Column('program_id', sa.UUID(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=32), nullable=False),
+    sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['program_id'], ['programs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('program_id', 'version')
+    )
+    op.create_table('program_snapshots',
+    sa.Column('program_id', sa.UUID(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('state', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['program_id'], ['programs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('program_id', 'version')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('program_snapshots')
+    op.drop_table('program_events')
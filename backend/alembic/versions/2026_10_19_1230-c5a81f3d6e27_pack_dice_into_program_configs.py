@@ -0,0 +1,211 @@
+"""Pack dice rolls into program_configs.dice and drop program_weeks
+
+Revision ID: c5a81f3d6e27
+Revises: e2c7a4f91b06
+Create Date: 2026-10-19 12:30:00.000000
+
+"""
+import json
+import uuid
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a81f3d6e27'
+down_revision = 'e2c7a4f91b06'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# The codec as of this revision (app.programs.dice and the Battleship tables), frozen here
+# so later changes to the application cannot change what this migration writes or reads
+DICE_VALUES = [1, 2, 4, 6]
+DICE_CODES = {value: code for code, value in enumerate(DICE_VALUES)}
+BITS_PER_DIE = 2
+DICE_PER_LIFT = 2
+LIFTS = {
+    3: ['upper_body_press', 'upper_body_pull', 'squat'],
+    4: ['upper_body_press', 'upper_body_pull', 'hip_hinge', 'squat'],
+    6: ['vert_pull', 'horz_pull', 'vert_press', 'horz_press', 'squat', 'hinge'],
+}
+WEEK_NAMESPACE = uuid.UUID('5b0f3c2e-8d41-4a7b-9e26-71c4d8a0f613')
+# (H, M, L) NL for each roll
+OUTCOME_NL = {
+    (1, 1): (6, 21, 33), (1, 2): (9, 18, 33), (1, 4): (11, 16, 33), (1, 6): (14, 13, 33),
+    (2, 1): (6, 34, 48), (2, 2): (9, 31, 48), (2, 4): (11, 29, 48), (2, 6): (14, 26, 38),
+    (4, 1): (6, 44, 62), (4, 2): (9, 41, 62), (4, 4): (11, 39, 62), (4, 6): (14, 36, 62),
+    (6, 1): (6, 57, 77), (6, 2): (9, 54, 77), (6, 4): (11, 52, 77), (6, 6): (14, 49, 77),
+}
+
+
+def pack_rolls(rolls, lifts):
+    """Week by week, lift by lift, two bits per die, most significant first, zero-padded to a byte."""
+    value = 0
+    weeks = len(rolls[lifts[0]])
+    for week in range(weeks):
+        for lift in lifts:
+            for die in rolls[lift][week]:
+                value = (value << BITS_PER_DIE) | DICE_CODES[die]
+    bits = weeks * len(lifts) * DICE_PER_LIFT * BITS_PER_DIE
+    padding = -bits % 8
+    return (value << padding).to_bytes((bits + padding) // 8, 'big')
+
+
+def unpack_rolls(data, lifts):
+    """{lift: [[r1, r2] per week]}, the inverse of pack_rolls."""
+    week_bits = len(lifts) * DICE_PER_LIFT * BITS_PER_DIE
+    value = int.from_bytes(data, 'big')
+    shift = len(data) * 8
+    rolls = {lift: [] for lift in lifts}
+    for _ in range(len(data) * 8 // week_bits):
+        for lift in lifts:
+            roll = []
+            for _ in range(DICE_PER_LIFT):
+                shift -= BITS_PER_DIE
+                roll.append(DICE_VALUES[(value >> shift) & ((1 << BITS_PER_DIE) - 1)])
+            rolls[lift].append(roll)
+    return rolls
+
+
+def week_nl(dice_rolls):
+    return {lift: dict(zip(('H', 'M', 'L'), OUTCOME_NL[tuple(roll)])) for lift, roll in dice_rolls.items()}
+
+
+def week_id(program_id, week_number):
+    return uuid.uuid5(WEEK_NAMESPACE, f"{program_id}:{week_number}")
+
+
+def _pack_weeks(num_lifts, weeks):
+    """Packed dice for a config's week rows; weeks without per-lift rolls used the deprecated pair for every lift."""
+    lifts = LIFTS[num_lifts]
+    rolls = {lift: [] for lift in lifts}
+    for week in sorted(weeks, key=lambda week: week["week_number"]):
+        legacy = [week["dice_roll_1"] or 1, week["dice_roll_2"] or 1]
+        for lift in lifts:
+            rolls[lift].append((week["dice_rolls"] or {}).get(lift, legacy))
+    return pack_rolls(rolls, lifts)
+
+
+def _week_rows(program_id, num_lifts, dice, created_at):
+    """program_weeks rows (JSON columns as Python values) decoded from packed dice."""
+    lifts = LIFTS[num_lifts]
+    rolls = unpack_rolls(dice, lifts)
+    rows = []
+    for index in range(len(rolls[lifts[0]])):
+        dice_rolls = {lift: rolls[lift][index] for lift in lifts}
+        rows.append({
+            "id": week_id(program_id, index + 1),
+            "program_id": program_id,
+            "week_number": index + 1,
+            "dice_roll_1": dice_rolls[lifts[0]][0],
+            "dice_roll_2": dice_rolls[lifts[0]][1],
+            "dice_rolls": dice_rolls,
+            "weekly_data": week_nl(dice_rolls),
+            "created_at": created_at,
+        })
+    return rows
+
+
+def upgrade() -> None:
+    op.add_column('program_configs', sa.Column('dice', sa.LargeBinary(), nullable=True))
+
+    connection = op.get_bind()
+    last_id = None
+    while True:
+        query = sa.text(
+            "SELECT id, program_id, num_lifts FROM program_configs"
+            + (" WHERE id > :last_id" if last_id else "")
+            + " ORDER BY id LIMIT :limit"
+        )
+        configs = connection.execute(query, {"last_id": last_id, "limit": BATCH_SIZE}).mappings().all()
+        if not configs:
+            break
+        weeks = {}
+        rows = connection.execute(
+            sa.text(
+                "SELECT program_id, week_number, dice_roll_1, dice_roll_2, dice_rolls FROM program_weeks"
+                " WHERE program_id = ANY(:program_ids)"
+            ),
+            {"program_ids": [config["program_id"] for config in configs]},
+        ).mappings()
+        for row in rows:
+            weeks.setdefault(row["program_id"], []).append(row)
+        connection.execute(
+            sa.text("UPDATE program_configs SET dice = :dice WHERE id = :id"),
+            [{"id": config["id"], "dice": _pack_weeks(config["num_lifts"], weeks.get(config["program_id"], []))}
+             for config in configs],
+        )
+        last_id = configs[-1]["id"]
+
+    op.alter_column('program_configs', 'dice', existing_type=sa.LargeBinary(), nullable=False)
+    op.drop_table('program_weeks')
+    # Version 1 archives still hold their week rows and stay readable; new archives store only the config
+
+
+def downgrade() -> None:
+    op.create_table('program_weeks',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('program_id', sa.UUID(), nullable=False),
+    sa.Column('week_number', sa.Integer(), nullable=False),
+    sa.Column('dice_roll_1', sa.Integer(), nullable=True),
+    sa.Column('dice_roll_2', sa.Integer(), nullable=True),
+    sa.Column('dice_rolls', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('weekly_data', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['program_id'], ['programs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('program_id', 'week_number', name='uq_program_weeks_program_id_week_number')
+    )
+
+    connection = op.get_bind()
+    insert = sa.text(
+        "INSERT INTO program_weeks (id, program_id, week_number, dice_roll_1, dice_roll_2, dice_rolls, weekly_data, created_at)"
+        " VALUES (:id, :program_id, :week_number, :dice_roll_1, :dice_roll_2,"
+        " CAST(:dice_rolls AS JSONB), CAST(:weekly_data AS JSONB), :created_at)"
+    )
+    last_id = None
+    while True:
+        query = sa.text(
+            "SELECT id, program_id, num_lifts, dice, created_at FROM program_configs"
+            + (" WHERE id > :last_id" if last_id else "")
+            + " ORDER BY id LIMIT :limit"
+        )
+        configs = connection.execute(query, {"last_id": last_id, "limit": BATCH_SIZE}).mappings().all()
+        if not configs:
+            break
+        weeks = [
+            dict(row, dice_rolls=json.dumps(row["dice_rolls"]), weekly_data=json.dumps(row["weekly_data"]))
+            for config in configs
+            for row in _week_rows(config["program_id"], config["num_lifts"], bytes(config["dice"]), config["created_at"])
+        ]
+        if weeks:
+            connection.execute(insert, weeks)
+        last_id = configs[-1]["id"]
+
+    # Archives written without week rows go back to the version 1 layout
+    archives = connection.execute(
+        sa.text("SELECT program_id, payload FROM program_archives WHERE format_version = 2")
+    ).mappings().all()
+    for archive in archives:
+        data = json.loads(zlib.decompress(archive["payload"]))
+        config = data["config"]
+        weeks = []
+        if config:
+            dice = bytes.fromhex(config.pop("dice"))
+            weeks = _week_rows(uuid.UUID(config["program_id"]), config["num_lifts"], dice, config["created_at"])
+            for week in weeks:
+                week["id"], week["program_id"] = str(week["id"]), str(week["program_id"])
+        raw = json.dumps({"config": config, "weeks": weeks}, separators=(",", ":")).encode()
+        connection.execute(
+            sa.text("UPDATE program_archives SET format_version = 1, payload = :payload, raw_size = :raw_size"
+                    " WHERE program_id = :program_id"),
+            {"program_id": archive["program_id"], "payload": zlib.compress(raw, 9), "raw_size": len(raw)},
+        )
+
+    op.drop_column('program_configs', 'dice')
@@ -0,0 +1,172 @@
+"""Store weekly templates once in program_templates and reference them from program_configs
+
+Revision ID: 7d3e9b2a4c15
+Revises: c5a81f3d6e27
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+import hashlib
+import json
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3e9b2a4c15'
+down_revision = 'c5a81f3d6e27'
+branch_labels = None
+depends_on = None
+
+LEGACY_KEY_PREFIX = 'legacy-'
+
+# The built-in templates (app.programs.templates) as of this revision, frozen here so
+# later changes to them cannot change which rows this migration seeds or matches
+BUILTIN_TEMPLATES = {
+    '3_lifts_3_days': {
+        'name': '3 Lifts - 3 Days/Week',
+        'num_lifts': 3,
+        'sessions_per_week': 3,
+        'sessions': {
+            'A': {'upper_body_press': 'H', 'squat': 'M', 'upper_body_pull': 'L'},
+            'B': {'squat': 'H', 'upper_body_pull': 'M', 'upper_body_press': 'L'},
+            'C': {'upper_body_pull': 'H', 'upper_body_press': 'M', 'squat': 'L'},
+        },
+    },
+    '4_lifts_3_days': {
+        'name': '4 Lifts - 3 Days/Week',
+        'num_lifts': 4,
+        'sessions_per_week': 3,
+        'sessions': {
+            'A': {'upper_body_press': 'H', 'hip_hinge': 'H', 'upper_body_pull': 'M', 'squat': 'M'},
+            'B': {'upper_body_pull': 'H', 'squat': 'H', 'upper_body_press': 'L', 'hip_hinge': 'L'},
+            'C': {'upper_body_press': 'M', 'hip_hinge': 'M', 'upper_body_pull': 'L', 'squat': 'L'},
+        },
+    },
+    '4_lifts_4_days': {
+        'name': '4 Lifts - 4 Days/Week',
+        'num_lifts': 4,
+        'sessions_per_week': 4,
+        'sessions': {
+            'A': {'upper_body_press': 'H', 'upper_body_pull': 'M', 'hip_hinge': 'L'},
+            'B': {'squat': 'H', 'hip_hinge': 'M', 'upper_body_press': 'L'},
+            'C': {'upper_body_pull': 'H', 'upper_body_press': 'M', 'squat': 'L'},
+            'D': {'hip_hinge': 'H', 'squat': 'M', 'upper_body_pull': 'L'},
+        },
+    },
+    '6_lifts_4_days': {
+        'name': '6 Lifts - 4 Days/Week',
+        'num_lifts': 6,
+        'sessions_per_week': 4,
+        'sessions': {
+            'A': {'horz_press': 'H', 'horz_pull': 'H', 'vert_press': 'M', 'vert_pull': 'M', 'hinge': 'L'},
+            'B': {'squat': 'H', 'hinge': 'M', 'horz_press': 'L', 'horz_pull': 'L'},
+            'C': {'vert_press': 'H', 'vert_pull': 'H', 'horz_press': 'M', 'horz_pull': 'M', 'squat': 'L'},
+            'D': {'hinge': 'H', 'squat': 'M', 'vert_press': 'L', 'vert_pull': 'L'},
+        },
+    },
+}
+
+
+def template_key(template):
+    """Key of the built-in template with this content, or None."""
+    return next((key for key, builtin in BUILTIN_TEMPLATES.items() if builtin == template), None)
+
+
+def template_hash(template):
+    """sha256 of the template's canonical JSON (sorted keys, no whitespace)."""
+    return hashlib.sha256(json.dumps(template, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def upgrade() -> None:
+    op.create_table('program_templates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('num_lifts', sa.Integer(), nullable=False),
+    sa.Column('sessions_per_week', sa.Integer(), nullable=False),
+    sa.Column('structure', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('builtin', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('created_by', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('created_by', 'key', 'version', name='uq_program_templates_creator_key_version',
+                        postgresql_nulls_not_distinct=True),
+    sa.UniqueConstraint('created_by', 'key', 'content_hash', name='uq_program_templates_creator_key_content_hash',
+                        postgresql_nulls_not_distinct=True)
+    )
+    op.add_column('program_configs', sa.Column('template_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_program_configs_template_id'), 'program_configs', ['template_id'], unique=False)
+    op.create_foreign_key('program_configs_template_id_fkey', 'program_configs', 'program_templates', ['template_id'], ['id'])
+
+    connection = op.get_bind()
+    insert = sa.text(
+        "INSERT INTO program_templates (key, version, name, num_lifts, sessions_per_week, structure, content_hash, builtin)"
+        " VALUES (:key, :version, :name, :num_lifts, :sessions_per_week, CAST(:structure AS JSONB), :content_hash, :builtin)"
+    )
+
+    def add(template, key, version, builtin):
+        connection.execute(insert, {
+            "key": key,
+            "version": version,
+            "name": template.get("name") or key,
+            "num_lifts": template.get("num_lifts") or 0,
+            "sessions_per_week": template.get("sessions_per_week") or len(template.get("sessions") or {}),
+            "structure": json.dumps(template),
+            "content_hash": template_hash(template),
+            "builtin": builtin,
+        })
+
+    for key, template in BUILTIN_TEMPLATES.items():
+        add(template, key, 1, True)
+    # Every other template in use (e.g. an older copy of a built-in) is stored once under its own legacy key
+    distinct = connection.execute(
+        sa.text("SELECT DISTINCT weekly_template FROM program_configs WHERE weekly_template IS NOT NULL")
+    ).scalars().all()
+    for template in distinct:
+        if template_key(template) is None:
+            add(template, LEGACY_KEY_PREFIX + template_hash(template)[:12], 1, False)
+
+    # A hash join on JSONB equality: one pass over program_configs
+    connection.execute(sa.text(
+        "UPDATE program_configs SET template_id = program_templates.id FROM program_templates"
+        " WHERE program_configs.weekly_template = program_templates.structure"
+    ))
+    op.drop_column('program_configs', 'weekly_template')
+    # Archived configs keep their inline template; it is interned when they are restored
+
+
+def downgrade() -> None:
+    op.add_column('program_configs', sa.Column('weekly_template', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    connection = op.get_bind()
+    connection.execute(sa.text(
+        "UPDATE program_configs SET weekly_template = program_templates.structure FROM program_templates"
+        " WHERE program_configs.template_id = program_templates.id"
+    ))
+
+    # Archives referencing a stored template get it inline again
+    structures = dict(connection.execute(sa.text("SELECT id, structure FROM program_templates")).all())
+    archives = connection.execute(
+        sa.text("SELECT program_id, payload FROM program_archives WHERE format_version = 2")
+    ).mappings().all()
+    for archive in archives:
+        data = json.loads(zlib.decompress(archive["payload"]))
+        config = data["config"]
+        if not config or "template_id" not in config:
+            continue
+        config["weekly_template"] = structures.get(config.pop("template_id"))
+        raw = json.dumps(data, separators=(",", ":")).encode()
+        connection.execute(
+            sa.text("UPDATE program_archives SET payload = :payload, raw_size = :raw_size WHERE program_id = :program_id"),
+            {"program_id": archive["program_id"], "payload": zlib.compress(raw, 9), "raw_size": len(raw)},
+        )
+
+    op.drop_constraint('program_configs_template_id_fkey', 'program_configs', type_='foreignkey')
+    op.drop_index(op.f('ix_program_configs_template_id'), table_name='program_configs')
+    op.drop_column('program_configs', 'template_id')
+    op.drop_table('program_templates')
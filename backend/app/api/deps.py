@@ -0,0 +1,86 @@
+from typing import Optional
+from uuid import UUID
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.db.base import get_db
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.models.user import User
+from app.models.athlete import Athlete
+from app.schemas.user import UserResponse
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+
+# Authenticated principals keyed by token subject (user id)
+principal_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def load_principal(db: Session, user_id: UUID) -> Optional[UserResponse]:
+    """Load a user and their athlete profile in one query."""
+    row = (
+        db.query(User, Athlete.id)
+        .outerjoin(Athlete, Athlete.user_id == User.id)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+
+    user, athlete_id = row
+    return UserResponse(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        role=user.role,
+        athlete_id=athlete_id,
+        created_at=user.created_at
+    )
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> UserResponse:
+    """Dependency returning the authenticated user (with athlete_id) for the bearer token."""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = decode_access_token(token)
+    if payload is None or payload.get("sub") is None:
+        raise credentials_exception
+
+    user_id = payload["sub"]
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        try:
+            principal = load_principal(db, UUID(user_id))
+        except ValueError:
+            raise credentials_exception
+        if principal is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        principal_cache.set(user_id, principal)
+
+    return principal
+
+
+# Any write to a user or their athlete profile drops the cached principal
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    principal_cache.invalidate(str(target.id))
+
+
+@event.listens_for(Athlete, "after_insert")
+@event.listens_for(Athlete, "after_update")
+@event.listens_for(Athlete, "after_delete")
+def _invalidate_athlete(mapper, connection, target):
+    if target.user_id is not None:
+        principal_cache.invalidate(str(target.user_id))
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
-from app.db.base import get_db
+from app.db.base import get_read_db
 
 router = APIRouter()
 
@@ -11,7 +11,7 @@ router = APIRouter()
 async def list_athletes(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """List all athletes (placeholder)."""
     return {"message": "Athletes endpoint - coming soon"}
@@ -20,7 +20,7 @@ async def list_athletes(
 @router.get("/{athlete_id}")
 async def get_athlete(
     athlete_id: UUID,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get athlete details (placeholder)."""
     return {"message": f"Athlete {athlete_id} - coming soon"}
@@ -1,16 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from app.db.base import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.api.deps import get_current_user
+from app.core.security import (
+    create_access_token,
+    hash_password_async,
+    verify_and_update_password_async,
+    PasswordHashTimeout,
+)
 from app.core.config import settings
 from app.models.user import User
 from app.models.athlete import Athlete
 from app.schemas.user import UserCreate, UserResponse, Token
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+
+password_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many authentication requests, please retry shortly",
+    headers={"Retry-After": "1"},
+)
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -24,8 +35,11 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             detail="Email already registered"
         )
     
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    # Create new user (bcrypt runs in the hashing pool, off the event loop)
+    try:
+        hashed_password = await hash_password_async(user_data.password)
+    except PasswordHashTimeout:
+        raise password_busy_exception
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -57,13 +71,24 @@ async def login(
     """Login and get access token."""
     # Find user
     user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+        except PasswordHashTimeout:
+            raise password_busy_exception
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Rehash when the stored hash was made with a different bcrypt cost
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -75,41 +100,6 @@ async def login(
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+async def read_current_user(current_user: UserResponse = Depends(get_current_user)):
     """Get current user info."""
-    from app.core.security import decode_access_token
-    
-    payload = decode_access_token(token)
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user_id = payload.get("sub")
-    user = db.query(User).filter(User.id == user_id).first()
-    
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
-    
-    # Get the athlete_id from the athlete_profile relationship
-    athlete = db.query(Athlete).filter(Athlete.user_id == user.id).first()
-    
-    # Create response with athlete_id
-    user_response = UserResponse(
-        id=user.id,
-        email=user.email,
-        full_name=user.full_name,
-        role=user.role,
-        athlete_id=athlete.id if athlete else None,
-        created_at=user.created_at
-    )
-    
-    return user_response
+    return current_user
@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from uuid import UUID
+from app.db.base import get_db
+from app.schemas.job import JobCreate, JobResponse
+from app.services.job_service import JobService
+from app.models.job import JobStatus
+from app.jobs.handlers import export_path
+from app.jobs.runner import job_runner
+from app.api.responses import ZeroCopyFileResponse
+
+router = APIRouter()
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    job_data: JobCreate,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    Queue a background job (create_programs, export_programs or archive_old_programs).
+
+    Resubmitting with the same idempotency_key returns the original job with 200.
+    """
+    service = JobService(db)
+    try:
+        job, created = service.create_job(job_data)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    
+    if created:
+        job_runner.submit(job.id)
+    else:
+        response.status_code = status.HTTP_200_OK
+    return job
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """Get a job's status, progress and (once finished) result or error."""
+    job = JobService(db).get_job(job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job
+
+
+@router.get("/{job_id}/download")
+async def download_job_result(
+    job_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """Download the zip archive produced by a finished export_programs job."""
+    job = JobService(db).get_job(job_id)
+    
+    if not job or job.kind != "export_programs":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export job not found"
+        )
+    
+    path = export_path(job.id)
+    if job.status != JobStatus.SUCCEEDED or not path.exists():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Export is not ready (job is {job.status.value})"
+        )
+    
+    return ZeroCopyFileResponse(path, media_type="application/zip", filename=job.result["filename"])
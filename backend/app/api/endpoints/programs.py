@@ -1,45 +1,341 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, status
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 from pydantic import BaseModel
-from app.db.base import get_db
-from app.schemas.program import ProgramCreate, ProgramResponse
-from app.services.program_service import ProgramService
-from app.programs.templates import get_available_templates
+from app.db.base import SessionLocal, get_db, get_read_db
+from app.schemas.program import (
+    PROGRAM_PARTS,
+    ProgramCreate,
+    ProgramResponse,
+    ProgramSummary,
+    ProgramWeekView,
+    ProgramSessionView,
+    ProgramEventResponse,
+    ProgramStateResponse,
+    ProgramConstraints,
+    ProgramTemplateCreate,
+    ProgramTemplateResponse,
+    ProgramBulkRequest,
+    ProgramBulkResult,
+)
+from app.services.program_service import ProgramService, program_topic
+from app.services.history_service import HistoryService, state_weeks
+from app.services.template_service import TemplateNotFound, TemplateService
+from app.exports.common import WEEKS, export_filename, session_lifts, session_names
+from app.exports.render import ExportFormat, ExportView, MEDIA_TYPES, render_program
+from app.exports import pdf_cache
+from app.exports.zip_stream import stream_zip
+from app.api.idempotency import idempotent
+from app.api.responses import ZeroCopyFileResponse
+from app.core.cache import TTLCache
+from app.core.compression import PrecompressedBody
+from app.core.config import settings
+from app.core.events import TooManySubscribers, event_bus, sse_stream
+from app.core.singleflight import SingleFlight
 
 router = APIRouter()
 
+# Coalesces concurrent reads of the same program version (see get_program)
+program_reads = SingleFlight()
+# Serialized bodies by (program_id, version, parts); a new version is a new key, so nothing goes stale
+program_bodies = TTLCache(settings.PROGRAM_BODY_CACHE_SIZE, settings.PROGRAM_BODY_CACHE_TTL_SECONDS)
+
 
 @router.post("", response_model=ProgramResponse, status_code=status.HTTP_201_CREATED)
 async def create_program(
     program_data: ProgramCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Create a new program."""
-    service = ProgramService(db)
-    program = service.create_battleship_program(program_data)
-    return program
+    """Create a new program. Retries sending the same Idempotency-Key get the first response back."""
+    def create(db: Session):
+        service = ProgramService(db)
+        try:
+            program = service.create_battleship_program(program_data)
+        except TemplateNotFound as e:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=str(e)
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e)
+            )
+        return service.to_response(program)
+    
+    return await idempotent(request, db, idempotency_key, create, status_code=status.HTTP_201_CREATED)
+
+
+def parse_include(include: Optional[str]) -> Tuple[str, ...]:
+    """Parts named in an `include` query parameter (all of them when absent), in canonical order."""
+    if include is None:
+        return PROGRAM_PARTS
+    requested = {part.strip() for part in include.split(",") if part.strip()}
+    unknown = requested.difference(PROGRAM_PARTS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown include: {', '.join(sorted(unknown))} (expected any of: {', '.join(PROGRAM_PARTS)})"
+        )
+    return tuple(part for part in PROGRAM_PARTS if part in requested)
 
 
-@router.get("", response_model=List[ProgramResponse])
+@router.get("", response_model=List[ProgramSummary])
 async def list_programs(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """List all programs."""
+    """List programs as summaries (no config or weeks; fetch a program for those)."""
     service = ProgramService(db)
-    programs = service.list_programs(skip=skip, limit=limit)
-    return programs
+    return service.list_program_summaries(skip=skip, limit=limit)
+
+
+@router.get("/templates", response_model=List[ProgramTemplateResponse])
+async def get_templates(created_by: Optional[UUID] = None, db: Session = Depends(get_read_db)):
+    """
+    Get the built-in templates and, given created_by, that user's custom ones
+    (declared before /{program_id} so it is not shadowed).
+    """
+    return TemplateService(db).list_templates(created_by)
+
+
+@router.post("/templates", response_model=ProgramTemplateResponse, status_code=status.HTTP_201_CREATED)
+async def create_template(template_data: ProgramTemplateCreate, db: Session = Depends(get_db)):
+    """
+    Store a custom template; its creator's programs use it by passing its id as
+    template_id. New content under one of the creator's keys becomes that key's
+    next version; other users' keys are separate.
+    """
+    template = {
+        "name": template_data.name,
+        "num_lifts": template_data.num_lifts,
+        "sessions_per_week": len(template_data.sessions),
+        "sessions": template_data.sessions,
+    }
+    try:
+        return TemplateService(db).create_custom(template, template_data.key, created_by=template_data.created_by)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
 
 
 @router.get("/{program_id}", response_model=ProgramResponse)
 async def get_program(
+    program_id: UUID,
+    include: Optional[str] = Query(
+        None,
+        description="Comma-separated parts to load: config, weeks (default: both; empty for the program row only)"
+    ),
+    accept_encoding: Optional[str] = Header(None, include_in_schema=False),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get a specific program by ID, optionally without its config or weeks.
+
+    Serialized bodies are cached per (program_id, version, include) with their
+    gzip variant, and concurrent misses for the same key share one load.
+    """
+    parts = parse_include(include)
+    service = ProgramService(db)
+    version = service.get_program_version(program_id)
+    key = (program_id, version, parts)
+    
+    def load():
+        # The flight outlives the request that started it, so it reads through a
+        # session of its own (on the same engine) rather than the request's
+        load_db = SessionLocal(bind=db.get_bind())
+        try:
+            loader = ProgramService(load_db)
+            program = loader.get_program(program_id, include=parts)
+            if not program:
+                return None
+            excluded = set(PROGRAM_PARTS).difference(parts)
+            cached = PrecompressedBody(loader.to_response(program, include=parts).model_dump_json(exclude=excluded).encode())
+        finally:
+            load_db.close()
+        program_bodies.set(key, cached)
+        return cached
+    
+    cached = None
+    if version is not None:
+        cached = program_bodies.get(key) or await program_reads.do(key, lambda: run_in_threadpool(load))
+    
+    if cached is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Program not found"
+        )
+    
+    return cached.response(accept_encoding)
+
+
+def _get_week_or_404(service: ProgramService, program_id: UUID, week_number: int):
+    program = service.get_week(program_id, week_number)
+    if program is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Program week not found"
+        )
+    return program
+
+
+@router.get("/{program_id}/weeks/{week_number}", response_model=ProgramWeekView)
+async def get_program_week(
+    program_id: UUID,
+    week_number: int = Path(..., ge=1, le=WEEKS),
+    db: Session = Depends(get_read_db)
+):
+    """One week of a program with its sessions laid out (reps, loads, rep schemes)."""
+    program = _get_week_or_404(ProgramService(db), program_id, week_number)
+    week = program["week"]
+    return {
+        "program_id": program_id,
+        "version": program["version"],
+        "week_number": week_number,
+        "dice_rolls": week["dice_rolls"],
+        "sessions": {name: session_lifts(program, week, name) for name in session_names(program)},
+    }
+
+
+@router.get("/{program_id}/weeks/{week_number}/sessions/{session}", response_model=ProgramSessionView)
+async def get_program_session(
+    program_id: UUID,
+    session: str,
+    week_number: int = Path(..., ge=1, le=WEEKS),
+    db: Session = Depends(get_read_db)
+):
+    """One session of one week of a program."""
+    program = _get_week_or_404(ProgramService(db), program_id, week_number)
+    if session not in session_names(program):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    return {
+        "program_id": program_id,
+        "version": program["version"],
+        "week_number": week_number,
+        "session": session,
+        "lifts": session_lifts(program, program["week"], session),
+    }
+
+
+@router.get("/{program_id}/events")
+async def program_events(
+    program_id: UUID,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Live updates for a program as server-sent events: `ready` (current
+    version), then `week_rerolled`, `program_updated` and `program_deleted`
+    deltas. After a `resync` event the client should re-fetch the program.
+    """
+    version = ProgramService(db).get_program_version(program_id)
+    # Hand the connection back now: the session would otherwise stay open as long as the stream
+    db.close()
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Program not found"
+        )
+    
+    try:
+        subscription = event_bus.subscribe(program_topic(program_id))
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live connections, please retry shortly",
+            headers={"Retry-After": "10"}
+        )
+    
+    return StreamingResponse(
+        sse_stream(subscription, {"program_id": program_id, "version": version}),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also unsubscribes when the client leaves before the stream starts
+        background=BackgroundTask(subscription.close)
+    )
+
+
+@router.get("/{program_id}/history", response_model=List[ProgramEventResponse])
+async def get_program_history(
+    program_id: UUID,
+    db: Session = Depends(get_read_db)
+):
+    """A program's change log, oldest first."""
+    service = ProgramService(db)
+    if service.get_program_version(program_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Program not found"
+        )
+    return HistoryService(db).list_events(program_id)
+
+
+@router.get("/{program_id}/history/{version}", response_model=ProgramStateResponse)
+async def get_program_at_version(
+    program_id: UUID,
+    version: int = Path(..., ge=1),
+    db: Session = Depends(get_read_db)
+):
+    """A program's name, status and weeks as of a past version, rebuilt from its history."""
+    current = ProgramService(db).get_program_version(program_id)
+    state = HistoryService(db).state_at(program_id, version) if current is not None and version <= current else None
+    if state is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No history for this program version"
+        )
+    return {
+        "program_id": program_id,
+        "version": version,
+        "name": state["name"],
+        "status": state["status"],
+        "weeks": state_weeks(state),
+    }
+
+
+@router.post("/{program_id}/undo", response_model=ProgramResponse)
+async def undo_program_change(
     program_id: UUID,
     db: Session = Depends(get_db)
 ):
-    """Get a specific program by ID."""
+    """Undo the program's most recent reroll, rename or status change (repeat to go further back)."""
+    service = ProgramService(db)
+    try:
+        program = service.undo_last_change(program_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    
+    if not program:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Program not found"
+        )
+    
+    return service.to_response(program)
+
+
+@router.get("/{program_id}/export")
+async def export_program(
+    program_id: UUID,
+    format: ExportFormat = ExportFormat.MARKDOWN,
+    view: ExportView = ExportView.COACH,
+    db: Session = Depends(get_read_db)
+):
+    """Export a program as Markdown, CSV or PDF (coach or athlete view), streamed in chunks."""
     service = ProgramService(db)
     program = service.get_program(program_id)
     
@@ -49,7 +345,67 @@ async def get_program(
             detail="Program not found"
         )
     
-    return program
+    program_data = service.to_response(program).model_dump(mode="json")
+    filename = export_filename(program_data, view.value, format.value)
+    
+    if format == ExportFormat.PDF:
+        # Rendered in the process pool and cached on disk per (program, version, view)
+        try:
+            path = await pdf_cache.get_pdf(program_data, view.value)
+        except pdf_cache.RenderQueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many PDF exports in progress, please retry shortly",
+                headers={"Retry-After": "5"}
+            )
+        return ZeroCopyFileResponse(path, media_type=MEDIA_TYPES[format], filename=filename)
+    
+    return StreamingResponse(
+        render_program(program_data, format, view),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/bulk-export")
+async def bulk_export_programs(
+    selection: ProgramBulkRequest,
+    format: ExportFormat = ExportFormat.MARKDOWN,
+    view: ExportView = ExportView.COACH,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Export many programs (e.g. a coach's whole roster via coach_id) as one zip archive.
+
+    The archive is streamed as programs are rendered, so the download starts immediately.
+    """
+    service = ProgramService(db)
+    try:
+        programs = service.iter_programs(**selection.model_dump(exclude_none=True))
+        # Loading runs batched queries; keep them (here and while streaming) off the event loop
+        first = await run_in_threadpool(next, programs, None)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    
+    if first is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No programs match the selection"
+        )
+    
+    def serialized():
+        yield first.model_dump(mode="json")
+        for program in programs:
+            yield program.model_dump(mode="json")
+    
+    return StreamingResponse(
+        stream_zip(iterate_in_threadpool(serialized()), format, view),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="programs_{view.value}_{format.value}.zip"'}
+    )
 
 
 @router.delete("/{program_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -70,10 +426,38 @@ async def delete_program(
     return None
 
 
-@router.get("/templates")
-async def get_templates():
-    """Get available program templates."""
-    return get_available_templates()
+@router.post("/bulk-delete", response_model=ProgramBulkResult)
+async def bulk_delete_programs(
+    selection: ProgramBulkRequest,
+    db: Session = Depends(get_db)
+):
+    """Delete many programs by id and/or filter (e.g. completed programs created before a date)."""
+    service = ProgramService(db)
+    try:
+        count = service.delete_programs(**selection.model_dump(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    return {"count": count}
+
+
+@router.post("/bulk-archive", response_model=ProgramBulkResult)
+async def bulk_archive_programs(
+    selection: ProgramBulkRequest,
+    db: Session = Depends(get_db)
+):
+    """Archive many programs by id and/or filter."""
+    service = ProgramService(db)
+    try:
+        count = service.archive_programs(**selection.model_dump(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    return {"count": count}
 
 
 class ProgramUpdateRequest(BaseModel):
@@ -97,24 +481,46 @@ async def update_program(
             detail="Program not found"
         )
     
-    return program
+    return service.to_response(program)
 
 
 @router.post("/{program_id}/reroll-week/{week_number}", response_model=ProgramResponse)
 async def reroll_week(
     program_id: UUID,
     week_number: int,
+    request: Request,
     lift: Optional[str] = None,
+    constraints: Optional[ProgramConstraints] = None,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Reroll the dice for a specific week (all lifts or a specific lift) and regenerate that week's data."""
-    service = ProgramService(db)
-    program = service.reroll_week(program_id, week_number, lift)
-    
-    if not program:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Program not found"
-        )
+    """
+    Reroll the dice for a specific week (all lifts or a specific lift) and regenerate that week's data.
+
+    An optional constraints body limits the reroll to rolls that satisfy it.
+    Retries sending the same Idempotency-Key get the first response back
+    instead of a second reroll.
+    """
+    def reroll(db: Session):
+        service = ProgramService(db)
+        try:
+            program = service.reroll_week(
+                program_id,
+                week_number,
+                lift,
+                constraints=constraints.model_dump(exclude_none=True) if constraints else None
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e)
+            )
+        
+        if not program:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Program not found"
+            )
+        return service.to_response(program)
     
-    return program
+    return await idempotent(request, db, idempotency_key, reroll)
@@ -0,0 +1,127 @@
+"""
+Idempotency-Key support for writes that clients retry.
+
+The first request with a key claims it in the idempotency_keys table (shared
+by every worker), runs, and stores its serialized response for
+IDEMPOTENCY_TTL_SECONDS. A retry with the same key gets that response back
+(with an Idempotent-Replayed header) without running the handler or touching
+any other table. A retry that arrives while the first request is still
+running gets 409, and reusing a key for a different request gets 422. If the
+handler fails, the claim is released so the client can retry.
+
+Keys are per principal (the bearer token's user, else the client address), so
+two clients that happen to pick the same key never see each other's responses.
+
+The handler's writes and the stored response commit in one transaction: the
+handler gets a session joined to an outer transaction, where its own commits
+only release savepoints. That transaction starts by locking the claim row, so
+a retry that finds the claim older than IDEMPOTENCY_LOCK_SECONDS waits for a
+slow request to finish (and then replays its response) rather than running
+the write a second time. A worker that dies leaves nothing behind but the
+claim, which the next retry takes over.
+"""
+import hashlib
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.security import decode_access_token
+from app.services.idempotency_service import IdempotencyService
+
+MAX_KEY_LENGTH = 255
+
+
+def request_principal(request: Request) -> str:
+    """Who sent the request: the user of a valid bearer token, else the client address."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer":
+        payload = decode_access_token(token)
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    return f"client:{request.client.host if request.client else ''}"
+
+
+def scoped_key(principal: str, key: str) -> str:
+    """The stored key: the client's key within its principal (a fixed-length digest)."""
+    return hashlib.sha256(f"{principal}\0{key}".encode()).hexdigest()
+
+
+async def request_fingerprint(request: Request) -> str:
+    digest = hashlib.sha256()
+    for part in (request.method, request.url.path, request.url.query):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(await request.body())
+    return digest.hexdigest()
+
+
+async def idempotent(
+    request: Request,
+    db: Session,
+    key: Optional[str],
+    handler: Callable[[Session], BaseModel],
+    status_code: int = status.HTTP_200_OK
+) -> Response:
+    """
+    Run `handler` (which gets the session to write with and returns the
+    response model) at most once per idempotency key.
+    """
+    if key is None:
+        return Response(handler(db).model_dump_json(), status_code=status_code, media_type="application/json")
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"
+        )
+    
+    key = scoped_key(request_principal(request), key)
+    fingerprint = await request_fingerprint(request)
+    service = IdempotencyService(db)
+    record, claimed = service.claim(key, fingerprint)
+    
+    if not claimed:
+        if record.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request"
+            )
+        if record.status_code is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "1"}
+            )
+        return Response(
+            record.response_body,
+            status_code=record.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"}
+        )
+    
+    claimed_at = record.created_at
+    db.commit()  # End the read; the handler runs on a connection of its own
+    
+    with db.get_bind().connect() as connection:
+        transaction = connection.begin()
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            claim = IdempotencyService(session)
+            if not claim.lock(key, claimed_at):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A retry with this Idempotency-Key took over the request",
+                    headers={"Retry-After": "1"}
+                )
+            body = handler(session).model_dump_json().encode()
+            claim.complete(key, claimed_at, status_code, body)
+            transaction.commit()
+        except BaseException:
+            transaction.rollback()
+            service.release(key, claimed_at)
+            raise
+        finally:
+            session.close()
+    return Response(body, status_code=status_code, media_type="application/json")
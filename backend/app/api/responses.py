@@ -0,0 +1,33 @@
+import os
+
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """
+    FileResponse that hands the open file to the server when it supports the
+    ASGI ``http.response.zerocopysend`` extension (sendfile), and otherwise
+    falls back to Starlette's chunked reads.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if "http.response.zerocopysend" not in scope.get("extensions", {}) or self.send_header_only:
+            await super().__call__(scope, receive, send)
+            return
+
+        with open(self.path, "rb") as file:
+            self.set_stat_headers(os.fstat(file.fileno()))
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            })
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": file.fileno(),
+                "more_body": False,
+            })
+
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,172 @@
+"""
+Negotiated gzip compression for API responses.
+
+CompressionMiddleware gzips single-message JSON and text bodies of at least
+COMPRESSION_MIN_BYTES when the client sends `Accept-Encoding: gzip`.
+Responses that already carry a Content-Encoding pass through untouched, which
+is how cached bodies with a precompressed variant (PrecompressedBody) skip a
+second compression. Streaming responses and binary formats are not touched.
+"""
+import gzip
+import time
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+class CompressionMetrics:
+    """Compression counters (only mutated on the event loop thread, or under the GIL for single increments)."""
+
+    def __init__(self):
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compressions = 0
+        self.compress_seconds = 0.0
+        self.precompressed_hits = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "responses": self.responses,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "ratio": self.bytes_out / self.bytes_in if self.bytes_in else 0.0,
+            "compressions": self.compressions,
+            "compress_seconds": self.compress_seconds,
+            "avg_compress_seconds": self.compress_seconds / self.compressions if self.compressions else 0.0,
+            "precompressed_hits": self.precompressed_hits,
+        }
+
+
+compression_metrics = CompressionMetrics()
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip (explicitly or through *) with a non-zero q."""
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def gzip_body(body: bytes) -> bytes:
+    """Compress a body at COMPRESSION_LEVEL, timing it into the compression metrics."""
+    start = time.perf_counter()
+    # mtime=0 keeps the output identical for identical bodies
+    compressed = gzip.compress(body, compresslevel=settings.COMPRESSION_LEVEL, mtime=0)
+    compression_metrics.compressions += 1
+    compression_metrics.compress_seconds += time.perf_counter() - start
+    return compressed
+
+
+def _record(size_in: int, size_out: int) -> None:
+    compression_metrics.responses += 1
+    compression_metrics.bytes_in += size_in
+    compression_metrics.bytes_out += size_out
+
+
+class PrecompressedBody:
+    """A serialized response body kept with its gzip variant, which is compressed at most once."""
+
+    __slots__ = ("body", "media_type", "_gzipped")
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self._gzipped: Optional[bytes] = None
+
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip_body(self.body)
+        else:
+            compression_metrics.precompressed_hits += 1
+        return self._gzipped
+
+    def response(self, accept_encoding: Optional[str]) -> Response:
+        """The body as a response, gzipped if the client accepts it and it is worth compressing."""
+        headers = {"Vary": "Accept-Encoding"}
+        if (settings.COMPRESSION_LEVEL and len(self.body) >= settings.COMPRESSION_MIN_BYTES
+                and accepts_gzip(accept_encoding)):
+            compressed = self.gzipped()
+            _record(len(self.body), len(compressed))
+            headers["Content-Encoding"] = "gzip"
+            return Response(compressed, media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware gzipping eligible response bodies for clients that accept it."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == b"accept-encoding"), None
+        )
+        if not accepts_gzip(accept_encoding):
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held back until the first body message shows whether to compress
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+            if message["type"] != "http.response.body":
+                # Not a body we can compress (e.g. http.response.zerocopysend): pass the response through as-is
+                start, start_message = start_message, None
+                await send(start)
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            content_type = headers.get("content-type", "")
+            if (message.get("more_body") or "content-encoding" in headers or len(body) < self.minimum_size
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = gzip_body(body)
+            if len(compressed) >= len(body):
+                await send(start)
+                await send(message)
+                return
+            _record(len(body), len(compressed))
+            headers["Content-Encoding"] = "gzip"
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,252 @@
+"""
+In-process pub/sub for live updates (served as server-sent events).
+
+Publishers call `event_bus.publish(topic, event)` from anywhere in the
+process, including threads; events go through a broker and are fanned out on
+the event loop to the topic's subscribers. Each subscriber has a small bounded
+queue. A subscriber that falls behind is not allowed to slow down the others:
+its queue is cleared and it gets a single overflow marker, after which the
+client is expected to re-fetch and reconnect.
+
+The default LocalBroker only reaches subscribers in this worker. With several
+workers, EVENT_BROKER=postgres relays every event through Postgres
+LISTEN/NOTIFY so each worker delivers it to its own subscribers. Anything
+with the same start/publish/stop methods can stand in for either broker
+(tests use LocalBroker).
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW = object()
+NOTIFY_CHANNEL = "app_events"
+
+Deliver = Callable[[str, str], None]
+
+
+def sse_frame(event_type: str, data: Dict[str, Any]) -> str:
+    """One server-sent event (compact JSON on a single data line)."""
+    return f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+class TooManySubscribers(Exception):
+    """Raised when a subscription would exceed the process-wide or per-topic limit."""
+
+
+class EventMetrics:
+    """Pub/sub counters (only mutated on the event loop thread)."""
+
+    def __init__(self):
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.rejected = 0
+
+    def snapshot(self, subscribers: int, topics: int) -> dict:
+        return {
+            "subscribers": subscribers,
+            "topics": topics,
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "rejected": self.rejected,
+        }
+
+
+class LocalBroker:
+    """Delivers events to subscribers in this process only."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+
+    def publish(self, topic: str, data: str) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            # Thread-safe, and never runs subscribers inside the publisher's call
+            self._loop.call_soon_threadsafe(self._deliver, topic, data)
+
+    async def stop(self) -> None:
+        self._loop = None
+
+
+class PostgresBroker:
+    """Relays events between workers with LISTEN/NOTIFY on one channel (payloads must stay under 8000 bytes)."""
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._listener = None
+        self._notifier = None
+        self._deliver: Optional[Deliver] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        import psycopg2
+
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+        self._listener = psycopg2.connect(self.dsn)
+        self._listener.autocommit = True
+        with self._listener.cursor() as cursor:
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        self._loop.add_reader(self._listener.fileno(), self._on_readable)
+        self._notifier = psycopg2.connect(self.dsn)
+        self._notifier.autocommit = True
+
+    def _on_readable(self) -> None:
+        self._listener.poll()
+        while self._listener.notifies:
+            notify = self._listener.notifies.pop(0)
+            topic, _, data = notify.payload.partition("\n")
+            self._deliver(topic, data)
+
+    def publish(self, topic: str, data: str) -> None:
+        if self._notifier is None:
+            return
+        try:
+            with self._notifier.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, f"{topic}\n{data}"))
+        except Exception:
+            # A lost live update only costs a client its next refresh
+            logger.exception("Could not publish event on %s", topic)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._loop.remove_reader(self._listener.fileno())
+            self._listener.close()
+            self._notifier.close()
+            self._listener = self._notifier = None
+
+
+class Subscription:
+    """One subscriber's bounded queue of SSE frames."""
+
+    def __init__(self, bus: "EventBus", topic: str, maxsize: int):
+        self.bus = bus
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def offer(self, data: str) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.bus.metrics.overflows += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+            return False
+
+    async def get(self, timeout: float) -> Any:
+        """Next SSE frame, OVERFLOW, or None if nothing arrived within `timeout`."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self):
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+        self.broker = None
+        self.metrics = EventMetrics()
+
+    async def start(self, broker=None) -> None:
+        self.broker = broker or LocalBroker()
+        await self.broker.start(self._deliver)
+
+    async def stop(self) -> None:
+        if self.broker is not None:
+            await self.broker.stop()
+            self.broker = None
+
+    def publish(self, topic: str, event: Dict[str, Any]) -> None:
+        """
+        Publish an event (a JSON-serializable dict whose "type" names it); a
+        no-op before start(). It is encoded as an SSE frame once, here, rather
+        than once per subscriber.
+        """
+        if self.broker is not None:
+            self.broker.publish(topic, sse_frame(event.get("type", "message"), event))
+
+    def _deliver(self, topic: str, data: str) -> None:
+        self.metrics.published += 1
+        for subscription in self._topics.get(topic, ()):
+            if subscription.offer(data):
+                self.metrics.delivered += 1
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscribers = self._topics.get(topic, set())
+        if self._count >= settings.SSE_MAX_CONNECTIONS or len(subscribers) >= settings.SSE_MAX_CONNECTIONS_PER_TOPIC:
+            self.metrics.rejected += 1
+            raise TooManySubscribers(topic)
+        subscription = Subscription(self, topic, settings.SSE_QUEUE_SIZE)
+        self._topics.setdefault(topic, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._topics.get(subscription.topic)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        self._count -= 1
+        if not subscribers:
+            del self._topics[subscription.topic]
+
+    def snapshot(self) -> dict:
+        return self.metrics.snapshot(self._count, len(self._topics))
+
+
+event_bus = EventBus()
+
+
+async def sse_stream(subscription: Subscription, ready: Dict[str, Any]) -> AsyncIterator[str]:
+    """
+    Server-sent events for a subscription: a `ready` event, then every
+    published event, with a comment line as heartbeat whenever the stream is
+    idle. The stream ends after an
+    overflow (with a `resync` event) or after SSE_MAX_STREAM_SECONDS, and the
+    client reconnects.
+    """
+    deadline = time.monotonic() + settings.SSE_MAX_STREAM_SECONDS
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n" + sse_frame("ready", ready)
+        while time.monotonic() < deadline:
+            data = await subscription.get(timeout=settings.SSE_HEARTBEAT_SECONDS)
+            if data is None:
+                yield ": ping\n\n"
+            elif data is OVERFLOW:
+                yield sse_frame("resync", {"reason": "overflow"})
+                return
+            else:
+                yield data
+    finally:
+        subscription.close()
+
+
+def create_broker():
+    """Broker selected by EVENT_BROKER ("local" or "postgres")."""
+    if settings.EVENT_BROKER == "postgres":
+        from sqlalchemy.engine import make_url
+
+        url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+        return PostgresBroker(url.render_as_string(hide_password=False))
+    return LocalBroker()
@@ -0,0 +1,78 @@
+"""
+Startup-time benchmark: what importing and building the app costs.
+
+Runs `python -X importtime` in a fresh interpreter that imports app.main and
+calls create_app(), then prints the slowest top-level imports and exits with
+status 1 when the total exceeds the budget, so CI can enforce it:
+
+    python -m app.core.importtime --budget-ms 1500
+
+tests/test_importtime.py checks that building the app stays lazy.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+from app.core.config import settings
+
+PROBE = (
+    "import time; start = time.perf_counter(); "
+    "import app.main; app.main.create_app(); "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, cumulative_us, depth) for each `import time:` line."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "| imported package" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((name.strip(), int(cumulative_us), depth))
+    return entries
+
+
+def measure() -> Tuple[float, float, List[Tuple[str, int]]]:
+    """Return (wall_ms, import_ms, top-level imports as (module, cumulative_us))."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=backend_dir, capture_output=True, text=True, check=True
+    )
+    top_level = [(name, cumulative) for name, cumulative, depth in parse_importtime(result.stderr) if depth == 0]
+    wall_ms = float(result.stdout.strip().splitlines()[-1])
+    import_ms = sum(cumulative for _name, cumulative in top_level) / 1000
+    return wall_ms, import_ms, top_level
+
+
+def best_of(runs: int) -> Tuple[float, float, List[Tuple[str, int]]]:
+    """measure() repeated `runs` times, keeping the fastest (the first run also warms the disk cache)."""
+    return min((measure() for _ in range(max(1, runs))), key=lambda run: run[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import/startup time against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=settings.STARTUP_BUDGET_MS,
+                        help="Fail when importing and building the app takes longer than this")
+    parser.add_argument("--top", type=int, default=15, help="How many top-level imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="Best of N runs (the first run warms the disk cache)")
+    args = parser.parse_args()
+
+    wall_ms, import_ms, top_level = best_of(args.runs)
+
+    print(f"{'cumulative ms':>14}  module")
+    for name, cumulative in sorted(top_level, key=lambda entry: entry[1], reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:14.1f}  {name}")
+    print(f"\nimports: {import_ms:.1f} ms, import + create_app(): {wall_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    if wall_ms > args.budget_ms:
+        print("Startup budget exceeded", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Request and SQL metrics published in the Prometheus text format.
+
+Route metrics are only touched by MetricsMiddleware, which runs on the event
+loop thread, so plain dicts and ints are enough; no locks on the hot path.
+SQL statements are counted into the current request's RequestStats (found
+through a ContextVar, which sync endpoints inherit in the thread pool) and
+folded into the route's histograms when the response finishes.
+"""
+import bisect
+import logging
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "unmatched"
+
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+
+class Histogram:
+    """Cumulative-bucket histogram for one label set."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class RequestStats:
+    """SQL work done on behalf of one request (statements are only kept while profiling)."""
+
+    __slots__ = ("queries", "sql_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements: Optional[List[Dict[str, object]]] = None
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.in_progress: Dict[Tuple[str, str], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.queries: Dict[Tuple[str, str], Histogram] = {}
+        self.sql_seconds: Dict[Tuple[str, str], Histogram] = {}
+        self.collectors: List[Callable[[], Iterable[str]]] = []
+
+    def record(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route)
+        self.requests[(method, route, status_code)] = self.requests.get((method, route, status_code), 0) + 1
+        if key not in self.latency:
+            self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+            self.sql_seconds[key] = Histogram(LATENCY_BUCKETS)
+        self.latency[key].observe(seconds)
+        self.queries[key].observe(stats.queries)
+        self.sql_seconds[key].observe(stats.sql_seconds)
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """Register a callable yielding extra exposition lines (including its # TYPE lines)."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_total Requests by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status_code), count in sorted(self.requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status_code}"}} {count}')
+
+        lines += [
+            "# HELP http_requests_in_progress Requests currently being served.",
+            "# TYPE http_requests_in_progress gauge",
+        ]
+        for (method, route), count in sorted(self.in_progress.items()):
+            lines.append(f'http_requests_in_progress{{method="{method}",route="{route}"}} {count}')
+
+        for name, help_text, histograms in (
+            ("http_request_duration_seconds", "Time to complete the response, streaming included.", self.latency),
+            ("http_request_db_queries", "SQL statements executed per request.", self.queries),
+            ("http_request_db_seconds", "Time spent in SQL per request.", self.sql_seconds),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (method, route), histogram in sorted(histograms.items()):
+                lines.extend(histogram.lines(name, f'method="{method}",route="{route}"'))
+
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+def gauges(prefix: str, values: Dict[str, float]) -> List[str]:
+    """Exposition lines for a flat dict of numbers (e.g. a metrics snapshot), one gauge per key."""
+    lines = []
+    for key, value in values.items():
+        lines += [f"# TYPE {prefix}_{key} gauge", f"{prefix}_{key} {value}"]
+    return lines
+
+
+def capture_statements() -> Optional[List[Dict[str, object]]]:
+    """Start keeping every SQL statement of the current request; returns the list they go into."""
+    stats = _request_stats.get()
+    if stats is None:
+        return None
+    stats.statements = []
+    return stats.statements
+
+
+def instrument_engine(engine, slow_query_seconds: Optional[float] = None) -> None:
+    """
+    Count statements and SQL time into the current request's RequestStats.
+
+    Statements slower than `slow_query_seconds` are logged to the
+    app.slow_queries logger (without parameters, which may hold personal data).
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+            if stats.statements is not None:
+                stats.statements.append({"statement": statement, "seconds": elapsed, "executemany": executemany})
+        if slow_query_seconds is not None and elapsed >= slow_query_seconds:
+            slow_query_logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split()))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and in-flight requests per route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _route(self, scope: Scope) -> str:
+        # Label by the route template (/api/programs/{program_id}), never the raw path
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", UNMATCHED_ROUTE)
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = metrics_registry
+        key = (scope["method"], self._route(scope))
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        registry.in_progress[key] = registry.in_progress.get(key, 0) + 1
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            registry.in_progress[key] -= 1
+            registry.record(key[0], key[1], status_code, time.perf_counter() - start, stats)
+            _request_stats.reset(token)
@@ -0,0 +1,139 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>` or is picked
+by PROFILE_SAMPLE_RATE. Its cProfile call-stack profile and every SQL statement
+with its timing are written to PROFILE_DIR (a .prof file for snakeviz/pstats
+plus a .json summary), and the response gets an X-Profile-Id header. With
+`X-Profile-Output: inline` the summary replaces the response body instead.
+Sampled requests are never altered.
+
+main only installs ProfilingMiddleware when a token or sample rate is set, so
+with profiling off there is no per-request cost at all.
+
+cProfile sees the thread it runs on, i.e. the event loop: async endpoints are
+profiled completely, and other requests interleaving on the loop show up in the
+profile too. Only one request is profiled at a time.
+"""
+import cProfile
+import hmac
+import io
+import json
+import pstats
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import capture_statements
+
+TOP_FUNCTIONS = 40
+
+
+def _profile_text(profiler: cProfile.Profile) -> str:
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    return output.getvalue()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware that profiles opted-in or sampled requests."""
+
+    def __init__(self, app: ASGIApp, directory: str, token: Optional[str] = None, sample_rate: float = 0.0):
+        self.app = app
+        self.directory = Path(directory)
+        self.token = token
+        self.sample_rate = sample_rate
+        self._active = False
+
+    def _requested(self, headers: Headers) -> bool:
+        supplied = headers.get("x-profile")
+        return bool(self.token and supplied and hmac.compare_digest(supplied, self.token))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._active:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        requested = self._requested(headers)
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        inline = requested and headers.get("x-profile-output") == "inline"
+        profile_id = uuid.uuid4().hex
+        statements = capture_statements()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if inline:
+                    return
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+            elif inline:
+                # The profile replaces the body; drop the endpoint's own response
+                return
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._active = False
+
+        summary = self._summary(scope, profile_id, status_code, time.perf_counter() - start, statements, profiler)
+        if inline:
+            body = json.dumps(summary, indent=2).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-profile-id", profile_id.encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+        else:
+            self._write(profile_id, summary, profiler)
+
+    def _summary(
+        self,
+        scope: Scope,
+        profile_id: str,
+        status_code: int,
+        seconds: float,
+        statements: Optional[List[Dict[str, Any]]],
+        profiler: cProfile.Profile
+    ) -> Dict[str, Any]:
+        statements = statements or []
+        return {
+            "id": profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "query_string": scope.get("query_string", b"").decode("latin-1"),
+            "status_code": status_code,
+            "duration_seconds": seconds,
+            "sql_count": len(statements),
+            "sql_seconds": sum(statement["seconds"] for statement in statements),
+            "sql": statements,
+            "profile": _profile_text(profiler),
+        }
+
+    def _write(self, profile_id: str, summary: Dict[str, Any], profiler: cProfile.Profile) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = self.directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{profile_id}"
+        profiler.dump_stats(f"{stem}.prof")
+        Path(f"{stem}.json").write_text(json.dumps(summary, indent=2))
@@ -1,10 +1,25 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max rounds pinned to the configured cost so hashes made with another cost
+# are flagged by verify_and_update and rehashed on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# Decoded token payloads, each kept until the token's own expiry
+_token_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -17,6 +32,86 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHashTimeout(Exception):
+    """Raised when a password hash waited too long for a free hashing slot."""
+
+
+class PasswordHashMetrics:
+    """Counters for hashing done off the event loop (only mutated on the loop thread)."""
+
+    def __init__(self):
+        self.count = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.queue_depth = 0
+        self.in_flight = 0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "total_seconds": self.total_seconds,
+            "avg_seconds": self.total_seconds / self.count if self.count else 0.0,
+            "max_seconds": self.max_seconds,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+        }
+
+
+password_hash_metrics = PasswordHashMetrics()
+
+# bcrypt releases the GIL, so a few threads hash in parallel; the semaphore keeps
+# the executor queue bounded and lets waiters give up after the queue timeout
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_CONCURRENCY,
+    thread_name_prefix="password-hash",
+)
+_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_CONCURRENCY)
+
+
+async def _run_hashing(func: Callable, *args) -> Any:
+    """Run a bcrypt call in the bounded hashing pool."""
+    metrics = password_hash_metrics
+    metrics.queue_depth += 1
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        metrics.timeouts += 1
+        raise PasswordHashTimeout("Password hashing queue is full")
+    finally:
+        metrics.queue_depth -= 1
+
+    metrics.in_flight += 1
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        metrics.observe(time.perf_counter() - start)
+        metrics.in_flight -= 1
+        _hash_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password without blocking the event loop."""
+    return await _run_hashing(pwd_context.hash, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password without blocking the event loop.
+
+    Returns (valid, new_hash); new_hash is set when the stored hash used a
+    different bcrypt cost and should be replaced.
+    """
+    return await _run_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -31,9 +126,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 
 def decode_access_token(token: str) -> Optional[dict]:
-    """Decode and verify a JWT token."""
+    """Decode and verify a JWT token (cached until the token expires)."""
+    payload = _token_cache.get(token)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    expires_in = payload.get("exp", 0) - time.time()
+    if expires_in > 0:
+        _token_cache.set(token, payload, ttl=expires_in)
+    return payload
@@ -0,0 +1,49 @@
+"""
+Single-flight coalescing for asyncio handlers.
+
+Concurrent calls with the same key share one in-flight execution and its
+result; the next call after it finishes starts a fresh one. This is not a
+cache. State is per worker process and only touched on the event loop thread.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await `fn()` for `key`, joining the execution already in flight if there is one."""
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            self.executions += 1
+            flight = asyncio.ensure_future(fn())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        # Shielded: one caller going away must not cancel the others' result
+        return await asyncio.shield(flight)
+
+    def _forget(self, key: Hashable, flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark a failure as retrieved: if every caller went away, nobody else will
+        if not flight.cancelled():
+            flight.exception()
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_rate": self.coalesced / self.calls if self.calls else 0.0,
+            "in_flight": len(self._flights),
+        }
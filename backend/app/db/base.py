@@ -1,18 +1,146 @@
+import itertools
+from contextvars import ContextVar
+from typing import List, Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_engine: Optional[Engine] = None
+_replica_engines: Optional[List[Engine]] = None
+_next_replica = None
+
+# Clients that wrote recently (per process), so their reads stay on the primary
+_recent_writers = TTLCache(maxsize=10_000, ttl=settings.REPLICA_STICKY_SECONDS)
+_read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=False)
+
+
+def _create_engine(url: str, **kwargs) -> Engine:
+    engine = create_engine(url, **kwargs)
+    instrument_engine(
+        engine,
+        slow_query_seconds=settings.SLOW_QUERY_THRESHOLD_MS / 1000 if settings.SLOW_QUERY_THRESHOLD_MS else None
+    )
+    return engine
+
+
+def get_engine() -> Engine:
+    """
+    The application (primary) engine, created and instrumented on first use.
+
+    Creating it loads the DB driver, so importing this module (models, alembic,
+    CLIs, worker processes) does not pay for it; the app's lifespan creates it
+    at startup.
+    """
+    global _engine
+    if _engine is None:
+        _engine = _create_engine(settings.DATABASE_URL)
+    return _engine
+
+
+def get_replica_engines() -> List[Engine]:
+    """Engines for DATABASE_REPLICA_URLS (empty when none are configured)."""
+    global _replica_engines, _next_replica
+    if _replica_engines is None:
+        # pre_ping: replicas restart/fail over independently of the primary
+        _replica_engines = [_create_engine(url, pool_pre_ping=True) for url in settings.DATABASE_REPLICA_URLS]
+        _next_replica = itertools.cycle(_replica_engines) if _replica_engines else None
+    return _replica_engines
+
+
+def dispose_engine() -> None:
+    """Close the engines' pooled connections (application shutdown)."""
+    global _engine, _replica_engines, _next_replica
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+        SessionLocal.configure(bind=None)
+    for engine in _replica_engines or []:
+        engine.dispose()
+    _replica_engines = None
+    _next_replica = None
+
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker that binds to get_engine() the first time a session is made."""
+    
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
 
+def __getattr__(name: str):
+    # `from app.db.base import engine` still works, creating the engine on demand
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_db():
-    """Dependency for getting database sessions."""
+    """Dependency for getting database sessions (primary)."""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """
+    Dependency for read-only handlers: a session on a replica (round robin).
+
+    Falls back to the primary when no replica is configured, or when
+    ReplicaRoutingMiddleware saw this client write within the last
+    REPLICA_STICKY_SECONDS (read-your-writes).
+    """
+    replicas = get_replica_engines()
+    if replicas and not _read_from_primary.get():
+        db = SessionLocal(bind=next(_next_replica))
+    else:
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pure ASGI middleware for read-your-writes: after a client's write request,
+    its reads go to the primary for REPLICA_STICKY_SECONDS. Clients are told
+    apart by their Authorization header, else their address. Stickiness is per
+    process. Only installed when replicas are configured.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        client_key = dict(scope["headers"]).get(b"authorization") or (scope.get("client") or ("",))[0]
+        writes = scope["method"] not in SAFE_METHODS
+        token = _read_from_primary.set(_recent_writers.get(client_key) is not None)
+        if writes:
+            # Before the response goes out: a read sent the moment it arrives must already stick
+            _recent_writers.set(client_key, True)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _read_from_primary.reset(token)
+            if writes:
+                # Restart the window from the end of the write (the response may have taken a while)
+                _recent_writers.set(client_key, True)
@@ -0,0 +1 @@
+# Exports module
@@ -0,0 +1,143 @@
+"""
+Shared helpers for program exports.
+
+These mirror frontend/src/utils/exportMarkdown.ts and repLadder.ts so that a
+server-side export reads exactly like the one the browser used to produce.
+"""
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+WEEKS = 8
+
+LIFT_LABELS = {
+    "upper_body_press": "Upper Body Press",
+    "upper_body_pull": "Upper Body Pull",
+    "squat": "Squat",
+    "hip_hinge": "Hip Hinge",
+    "horz_press": "Horizontal Press",
+    "horz_pull": "Horizontal Pull",
+    "vert_press": "Vertical Press",
+    "vert_pull": "Vertical Pull",
+    "hinge": "Hip Hinge",
+}
+
+INTENSITY_ORDER = {"H": 1, "M": 2, "L": 3}
+INTENSITY_NAMES = {"H": "Heavy", "M": "Medium", "L": "Light"}
+
+
+def lift_display_name(lift: str, custom_names: Optional[Dict[str, str]] = None) -> str:
+    """Custom lift name if set, otherwise the default label in title case."""
+    if custom_names and custom_names.get(lift):
+        return custom_names[lift]
+    label = LIFT_LABELS.get(lift) or lift.replace("_", " ")
+    return re.sub(r"\b\w", lambda m: m.group(0).upper(), label)
+
+
+def format_value(value: Any) -> str:
+    """Format a weight or count the way JavaScript prints it (225.0 -> "225")."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def assign_ladder(lift_rm: int) -> List[int]:
+    """Rep ladder for an RM (frontend variant, clamped at both ends)."""
+    ladders = {
+        4: [1, 2, 3], 5: [2, 3, 3], 6: [2, 3, 4], 7: [2, 4, 5], 8: [3, 4, 5], 9: [3, 5, 6],
+        10: [3, 5, 7], 11: [4, 6, 7], 12: [4, 6, 8], 13: [4, 7, 9], 14: [5, 7, 9], 15: [5, 8, 10],
+    }
+    if lift_rm in ladders:
+        return ladders[lift_rm]
+    return [1, 2, 3] if lift_rm < 4 else [5, 8, 10]
+
+
+def assign_reps(lift_rm: int, nl: int, intensity: str = "H") -> List[int]:
+    """
+    Split NL into sets along the rep ladder.
+
+    For Medium and Light days leftover reps are spread over earlier sets
+    instead of forming a short final set.
+    """
+    rep_ladder = assign_ladder(lift_rm)
+    session_reps = []
+    remaining = nl
+
+    while remaining >= rep_ladder[0]:
+        for reps in rep_ladder:
+            if remaining >= reps:
+                session_reps.append(reps)
+                remaining -= reps
+
+    if remaining > 0:
+        if intensity == "H":
+            session_reps.append(remaining)
+        else:
+            max_reps = rep_ladder[-1]
+            i = len(session_reps) - 1
+            while remaining > 0 and i >= 0:
+                can_add = max_reps - session_reps[i]
+                if can_add > 0:
+                    to_add = min(can_add, remaining)
+                    session_reps[i] += to_add
+                    remaining -= to_add
+                i -= 1
+            if remaining > 0:
+                session_reps.append(remaining)
+
+    return session_reps
+
+
+def format_rep_scheme(reps: List[int]) -> str:
+    """[5, 5, 3] -> "3 sets: 5, 5, 3"."""
+    if not reps:
+        return ""
+    return f"{len(reps)} {'set' if len(reps) == 1 else 'sets'}: {', '.join(str(r) for r in reps)}"
+
+
+def iter_weeks(program: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Program weeks 1-8 in order, skipping missing ones."""
+    weeks = {week["week_number"]: week for week in program.get("weeks") or []}
+    for week_number in range(1, WEEKS + 1):
+        if week_number in weeks:
+            yield weeks[week_number]
+
+
+def session_lifts(program: Dict[str, Any], week: Dict[str, Any], session_name: str) -> List[Dict[str, Any]]:
+    """A session's lifts for one week with reps, load and rep scheme, heavy first."""
+    config = program.get("config") or {}
+    template = config.get("weekly_template") or {}
+    lift_weights = config.get("lift_weights") or {}
+    lift_intensity_rms = config.get("lift_intensity_rms") or {}
+    lift_rms = config.get("lift_rms") or {}
+    weekly_data = week.get("weekly_data") or {}
+
+    rows = []
+    for lift, intensity in template["sessions"][session_name].items():
+        total_reps = (weekly_data.get(lift) or {}).get(intensity) or 0
+        weight = (lift_weights.get(lift) or {}).get(intensity) or 0
+        rm = (lift_intensity_rms.get(lift) or {}).get(intensity) or lift_rms.get(lift) or 10
+        rows.append({
+            "lift": lift,
+            "name": lift_display_name(lift, config.get("lift_names")),
+            "intensity": intensity,
+            "total_reps": total_reps,
+            "weight": weight,
+            "rm": rm,
+            "rep_scheme": format_rep_scheme(assign_reps(rm, total_reps, intensity)),
+        })
+
+    rows.sort(key=lambda row: INTENSITY_ORDER.get(row["intensity"], 99))
+    return rows
+
+
+def session_names(program: Dict[str, Any]) -> List[str]:
+    config = program.get("config") or {}
+    template = config.get("weekly_template") or {}
+    return sorted((template.get("sessions") or {}).keys())
+
+
+def export_filename(program: Dict[str, Any], view: str, extension: str) -> str:
+    """Download filename, e.g. "spring_block_coach_view.md"."""
+    name = program.get("name") or "battleship_program"
+    slug = re.sub(r"[^\w.-]", "", re.sub(r"\s+", "_", name.lower()), flags=re.ASCII) or "battleship_program"
+    return f"{slug}_{view}_view.{extension}"
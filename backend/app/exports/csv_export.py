@@ -0,0 +1,40 @@
+"""CSV export: one row per week, session and lift, streamed a week at a time."""
+import csv
+import io
+from typing import Any, Dict, Iterator
+
+from app.exports.common import INTENSITY_NAMES, format_value, iter_weeks, session_lifts, session_names
+
+ATHLETE_COLUMNS = ["Week", "Session", "Exercise", "Intensity", "Load/Variation", "Total Reps", "Suggested Rep Scheme"]
+COACH_COLUMNS = ATHLETE_COLUMNS + ["RM", "Dice Rolls"]
+
+
+def _rows_to_text(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def render_csv(program: Dict[str, Any], coach: bool) -> Iterator[str]:
+    """Yield the CSV header, then each week's rows. The coach view adds RM and dice rolls."""
+    yield _rows_to_text([COACH_COLUMNS if coach else ATHLETE_COLUMNS])
+
+    for week in iter_weeks(program):
+        dice_rolls = week.get("dice_rolls") or {}
+        rows = []
+        for session_name in session_names(program):
+            for lift in session_lifts(program, week, session_name):
+                row = [
+                    week["week_number"],
+                    session_name,
+                    lift["name"],
+                    INTENSITY_NAMES.get(lift["intensity"], lift["intensity"]),
+                    format_value(lift["weight"]),
+                    lift["total_reps"],
+                    lift["rep_scheme"],
+                ]
+                if coach:
+                    rolls = dice_rolls.get(lift["lift"])
+                    row += [lift["rm"], " ".join(str(roll) for roll in rolls) if rolls else ""]
+                rows.append(row)
+        yield _rows_to_text(rows)
@@ -0,0 +1,107 @@
+"""Markdown export (coach and athlete views), one chunk per section."""
+from typing import Any, Dict, Iterator
+
+from app.exports.common import (
+    INTENSITY_NAMES,
+    format_value,
+    iter_weeks,
+    lift_display_name,
+    session_lifts,
+    session_names,
+)
+
+FOOTER = "\n---\n\n*Generated by Strength Programs - Battleship Program Generator*\n"
+
+
+def _header(program: Dict[str, Any], coach: bool) -> str:
+    config = program.get("config") or {}
+    template = config.get("weekly_template") or {}
+
+    text = f"# {program.get('name') or 'The Battleship Program'}\n\n"
+    text += "**Program Type:** Battleship\n"
+    text += "**Duration:** 8 Weeks\n"
+    text += f"**Lifts:** {config.get('num_lifts')}\n"
+    text += f"**Sessions per Week:** {template.get('sessions_per_week')}\n"
+    text += f"**Status:** {str(program.get('status')).upper()}\n"
+
+    if coach:
+        text += "\n---\n"
+        text += "## Coach's Notes\n\n"
+        text += "This view includes all program details including dice rolls and rep maxes.\n"
+
+    return text + "\n---\n\n"
+
+
+def _lift_configuration(program: Dict[str, Any]) -> str:
+    config = program.get("config") or {}
+    lift_weights = config.get("lift_weights")
+    lift_intensity_rms = config.get("lift_intensity_rms")
+    if not lift_weights or not lift_intensity_rms:
+        return ""
+
+    text = "## Lift Configuration\n\n"
+    for lift in config.get("lift_rms") or {}:
+        weights = lift_weights.get(lift) or {}
+        rms = lift_intensity_rms.get(lift) or {}
+        text += f"### {lift_display_name(lift, config.get('lift_names'))}\n\n"
+        text += "| Intensity | Weight | RM |\n"
+        text += "|-----------|--------|----|\n"
+        text += f"| Heavy (85% 1RM) | {format_value(weights.get('H') or 'N/A')} | {rms.get('H') or 0} reps |\n"
+        text += f"| Medium (75% 1RM) | {format_value(weights.get('M') or 'N/A')} | {rms.get('M') or 0} reps |\n"
+        text += f"| Light (65% 1RM) | {format_value(weights.get('L') or 'N/A')} | {rms.get('L') or 0} reps |\n"
+        text += "\n"
+
+    return text + "---\n\n"
+
+
+def _week(program: Dict[str, Any], week: Dict[str, Any], coach: bool) -> str:
+    config = program.get("config") or {}
+    text = f"## Week {week['week_number']}\n\n"
+
+    if coach and week.get("dice_rolls"):
+        text += "**Dice Rolls:**\n\n"
+        for lift, rolls in week["dice_rolls"].items():
+            text += f"- {lift_display_name(lift, config.get('lift_names'))}: 🎲 {rolls[0]}, {rolls[1]}\n"
+        text += "\n"
+
+    for session_name in session_names(program):
+        text += f"### Session {session_name}\n\n"
+        for row in session_lifts(program, week, session_name):
+            text += f"#### {row['name']} - {INTENSITY_NAMES.get(row['intensity'], 'Light')}\n\n"
+            if coach:
+                text += f"- **Weight/Variation:** {format_value(row['weight'])}\n"
+                text += f"- **Total Reps:** {row['total_reps']}\n"
+                text += f"- **RM at this weight:** {row['rm']} reps\n"
+                text += f"- **Suggested Rep Scheme:** {row['rep_scheme']}\n"
+            else:
+                text += f"{format_value(row['weight'])} × {row['total_reps']} reps\n\n"
+                text += f"{row['rep_scheme']}\n"
+            text += "\n"
+
+    return text + "---\n\n"
+
+
+def _notes(coach: bool) -> str:
+    text = "## Notes\n\n"
+    if coach:
+        text += "- This is the coach's view with complete program details\n"
+        text += "- Dice rolls determine the total reps (NL) for each lift at each intensity\n"
+        text += "- Rep schemes are calculated based on the athlete's RM at each weight\n"
+        text += "- Athletes can adjust set/rep schemes as long as total reps are completed\n"
+    else:
+        text += "- Complete the total reps listed for each exercise\n"
+        text += "- Use the suggested rep scheme or adjust as needed\n"
+        text += "- Rest 3-5 minutes between sets for heavy lifts\n"
+        text += "- Rest as needed (1-2 minutes) between sets for medium/light lifts\n"
+        text += "- Track your completed sets and reps for each session\n"
+    return text + FOOTER
+
+
+def render_markdown(program: Dict[str, Any], coach: bool) -> Iterator[str]:
+    """Yield the Markdown export section by section (header, lift config, each week, notes)."""
+    yield _header(program, coach)
+    if coach:
+        yield _lift_configuration(program)
+    for week in iter_weeks(program):
+        yield _week(program, week, coach)
+    yield _notes(coach)
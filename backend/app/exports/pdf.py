@@ -0,0 +1,103 @@
+"""
+PDF export rendered with reportlab.
+
+reportlab lays out the whole document before writing it, so the file is built
+in a spooled temporary file (spilling to disk past SPOOL_MAX_BYTES) and then
+streamed out in chunks rather than held as one bytes object.
+"""
+import tempfile
+from typing import Any, BinaryIO, Dict, Iterator
+
+from app.exports.common import (
+    INTENSITY_NAMES,
+    format_value,
+    iter_weeks,
+    lift_display_name,
+    session_lifts,
+    session_names,
+)
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+def write_pdf(program: Dict[str, Any], coach: bool, output: BinaryIO) -> None:
+    """Lay out the program (one table per week) and write the PDF to `output`."""
+    # reportlab is heavy to import; only pay for it when a PDF is requested
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    config = program.get("config") or {}
+    template = config.get("weekly_template") or {}
+    table_style = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ])
+
+    story = [
+        Paragraph(program.get("name") or "The Battleship Program", styles["Title"]),
+        Paragraph(
+            f"Battleship &middot; 8 Weeks &middot; {config.get('num_lifts')} lifts &middot; "
+            f"{template.get('sessions_per_week')} sessions/week &middot; {str(program.get('status')).upper()}",
+            styles["Normal"],
+        ),
+        Spacer(1, 0.2 * inch),
+    ]
+
+    if coach and config.get("lift_weights") and config.get("lift_intensity_rms"):
+        story.append(Paragraph("Lift Configuration", styles["Heading2"]))
+        rows = [["Lift", "Heavy", "Medium", "Light"]]
+        for lift in config.get("lift_rms") or {}:
+            weights = config["lift_weights"].get(lift) or {}
+            rms = config["lift_intensity_rms"].get(lift) or {}
+            rows.append([lift_display_name(lift, config.get("lift_names"))] + [
+                f"{format_value(weights.get(day) or 'N/A')} ({rms.get(day) or 0} RM)" for day in ("H", "M", "L")
+            ])
+        story += [Table(rows, style=table_style, repeatRows=1), PageBreak()]
+
+    header = ["Session", "Exercise", "Load/Variation", "Total Reps", "Suggested Rep Scheme"]
+    if coach:
+        header += ["RM", "Dice"]
+
+    weeks = list(iter_weeks(program))
+    for index, week in enumerate(weeks):
+        story.append(Paragraph(f"Week {week['week_number']}", styles["Heading2"]))
+        dice_rolls = week.get("dice_rolls") or {}
+        rows = [header]
+        for session_name in session_names(program):
+            for position, lift in enumerate(session_lifts(program, week, session_name)):
+                row = [
+                    session_name if position == 0 else "",
+                    f"{lift['name']} ({INTENSITY_NAMES.get(lift['intensity'], lift['intensity'])})",
+                    format_value(lift["weight"]),
+                    lift["total_reps"],
+                    lift["rep_scheme"],
+                ]
+                if coach:
+                    rolls = dice_rolls.get(lift["lift"])
+                    row += [lift["rm"], ", ".join(str(roll) for roll in rolls) if rolls else ""]
+                rows.append(row)
+        story.append(Table(rows, style=table_style, repeatRows=1))
+        if index < len(weeks) - 1:
+            story.append(PageBreak())
+
+    SimpleDocTemplate(output, pagesize=letter, title=program.get("name") or "The Battleship Program").build(story)
+
+
+def render_pdf(program: Dict[str, Any], coach: bool) -> Iterator[bytes]:
+    """Yield the PDF in CHUNK_SIZE pieces."""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as output:
+        write_pdf(program, coach, output)
+        output.seek(0)
+        while True:
+            chunk = output.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,208 @@
+"""
+PDF rendering in a process pool with an on-disk render cache.
+
+PDF layout is CPU-bound, so renders run in a small process pool behind a
+bounded queue instead of on the API workers. Finished files are cached under
+EXPORT_CACHE_DIR keyed by (program_id, program version, view); the version is
+bumped on every reroll/update, so a changed program never reads a stale file.
+
+Superseded files are pruned lazily, never while a response may still be about
+to open them: every cache hit touches its file, and pruning (when the program
+next changes, or a new version of it is rendered) only removes files of
+earlier versions unused for PDF_CACHE_GRACE_SECONDS. An hourly sweep removes any file unused for
+PDF_CACHE_MAX_AGE_SECONDS, such as those of deleted programs.
+"""
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
+from uuid import UUID
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+
+SWEEP_INTERVAL_SECONDS = 3600
+
+
+class RenderQueueFull(Exception):
+    """Raised when a PDF render waited too long for a free render slot."""
+
+
+class PdfRenderMetrics:
+    """Render and cache counters (only mutated on the event loop thread)."""
+
+    def __init__(self):
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.renders = 0
+        self.render_failures = 0
+        self.rejected = 0
+        self.total_render_seconds = 0.0
+        self.max_render_seconds = 0.0
+        self.queue_depth = 0
+
+    def snapshot(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "renders": self.renders,
+            "render_failures": self.render_failures,
+            "rejected": self.rejected,
+            "avg_render_seconds": self.total_render_seconds / self.renders if self.renders else 0.0,
+            "max_render_seconds": self.max_render_seconds,
+            "queue_depth": self.queue_depth,
+        }
+
+
+pdf_render_metrics = PdfRenderMetrics()
+
+_executor: Optional["ProcessPoolExecutor"] = None
+_render_slots: Optional[asyncio.Semaphore] = None
+_in_flight: Dict[Path, asyncio.Future] = {}
+_last_sweep = 0.0
+
+
+def _cache_dir() -> Path:
+    path = Path(settings.EXPORT_CACHE_DIR) / "pdf"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cache_path(program_id: UUID, version: int, view: str) -> Path:
+    return _cache_dir() / f"{program_id}-v{version}-{view}.pdf"
+
+
+def _remove_unused(paths: Iterable[Path], idle_seconds: float) -> None:
+    cutoff = time.time() - idle_seconds
+    for path in paths:
+        try:
+            if path.stat().st_mtime <= cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def prune(program_id: UUID, current_version: Optional[int] = None) -> None:
+    """
+    Remove a program's cached PDFs of versions before `current_version` (all of
+    them when it is None, e.g. the program was deleted) that have not been used
+    for PDF_CACHE_GRACE_SECONDS. Files of the current version stay cached.
+    """
+    directory = Path(settings.EXPORT_CACHE_DIR) / "pdf"
+    if not directory.exists():
+        return
+    prefix = f"{program_id}-v"
+    paths = directory.glob(f"{prefix}*.pdf")
+    if current_version is not None:
+        # Names are {program_id}-v{version}-{view}.pdf
+        paths = [path for path in paths if int(path.name[len(prefix):].split("-", 1)[0]) < current_version]
+    _remove_unused(paths, settings.PDF_CACHE_GRACE_SECONDS)
+
+
+def _sweep() -> None:
+    """Remove every cached PDF unused for PDF_CACHE_MAX_AGE_SECONDS (at most once per SWEEP_INTERVAL_SECONDS)."""
+    global _last_sweep
+    now = time.monotonic()
+    if now - _last_sweep < SWEEP_INTERVAL_SECONDS:
+        return
+    _last_sweep = now
+    _remove_unused(_cache_dir().glob("*.pdf"), settings.PDF_CACHE_MAX_AGE_SECONDS)
+
+
+def _render_to_file(program: Dict[str, Any], coach: bool, path: str) -> None:
+    """Process-pool entry point: write the PDF next to its final path, then move it into place."""
+    from app.exports.pdf import write_pdf
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            write_pdf(program, coach, output)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _get_executor() -> "ProcessPoolExecutor":
+    global _executor, _render_slots
+    if _executor is None:
+        # Imported on first render: multiprocessing is not needed to serve anything else
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # spawn rather than fork: the API process has threads (bcrypt pool, DB pool)
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        _render_slots = asyncio.Semaphore(settings.PDF_RENDER_WORKERS + settings.PDF_RENDER_QUEUE_SIZE)
+    return _executor
+
+
+async def _render(program: Dict[str, Any], coach: bool, path: Path) -> None:
+    executor = _get_executor()
+    metrics = pdf_render_metrics
+    metrics.queue_depth += 1
+    try:
+        await asyncio.wait_for(_render_slots.acquire(), timeout=settings.PDF_RENDER_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        metrics.rejected += 1
+        raise RenderQueueFull("PDF render queue is full")
+    finally:
+        metrics.queue_depth -= 1
+
+    start = time.perf_counter()
+    try:
+        await asyncio.get_running_loop().run_in_executor(executor, _render_to_file, program, coach, str(path))
+    except Exception:
+        metrics.render_failures += 1
+        raise
+    finally:
+        _render_slots.release()
+
+    elapsed = time.perf_counter() - start
+    metrics.renders += 1
+    metrics.total_render_seconds += elapsed
+    metrics.max_render_seconds = max(metrics.max_render_seconds, elapsed)
+
+
+async def get_pdf(program: Dict[str, Any], view: str) -> Path:
+    """
+    Path of the rendered PDF for a serialized program, rendering it if not cached.
+
+    Concurrent requests for the same (program, version, view) share one render.
+    """
+    path = cache_path(program["id"], program.get("version", 1), view)
+    try:
+        os.utime(path)  # Marks the file as in use, so pruning leaves it for PDF_CACHE_GRACE_SECONDS
+        pdf_render_metrics.cache_hits += 1
+        return path
+    except FileNotFoundError:
+        pass
+
+    pdf_render_metrics.cache_misses += 1
+    pending = _in_flight.get(path)
+    if pending is None:
+        pending = asyncio.ensure_future(_render(program, view == "coach", path))
+        _in_flight[path] = pending
+        pending.add_done_callback(lambda _: _in_flight.pop(path, None))
+    await asyncio.shield(pending)
+    # A new version was rendered: the program's earlier ones are due for pruning
+    prune(program["id"], program.get("version", 1))
+    _sweep()
+    return path
+
+
+def shutdown() -> None:
+    """Stop the render pool (called on application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
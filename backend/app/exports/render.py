@@ -0,0 +1,44 @@
+"""Entry point for program exports: format/view selection and chunked rendering."""
+import enum
+from typing import Any, Dict, Iterator
+
+
+class ExportFormat(str, enum.Enum):
+    MARKDOWN = "md"
+    CSV = "csv"
+    PDF = "pdf"
+
+
+class ExportView(str, enum.Enum):
+    COACH = "coach"
+    ATHLETE = "athlete"
+
+
+MEDIA_TYPES = {
+    ExportFormat.MARKDOWN: "text/markdown",
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.PDF: "application/pdf",
+}
+
+
+def render_program(program: Dict[str, Any], export_format: ExportFormat, view: ExportView) -> Iterator[bytes]:
+    """
+    Render a serialized program (ProgramResponse as a dict) chunk by chunk.
+
+    Renderers are imported lazily so the PDF stack is only loaded when needed.
+    """
+    coach = view == ExportView.COACH
+    if export_format == ExportFormat.PDF:
+        from app.exports.pdf import render_pdf
+        yield from render_pdf(program, coach)
+        return
+
+    if export_format == ExportFormat.CSV:
+        from app.exports.csv_export import render_csv
+        chunks = render_csv(program, coach)
+    else:
+        from app.exports.markdown import render_markdown
+        chunks = render_markdown(program, coach)
+
+    for chunk in chunks:
+        yield chunk.encode("utf-8")
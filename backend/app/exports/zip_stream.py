@@ -0,0 +1,140 @@
+"""
+Zip archive of many program exports, streamed while it is being built.
+
+zipfile is given an unseekable sink, so each entry is written with a data
+descriptor instead of seeking back to patch its header, and the sink is
+drained after every write: the archive is never staged in memory or on disk.
+Up to EXPORT_ZIP_CONCURRENCY programs render ahead of the entry currently
+being written (text formats in the thread pool, PDFs in the render process
+pool), each into a small bounded queue, so memory stays flat with roster size.
+Programs arrive through an async iterator, so whatever loads them (batched
+queries) can run in the thread pool rather than on the event loop.
+"""
+import asyncio
+import collections
+import zipfile
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Set
+
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from app.core.config import settings
+from app.exports import pdf_cache
+from app.exports.common import export_filename
+from app.exports.render import ExportFormat, ExportView, render_program
+
+CHUNK_SIZE = 64 * 1024
+QUEUE_CHUNKS = 8
+
+_DONE = object()
+
+
+class _ZipSink:
+    """Write-only, unseekable file object whose contents are handed to the response as they arrive."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _program_chunks(program: Dict[str, Any], export_format: ExportFormat, view: ExportView) -> AsyncIterator[bytes]:
+    if export_format == ExportFormat.PDF:
+        path = await pdf_cache.get_pdf(program, view.value)
+        with open(path, "rb") as file:
+            while True:
+                chunk = await run_in_threadpool(file.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        return
+
+    async for chunk in iterate_in_threadpool(render_program(program, export_format, view)):
+        yield chunk
+
+
+async def _produce(
+    program: Dict[str, Any],
+    export_format: ExportFormat,
+    view: ExportView,
+    out: asyncio.Queue
+) -> None:
+    """Render one program into `out`, ending with _DONE (or the exception that stopped it)."""
+    try:
+        async for chunk in _program_chunks(program, export_format, view):
+            await out.put(chunk)
+    except Exception as exc:
+        await out.put(exc)
+    else:
+        await out.put(_DONE)
+
+
+def entry_name(program: Dict[str, Any], view: ExportView, export_format: ExportFormat, used: Set[str]) -> str:
+    """File name for a program inside the archive, suffixed when two programs share a name."""
+    name = export_filename(program, view.value, export_format.value)
+    stem, dot, extension = name.rpartition(".")
+    suffix = 2
+    while name in used:
+        name = f"{stem}_{suffix}{dot}{extension}"
+        suffix += 1
+    used.add(name)
+    return name
+
+
+async def stream_zip(
+    programs: AsyncIterable[Dict[str, Any]],
+    export_format: ExportFormat,
+    view: ExportView
+) -> AsyncIterator[bytes]:
+    """
+    Yield a zip archive holding one export per serialized program, in order
+    (wrap a blocking iterator in iterate_in_threadpool).
+    """
+    sink = _ZipSink()
+    # PDFs are already compressed; deflating them again only costs CPU
+    compression = zipfile.ZIP_STORED if export_format == ExportFormat.PDF else zipfile.ZIP_DEFLATED
+    remaining = aiter(programs)
+    pending = collections.deque()
+    used_names: Set[str] = set()
+
+    async def start_next() -> None:
+        program = await anext(remaining, None)
+        if program is not None:
+            queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+            task = asyncio.ensure_future(_produce(program, export_format, view, queue))
+            pending.append((program, queue, task))
+
+    try:
+        with zipfile.ZipFile(sink, mode="w", compression=compression) as archive:
+            for _ in range(max(1, settings.EXPORT_ZIP_CONCURRENCY)):
+                await start_next()
+
+            while pending:
+                program, queue, _task = pending.popleft()
+                await start_next()
+                with archive.open(entry_name(program, view, export_format, used_names), mode="w") as entry:
+                    while True:
+                        chunk = await queue.get()
+                        if chunk is _DONE:
+                            break
+                        if isinstance(chunk, Exception):
+                            raise chunk
+                        entry.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                yield sink.drain()
+        # Central directory
+        yield sink.drain()
+    finally:
+        for _program, _queue, task in pending:
+            task.cancel()
@@ -0,0 +1,118 @@
+"""
+Job kinds and their handlers.
+
+Handlers run inside a job worker process with their own database session and
+must be safe to run again after a failure part-way through: the runner retries
+failed jobs from the start, so each handler either skips work it already did or
+overwrites its previous output.
+"""
+import os
+import tempfile
+import uuid
+import zipfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, Type
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.exports.render import ExportFormat, render_program
+from app.schemas.job import ArchiveOldProgramsParams, CreateProgramsParams, ExportProgramsParams
+
+
+class JobContext:
+    """Handed to handlers: the job id and a way to report progress (committed immediately)."""
+
+    def __init__(self, db: Session, job_id: UUID):
+        self.db = db
+        self.job_id = job_id
+
+    def progress(self, done: int, total: Optional[int] = None) -> None:
+        from app.models.job import Job
+
+        values = {"progress_done": done}
+        if total is not None:
+            values["progress_total"] = total
+        self.db.query(Job).filter(Job.id == self.job_id).update(values, synchronize_session=False)
+        self.db.commit()
+
+
+class JobKind(NamedTuple):
+    params: Type[BaseModel]
+    handler: Callable[[Session, Any, JobContext], Dict[str, Any]]
+
+
+def export_path(job_id: UUID) -> Path:
+    """Where an export job leaves its zip archive."""
+    return Path(settings.EXPORT_CACHE_DIR) / "jobs" / f"{job_id}.zip"
+
+
+def create_programs(db: Session, params: CreateProgramsParams, context: JobContext) -> Dict[str, Any]:
+    """Create many programs. Ids derive from the job id, so a retry skips programs already created."""
+    from app.services.program_service import ProgramService
+
+    service = ProgramService(db)
+    program_ids = []
+    total = len(params.programs)
+    context.progress(0, total)
+    for index, program_data in enumerate(params.programs):
+        program_id = uuid.uuid5(context.job_id, str(index))
+        if service.get_program(program_id) is None:
+            service.create_battleship_program(program_data, program_id=program_id)
+        program_ids.append(str(program_id))
+        context.progress(index + 1)
+    return {"program_ids": program_ids}
+
+
+def export_programs(db: Session, params: ExportProgramsParams, context: JobContext) -> Dict[str, Any]:
+    """Write the selected programs' exports into a zip archive on disk (replacing any earlier attempt)."""
+    from app.exports.zip_stream import entry_name
+    from app.services.program_service import ProgramService
+
+    service = ProgramService(db)
+    path = export_path(context.job_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    compression = zipfile.ZIP_STORED if params.format == ExportFormat.PDF else zipfile.ZIP_DEFLATED
+    used_names = set()
+    count = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as output, zipfile.ZipFile(output, mode="w", compression=compression) as archive:
+            for program in service.iter_programs(**params.selection.model_dump(exclude_none=True)):
+                program_data = program.model_dump(mode="json")
+                name = entry_name(program_data, params.view, params.format, used_names)
+                with archive.open(name, mode="w") as entry:
+                    for chunk in render_program(program_data, params.format, params.view):
+                        entry.write(chunk)
+                count += 1
+                context.progress(count)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return {
+        "count": count,
+        "filename": f"programs_{params.view.value}_{params.format.value}.zip",
+        "size": path.stat().st_size,
+    }
+
+
+def archive_old_programs(db: Session, params: ArchiveOldProgramsParams, context: JobContext) -> Dict[str, Any]:
+    """Cold-storage backfill; already-archived programs are skipped by the query itself."""
+    from app.services.archive_service import ArchiveService
+
+    older_than = datetime.now(timezone.utc) - timedelta(days=params.older_than_days)
+    moved = ArchiveService(db).archive_old_programs(older_than, batch_size=params.batch_size, on_batch=context.progress)
+    return {"moved": moved}
+
+
+JOB_KINDS: Dict[str, JobKind] = {
+    "create_programs": JobKind(CreateProgramsParams, create_programs),
+    "export_programs": JobKind(ExportProgramsParams, export_programs),
+    "archive_old_programs": JobKind(ArchiveOldProgramsParams, archive_old_programs),
+}
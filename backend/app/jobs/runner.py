@@ -0,0 +1,173 @@
+"""
+In-process job runner: an asyncio queue of job ids feeding a worker process pool.
+
+Job records live in the jobs table, so no external broker is needed. A job is
+claimed with a conditional UPDATE (QUEUED -> RUNNING), which keeps several API
+processes sharing one database from running it twice. Failures are retried
+with linear backoff up to the job's max_attempts. On startup unfinished jobs
+are re-queued (RUNNING ones only once their heartbeat is stale); on shutdown
+the runner stops taking new work, waits up to JOB_DRAIN_TIMEOUT_SECONDS for
+running jobs and leaves the rest QUEUED for the next start, including failed
+jobs with attempts left. Job-table updates run in the thread pool, off the
+event loop.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import func, update
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.jobs.worker import run_job
+from app.models.job import Job, JobStatus
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    """Owns the job queue, the dispatcher tasks and the worker process pool."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional["ProcessPoolExecutor"] = None
+        self._dispatchers: Set[asyncio.Task] = set()
+        self._retries: Dict[UUID, asyncio.TimerHandle] = {}
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None and not self._stopping
+
+    async def start(self) -> None:
+        """Start the pool and dispatchers, then queue every unfinished job."""
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        # spawn rather than fork: the API process has threads (bcrypt pool, DB pool)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._dispatchers = {asyncio.ensure_future(self._dispatch()) for _ in range(self.workers)}
+        for job_id in await run_in_threadpool(self._recover):
+            self.submit(job_id)
+
+    def submit(self, job_id: UUID) -> None:
+        """Queue a persisted job. While stopping it simply stays QUEUED for the next start."""
+        if self.running:
+            self._queue.put_nowait(job_id)
+
+    async def stop(self) -> None:
+        """Stop taking work, wait (bounded) for running jobs, then shut the pool down."""
+        if self._executor is None:
+            return
+        self._stopping = True
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        for _ in self._dispatchers:
+            self._queue.put_nowait(None)
+
+        _done, still_running = await asyncio.wait(self._dispatchers, timeout=settings.JOB_DRAIN_TIMEOUT_SECONDS)
+        if still_running:
+            logger.warning("%d job(s) still running at shutdown; they will be retried on next start", len(still_running))
+            for task in still_running:
+                task.cancel()
+        # Jobs cut off here stay RUNNING and are picked up again once their heartbeat goes stale
+        self._executor.shutdown(wait=not still_running, cancel_futures=True)
+        self._executor = None
+        self._dispatchers = set()
+
+    def _recover(self) -> List[UUID]:
+        """Re-queue RUNNING jobs with a stale heartbeat and return the ids of every QUEUED job."""
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_STALE_SECONDS)
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(
+                Job.status == JobStatus.RUNNING,
+                func.coalesce(Job.updated_at, Job.started_at) < stale_before
+            ).update({"status": JobStatus.QUEUED}, synchronize_session=False)
+            db.commit()
+            queued = db.query(Job.id).filter(Job.status == JobStatus.QUEUED).order_by(Job.created_at)
+            return [job_id for (job_id,) in queued]
+        finally:
+            db.close()
+
+    async def _dispatch(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            if job_id is None or self._stopping:
+                return
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Job runner failed while handling job %s", job_id)
+
+    def _claim(self, job_id: UUID) -> Optional[Job]:
+        db = SessionLocal()
+        try:
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+                .values(status=JobStatus.RUNNING, attempts=Job.attempts + 1,
+                        started_at=func.now(), updated_at=func.now())
+                .returning(Job.attempts, Job.max_attempts)
+            ).first()
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _finish(self, job_id: UUID, **values: Any) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(update(Job).where(Job.id == job_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    async def _run(self, job_id: UUID) -> None:
+        claimed = await run_in_threadpool(self._claim, job_id)
+        if claimed is None:
+            # Already taken by another process, finished, or gone
+            return
+        attempts, max_attempts = claimed
+
+        loop = asyncio.get_running_loop()
+        try:
+            result: Dict[str, Any] = await loop.run_in_executor(self._executor, run_job, str(job_id))
+        except Exception as exc:
+            error = str(exc) or type(exc).__name__
+            if attempts < max_attempts:
+                logger.warning("Job %s failed (attempt %d/%d): %s", job_id, attempts, max_attempts, error)
+                await run_in_threadpool(self._finish, job_id, status=JobStatus.QUEUED, error=error)
+                # While draining it just stays QUEUED: the next start's recovery retries it
+                if not self._stopping:
+                    self._retries[job_id] = loop.call_later(
+                        settings.JOB_RETRY_BACKOFF_SECONDS * attempts, self._retry, job_id
+                    )
+            else:
+                logger.error("Job %s failed: %s", job_id, error)
+                await run_in_threadpool(self._finish, job_id, status=JobStatus.FAILED, error=error, finished_at=func.now())
+            return
+
+        await run_in_threadpool(
+            self._finish, job_id, status=JobStatus.SUCCEEDED, result=result, error=None, finished_at=func.now()
+        )
+
+    def _retry(self, job_id: UUID) -> None:
+        self._retries.pop(job_id, None)
+        self.submit(job_id)
+
+
+job_runner = JobRunner(workers=settings.JOB_WORKERS)
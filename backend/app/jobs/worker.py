@@ -0,0 +1,30 @@
+"""Entry point executed inside the job worker processes."""
+from typing import Any, Dict
+from uuid import UUID
+
+
+class JobError(Exception):
+    """A handler failure, flattened to a message so it always pickles back to the runner."""
+
+
+def run_job(job_id: str) -> Dict[str, Any]:
+    """Load the job, validate its params and run its handler with a fresh session. Returns the result."""
+    from app.db.base import SessionLocal
+    from app.jobs.handlers import JOB_KINDS, JobContext
+    from app.models.job import Job
+
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == UUID(job_id)).first()
+        if job is None:
+            raise JobError(f"Job {job_id} not found")
+        kind = JOB_KINDS[job.kind]
+        params = kind.params.model_validate(job.params)
+        return kind.handler(db, params, JobContext(db, job.id))
+    except JobError:
+        raise
+    except Exception as exc:
+        db.rollback()
+        raise JobError(f"{type(exc).__name__}: {exc}") from None
+    finally:
+        db.close()
@@ -1,38 +1,115 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+"""
+Application entry point.
+
+`create_app()` builds the FastAPI app; routers and middleware are imported
+inside it, and the database engine, job runner and render pools are created
+in the lifespan handler rather than at import. `uvicorn app.main:app` still
+works: the module-level `app` is built on first access.
+"""
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
 from app.core.config import settings
-from app.api.endpoints import auth, programs, athletes
-
-app = FastAPI(
-    title="Strength Programs API",
-    description="API for generating and managing strength training programs",
-    version="1.0.0"
-)
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.BACKEND_CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
-app.include_router(programs.router, prefix="/api/programs", tags=["programs"])
-app.include_router(athletes.router, prefix="/api/athletes", tags=["athletes"])
-
-
-@app.get("/")
-async def root():
-    return {
-        "message": "Strength Programs API",
-        "version": "1.0.0",
-        "docs": "/docs"
-    }
-
-
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+
+@asynccontextmanager
+async def lifespan(app: "FastAPI"):
+    from app.core.events import create_broker, event_bus
+    from app.db.base import dispose_engine, get_engine, get_replica_engines
+    from app.exports import pdf_cache
+    from app.jobs.runner import job_runner
+    
+    get_engine()
+    get_replica_engines()
+    await event_bus.start(create_broker())
+    await job_runner.start()
+    yield
+    await job_runner.stop()
+    await event_bus.stop()
+    pdf_cache.shutdown()
+    dispose_engine()
+
+
+def create_app() -> "FastAPI":
+    """Build the API app (use `uvicorn app.main:create_app --factory` to skip the module-level app)."""
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import PlainTextResponse
+    from app.core.compression import CompressionMiddleware, compression_metrics
+    from app.core.events import event_bus
+    from app.core.metrics import MetricsMiddleware, gauges, metrics_registry
+    from app.core.profiling import ProfilingMiddleware
+    from app.core.security import password_hash_metrics
+    from app.api.endpoints import auth, programs, athletes, jobs
+    from app.exports import pdf_cache
+    
+    app = FastAPI(
+        title="Strength Programs API",
+        description="API for generating and managing strength training programs",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.BACKEND_CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Profiling sits inside the metrics middleware, which owns the per-request SQL stats
+    if settings.PROFILE_TOKEN or settings.PROFILE_SAMPLE_RATE:
+        app.add_middleware(
+            ProfilingMiddleware,
+            directory=settings.PROFILE_DIR,
+            token=settings.PROFILE_TOKEN,
+            sample_rate=settings.PROFILE_SAMPLE_RATE
+        )
+    if settings.COMPRESSION_LEVEL:
+        app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+    app.add_middleware(MetricsMiddleware)
+    if settings.DATABASE_REPLICA_URLS:
+        from app.db.base import ReplicaRoutingMiddleware
+        app.add_middleware(ReplicaRoutingMiddleware)
+    
+    metrics_registry.collectors.clear()
+    metrics_registry.add_collector(lambda: gauges("password_hash", password_hash_metrics.snapshot()))
+    metrics_registry.add_collector(lambda: gauges("pdf_render", pdf_cache.pdf_render_metrics.snapshot()))
+    metrics_registry.add_collector(lambda: gauges("program_reads", programs.program_reads.snapshot()))
+    metrics_registry.add_collector(lambda: gauges("response_compression", compression_metrics.snapshot()))
+    metrics_registry.add_collector(lambda: gauges("program_events", event_bus.snapshot()))
+    
+    # Include routers
+    app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
+    app.include_router(programs.router, prefix="/api/programs", tags=["programs"])
+    app.include_router(athletes.router, prefix="/api/athletes", tags=["athletes"])
+    app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+    
+    @app.get("/")
+    async def root():
+        return {
+            "message": "Strength Programs API",
+            "version": "1.0.0",
+            "docs": "/docs"
+        }
+    
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics():
+        """Request, SQL, password hashing, PDF render and compression metrics in the Prometheus text format."""
+        return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+    
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+    
+    return app
+
+
+def __getattr__(name: str):
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,8 @@
 # Models module
 from app.models.user import User
 from app.models.athlete import Athlete
-from app.models.program import Program, ProgramConfig, ProgramWeek
+from app.models.program import Program, ProgramConfig, ProgramArchive
+from app.models.job import Job
+from app.models.idempotency import IdempotencyKey
+from app.models.program_event import ProgramEvent, ProgramSnapshot
+from app.models.program_template import ProgramTemplate
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Integer, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """The stored outcome of a write sent with an Idempotency-Key header (see app.api.idempotency)."""
+    __tablename__ = "idempotency_keys"
+    
+    key = Column(String(255), primary_key=True)  # sha256 of the principal and the client's key (scoped_key)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of method, path, query and body
+    status_code = Column(Integer, nullable=True)  # NULL while the first request is still running
+    response_body = Column(LargeBinary, nullable=True)  # Serialized JSON, replayed as-is
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
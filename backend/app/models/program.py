@@ -1,10 +1,11 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Enum, Date
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Enum, Date, Index, LargeBinary, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import object_session, relationship
 from sqlalchemy.sql import func
 import uuid
 import enum
 from app.db.base import Base
+from app.programs.dice import packed_weeks
 
 
 class ProgramType(str, enum.Enum):
@@ -22,52 +23,78 @@ class ProgramStatus(str, enum.Enum):
 
 class Program(Base):
     __tablename__ = "programs"
+    __table_args__ = (
+        # Enum columns store the member name, hence 'ACTIVE'
+        Index("ix_programs_athlete_id_active", "athlete_id", postgresql_where=text("status = 'ACTIVE'")),
+        Index("ix_programs_created_by_active", "created_by", postgresql_where=text("status = 'ACTIVE'")),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=True)
-    athlete_id = Column(UUID(as_uuid=True), ForeignKey("athletes.id"), nullable=False)
+    athlete_id = Column(UUID(as_uuid=True), ForeignKey("athletes.id"), nullable=False, index=True)
     program_type = Column(Enum(ProgramType), nullable=False, default=ProgramType.BATTLESHIP)
-    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     start_date = Column(Date, nullable=True)
     status = Column(Enum(ProgramStatus), nullable=False, default=ProgramStatus.DRAFT)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every change; keys caches
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     athlete = relationship("Athlete", back_populates="programs")
     creator = relationship("User")
-    config = relationship("ProgramConfig", back_populates="program", uselist=False)
-    weeks = relationship("ProgramWeek", back_populates="program", order_by="ProgramWeek.week_number")
+    # Children are removed by ON DELETE CASCADE in the database, not loaded and deleted one by one
+    config = relationship("ProgramConfig", back_populates="program", uselist=False,
+                          cascade="all, delete-orphan", passive_deletes=True)
+    # Set once an archived program's config (with its dice) has moved to cold storage
+    archive = relationship("ProgramArchive", back_populates="program", uselist=False,
+                           cascade="all, delete-orphan", passive_deletes=True)
+    
+    @property
+    def weeks(self):
+        """Weeks decoded from the config's packed dice (empty once archived)."""
+        return self.config.weeks if self.config is not None else []
 
 
 class ProgramConfig(Base):
     __tablename__ = "program_configs"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    program_id = Column(UUID(as_uuid=True), ForeignKey("programs.id"), nullable=False)
+    program_id = Column(UUID(as_uuid=True), ForeignKey("programs.id", ondelete="CASCADE"), nullable=False, index=True)
     num_lifts = Column(Integer, nullable=False)  # 3, 4, or 6
     lift_rms = Column(JSONB, nullable=False)  # {"squat": 10, "bench": 8, ...}
     lift_weights = Column(JSONB, nullable=True)  # {"squat": {"H": 225, "M": 185, "L": 155}, ...}
     lift_intensity_rms = Column(JSONB, nullable=True)  # {"squat": {"H": 10, "M": 12, "L": 15}, ...}
     lift_names = Column(JSONB, nullable=True)  # {"squat": "Bench Press", "deadlift": "Conventional Deadlift", ...}
-    weekly_template = Column(JSONB, nullable=True)  # Template structure
+    template_id = Column(Integer, ForeignKey("program_templates.id"), nullable=True, index=True)  # Shared, versioned template
+    dice = Column(LargeBinary, nullable=False)  # Every week's rolls, 2 bits per die (see app.programs.dice)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     program = relationship("Program", back_populates="config")
+    
+    @property
+    def weekly_template(self):
+        """The template's structure, from the per-process template cache."""
+        from app.services.template_service import template_structure
+        
+        return template_structure(object_session(self), self.template_id)
+    
+    @property
+    def weeks(self):
+        """PackedWeek views (week_number, dice_rolls, weekly_data, ...), decoded when read."""
+        return packed_weeks(self)
 
 
-class ProgramWeek(Base):
-    __tablename__ = "program_weeks"
+class ProgramArchive(Base):
+    """Cold storage for an archived program: its config and weeks as one compressed blob."""
+    __tablename__ = "program_archives"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    program_id = Column(UUID(as_uuid=True), ForeignKey("programs.id"), nullable=False)
-    week_number = Column(Integer, nullable=False)  # 1-8 for Battleship
-    dice_roll_1 = Column(Integer, nullable=True)  # Deprecated: kept for backward compatibility
-    dice_roll_2 = Column(Integer, nullable=True)  # Deprecated: kept for backward compatibility
-    dice_rolls = Column(JSONB, nullable=True)  # {"lift_name": [roll1, roll2], ...}
-    weekly_data = Column(JSONB, nullable=False)  # NL values for each lift/intensity
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    program_id = Column(UUID(as_uuid=True), ForeignKey("programs.id", ondelete="CASCADE"), primary_key=True)
+    format_version = Column(Integer, nullable=False, default=1)
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON: {"config": {...}} (v1 also had "weeks": [...])
+    raw_size = Column(Integer, nullable=False)  # Uncompressed JSON size in bytes
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    program = relationship("Program", back_populates="weeks")
+    program = relationship("Program", back_populates="archive")
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class ProgramEvent(Base):
+    """
+    One change to a program, appended in version order and never updated.
+
+    Events are compact deltas (see app.services.history_service for their
+    shapes); `version` is the program version the change produced.
+    """
+    __tablename__ = "program_events"
+    
+    # The key also serves "events of a program after version N" range scans
+    program_id = Column(UUID(as_uuid=True), ForeignKey("programs.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, primary_key=True)
+    type = Column(String(32), nullable=False)  # created, week_rerolled, status_changed, renamed
+    data = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ProgramSnapshot(Base):
+    """A program's replayable state at a version, so rebuilding it only replays the events since."""
+    __tablename__ = "program_snapshots"
+    
+    program_id = Column(UUID(as_uuid=True), ForeignKey("programs.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, primary_key=True)
+    state = Column(JSONB, nullable=False)  # {"name", "status", "rolls": {lift: [[r1, r2] per week]}}
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class ProgramTemplate(Base):
+    """
+    One version of a weekly template, stored once and referenced by every
+    program config that uses it.
+
+    Rows are never updated: changing a template (built-in or custom) adds the
+    next version under the same key, and configs keep pointing at the version
+    they were generated from. Custom keys belong to their creator, so two
+    coaches can both have a "push_pull"; built-in and legacy rows have no
+    creator and share one namespace (NULLs compare equal in the constraints).
+    """
+    __tablename__ = "program_templates"
+    __table_args__ = (
+        UniqueConstraint("created_by", "key", "version", name="uq_program_templates_creator_key_version",
+                         postgresql_nulls_not_distinct=True),
+        # Interning looks templates up by content
+        UniqueConstraint("created_by", "key", "content_hash", name="uq_program_templates_creator_key_content_hash",
+                         postgresql_nulls_not_distinct=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String(64), nullable=False)  # "4_lifts_3_days" for built-ins (app.programs.templates)
+    version = Column(Integer, nullable=False, default=1)
+    name = Column(String, nullable=False)
+    num_lifts = Column(Integer, nullable=False)
+    sessions_per_week = Column(Integer, nullable=False)
+    structure = Column(JSONB, nullable=False)  # The whole template: {"name", "num_lifts", "sessions_per_week", "sessions"}
+    content_hash = Column(String(64), nullable=False)  # sha256 of the canonical JSON of `structure`
+    builtin = Column(Boolean, nullable=False, default=False, server_default="false")
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
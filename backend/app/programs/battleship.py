@@ -4,11 +4,14 @@ Migrated from theBattleship.py
 """
 from random import randint, choice
 import copy
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 WEEKS = 8
 DAYS = ['H', 'M', 'L']
 
+# 4-sided dice with values [1, 2, 4, 6]
+DICE_VALUES = [1, 2, 4, 6]
+
 LIFTS6 = [
     'vert_pull',
     'horz_pull',
@@ -85,8 +88,6 @@ def find_next_roll_tup(lifts_dict: Dict[str, List], lift: str, week: int) -> Tup
     These represent the 4 distinct intensity categories in the lookup table.
     Ensures each week's roll is different from the previous week.
     """
-    DICE_VALUES = [1, 2, 4, 6]
-    
     while True:
         roll_1 = choice(DICE_VALUES)
         roll_2 = choice(DICE_VALUES)
@@ -294,14 +295,24 @@ def assign_reps(lift_rm: int, nl: int) -> List[int]:
     return session_reps
 
 
-def generate_battleship_program(num_lifts: int, lift_rms: Dict[str, int], sessions_per_week: int = None) -> Dict:
+def generate_battleship_program(
+    num_lifts: int,
+    lift_rms: Dict[str, int],
+    sessions_per_week: int = None,
+    constraints: Optional[Dict] = None,
+    template: Optional[Dict] = None
+) -> Dict:
     """
     Main function to generate a complete Battleship program.
-    
+
     Args:
         num_lifts: Number of lifts (3, 4, or 6)
         lift_rms: Dictionary mapping lift names to their RM values
         sessions_per_week: Optional sessions per week (3 or 4), auto-selected if None
+        constraints: Optional volume constraints (see app.programs.constraints).
+            Rolls are then sampled uniformly among those that satisfy them.
+        template: Optional weekly template (e.g. a custom one) instead of the
+            built-in template for num_lifts and sessions_per_week
     
     Returns:
         Dictionary containing the full program with weekly NL values and dice rolls
@@ -316,11 +327,16 @@ def generate_battleship_program(num_lifts: int, lift_rms: Dict[str, int], sessio
             raise ValueError(f"Missing RM value for lift: {lift}")
     
     # Get the appropriate template
-    template = get_template(num_lifts, sessions_per_week)
+    if template is None:
+        template = get_template(num_lifts, sessions_per_week)
     
     # Generate dice rolls
-    empty_lifts_dict = create_lifts_dict(lifts)
-    rolls = weekly_rolls(empty_lifts_dict)
+    if constraints:
+        from app.programs.constraints import constrained_weekly_rolls
+        rolls = constrained_weekly_rolls(lifts, template, constraints)
+    else:
+        empty_lifts_dict = create_lifts_dict(lifts)
+        rolls = weekly_rolls(empty_lifts_dict)
     
     # Create NL structure
     empty_weekly_nl_dict = create_8week_nl_dict(lifts)
@@ -0,0 +1,291 @@
+"""
+Constraint-guided dice search for The Battleship program.
+
+A week's rolls only have 16 outcomes per lift, so instead of rerolling until a
+week "looks right" we enumerate the outcomes, prune branches that can no longer
+satisfy the constraints, count the surviving combinations and sample one of
+them uniformly.
+
+Constraints are plain dictionaries (see ``ProgramConstraints`` in
+``app.schemas.program``), every bound being ``{"min": x, "max": y}`` with
+either side optional:
+
+    {
+        "week_reps": {"max": 400},                # total reps in a week
+        "week_delta": {"min": -60, "max": 40},    # change in total reps vs. the previous week
+        "lift_reps": {"squat": {"max": 120}},     # weekly reps for one lift
+        "intensity_reps": {"L": {"max": 150}},    # weekly reps at one intensity, across lifts
+        "session_reps": {"A": {"max": 90}},       # reps in one session ("*" applies to every session)
+    }
+"""
+from functools import lru_cache
+from random import randrange
+from typing import Dict, List, Optional, Tuple
+
+from app.programs.battleship import DAYS, WEEKS, DICE_VALUES, lookup_nl
+
+ROLL_OUTCOMES = [(roll1, roll2) for roll1 in DICE_VALUES for roll2 in DICE_VALUES]
+
+# NL per intensity for every roll outcome, e.g. {(1, 1): {"H": 6, "M": 21, "L": 33}, ...}
+OUTCOME_NL = {
+    roll: {day: lookup_nl(roll[0], roll[1], day) for day in DAYS}
+    for roll in ROLL_OUTCOMES
+}
+
+
+def _bounds(bound: Optional[Dict]) -> Tuple[float, float]:
+    """Turn a {"min": x, "max": y} dict into a (lo, hi) tuple."""
+    if not bound:
+        return float("-inf"), float("inf")
+    lo = bound.get("min")
+    hi = bound.get("max")
+    return (
+        float("-inf") if lo is None else lo,
+        float("inf") if hi is None else hi,
+    )
+
+
+def week_total(week_nl: Dict[str, Dict[str, int]]) -> int:
+    """Total reps in a week of NL values ({lift: {"H": nl, "M": nl, "L": nl}})."""
+    return sum(sum(intensities.values()) for intensities in week_nl.values())
+
+
+def _build_functionals(
+    lifts: List[str],
+    template: Dict,
+    constraints: Dict,
+    week_bounds: Tuple[float, float],
+) -> List[Tuple[List[Dict[Tuple[int, int], int]], float, float]]:
+    """
+    Build the linear sums the search has to keep within bounds.
+
+    Each functional is (per-lift contribution of every outcome, lo, hi).
+    Only constrained sums are tracked, which keeps the search state small.
+    """
+    functionals = []
+
+    lo, hi = week_bounds
+    if lo != float("-inf") or hi != float("inf"):
+        coefs = [{roll: sum(OUTCOME_NL[roll].values()) for roll in ROLL_OUTCOMES} for _ in lifts]
+        functionals.append((coefs, lo, hi))
+
+    for day, bound in (constraints.get("intensity_reps") or {}).items():
+        if day not in DAYS:
+            raise ValueError(f"Invalid intensity in constraints: {day}. Must be one of {DAYS}.")
+        lo, hi = _bounds(bound)
+        coefs = [{roll: OUTCOME_NL[roll][day] for roll in ROLL_OUTCOMES} for _ in lifts]
+        functionals.append((coefs, lo, hi))
+
+    sessions = template["sessions"]
+    session_constraints = constraints.get("session_reps") or {}
+    for session_name, session_lifts in sessions.items():
+        bound = session_constraints.get(session_name, session_constraints.get("*"))
+        if not bound:
+            continue
+        lo, hi = _bounds(bound)
+        coefs = []
+        for lift in lifts:
+            intensity = session_lifts.get(lift)
+            coefs.append({
+                roll: OUTCOME_NL[roll][intensity] if intensity else 0
+                for roll in ROLL_OUTCOMES
+            })
+        functionals.append((coefs, lo, hi))
+
+    for session_name in session_constraints:
+        if session_name != "*" and session_name not in sessions:
+            raise ValueError(f"Unknown session in constraints: {session_name}")
+
+    return functionals
+
+
+def _lift_options(
+    lift: str,
+    constraints: Dict,
+    exclude: Optional[Tuple[int, int]] = None,
+    fixed: Optional[Tuple[int, int]] = None,
+) -> List[Tuple[int, int]]:
+    """Roll outcomes a single lift may take, after its own per-lift bounds."""
+    candidates = [fixed] if fixed is not None else ROLL_OUTCOMES
+    lo, hi = _bounds((constraints.get("lift_reps") or {}).get(lift))
+    return [
+        roll for roll in candidates
+        if roll != exclude and lo <= sum(OUTCOME_NL[roll].values()) <= hi
+    ]
+
+
+def sample_week_rolls(
+    lifts: List[str],
+    template: Dict,
+    constraints: Dict,
+    previous_rolls: Optional[Dict[str, Tuple[int, int]]] = None,
+    fixed_rolls: Optional[Dict[str, Tuple[int, int]]] = None,
+    neighbour_totals: Tuple[Optional[int], Optional[int]] = (None, None),
+) -> Optional[Dict[str, Tuple[int, int]]]:
+    """
+    Sample one week's rolls uniformly among those satisfying the constraints.
+
+    Args:
+        lifts: Lifts to roll for
+        template: Training template (needed for session constraints)
+        constraints: Constraint dictionary (see module docstring)
+        previous_rolls: Rolls a lift must not repeat (previous week, or the roll being rerolled)
+        fixed_rolls: Lifts whose roll must stay as is
+        neighbour_totals: Total reps of the (previous, next) week, for week_delta
+
+    Returns:
+        {lift: (roll1, roll2)}, or None if no combination satisfies the constraints
+    """
+    previous_rolls = previous_rolls or {}
+    fixed_rolls = fixed_rolls or {}
+
+    for lift in (constraints.get("lift_reps") or {}):
+        if lift not in lifts:
+            raise ValueError(f"Unknown lift in constraints: {lift}")
+
+    # Week-to-week deltas become bounds on this week's total
+    lo, hi = _bounds(constraints.get("week_reps"))
+    delta_lo, delta_hi = _bounds(constraints.get("week_delta"))
+    previous_total, next_total = neighbour_totals
+    if previous_total is not None:
+        lo, hi = max(lo, previous_total + delta_lo), min(hi, previous_total + delta_hi)
+    if next_total is not None:
+        lo, hi = max(lo, next_total - delta_hi), min(hi, next_total - delta_lo)
+
+    options = [
+        _lift_options(lift, constraints, exclude=previous_rolls.get(lift), fixed=fixed_rolls.get(lift))
+        for lift in lifts
+    ]
+    if any(not lift_options for lift_options in options):
+        return None
+
+    functionals = _build_functionals(lifts, template, constraints, (lo, hi))
+
+    # Rolls with the same contribution to every tracked sum are interchangeable,
+    # so the search branches over distinct contributions and weights by group size
+    n = len(lifts)
+    groups = []
+    for i in range(n):
+        by_vector = {}
+        for roll in options[i]:
+            vector = tuple(coefs[i][roll] for coefs, _, _ in functionals)
+            by_vector.setdefault(vector, []).append(roll)
+        groups.append(list(by_vector.items()))
+
+    # Smallest/largest amount each functional can still gain from lift i onwards
+    remaining_min = [[0] * len(functionals) for _ in range(n + 1)]
+    remaining_max = [[0] * len(functionals) for _ in range(n + 1)]
+    for i in range(n - 1, -1, -1):
+        for f in range(len(functionals)):
+            values = [vector[f] for vector, _ in groups[i]]
+            remaining_min[i][f] = remaining_min[i + 1][f] + min(values)
+            remaining_max[i][f] = remaining_max[i + 1][f] + max(values)
+
+    # For the partial sums before lift i: values outside [feasible_lo, feasible_hi]
+    # can no longer meet the bound, values inside [settled_lo, settled_hi] meet it
+    # whatever the remaining lifts roll
+    windows = [
+        [
+            (
+                f_lo - remaining_max[i][f],
+                f_hi - remaining_min[i][f],
+                f_lo - remaining_min[i][f],
+                f_hi - remaining_max[i][f],
+            )
+            for f, (_, f_lo, f_hi) in enumerate(functionals)
+        ]
+        for i in range(n + 1)
+    ]
+
+    def advance(i: int, sums: Tuple, vector: Tuple[int, ...]) -> Optional[Tuple]:
+        """
+        Add lift i's contribution to the partial sums.
+
+        Returns None if some bound can no longer be met. Sums whose bounds are
+        met whatever the remaining lifts roll are replaced by None, so states
+        that only differ in already-settled sums share one cache entry.
+        """
+        advanced = []
+        for value, step, (feasible_lo, feasible_hi, settled_lo, settled_hi) in zip(sums, vector, windows[i + 1]):
+            if value is not None:
+                value += step
+                if value < feasible_lo or value > feasible_hi:
+                    return None
+                if settled_lo <= value <= settled_hi:
+                    value = None
+            advanced.append(value)
+        return tuple(advanced)
+
+    @lru_cache(maxsize=None)
+    def count(i: int, sums: Optional[Tuple]) -> int:
+        """Number of valid completions from lift i given the partial sums."""
+        if sums is None:
+            return 0
+        if i == n:
+            return 1
+        total = 0
+        for vector, rolls in groups[i]:
+            advanced = advance(i, sums, vector)
+            if advanced is not None:
+                total += len(rolls) * count(i + 1, advanced)
+        return total
+
+    sums = advance(-1, tuple(0 for _ in functionals), tuple(0 for _ in functionals))
+    if count(0, sums) == 0:
+        return None
+
+    # Walk down the tree choosing each lift's roll in proportion to its completions
+    week_rolls = {}
+    for i, lift in enumerate(lifts):
+        weighted = [
+            (vector, rolls, len(rolls) * count(i + 1, advance(i, sums, vector)))
+            for vector, rolls in groups[i]
+        ]
+        pick = randrange(sum(weight for _, _, weight in weighted))
+        for vector, rolls, weight in weighted:
+            if pick < weight:
+                break
+            pick -= weight
+        week_rolls[lift] = rolls[pick % len(rolls)]
+        sums = advance(i, sums, vector)
+
+    return week_rolls
+
+
+def constrained_weekly_rolls(
+    lifts: List[str],
+    template: Dict,
+    constraints: Dict,
+    weeks: int = WEEKS,
+) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Generate every week's rolls under the constraints.
+
+    Weeks are sampled in order, each uniformly among the rolls that satisfy the
+    constraints given the week before it (including the usual rule that a lift
+    never repeats the previous week's roll).
+
+    Raises:
+        ValueError: If some week has no roll combination satisfying the constraints
+    """
+    rolls = {lift: [] for lift in lifts}
+    previous_rolls = None
+    previous_total = None
+
+    for week in range(weeks):
+        week_rolls = sample_week_rolls(
+            lifts,
+            template,
+            constraints,
+            previous_rolls=previous_rolls,
+            neighbour_totals=(previous_total, None),
+        )
+        if week_rolls is None:
+            raise ValueError(f"No dice rolls satisfy the constraints for week {week + 1}")
+
+        for lift in lifts:
+            rolls[lift].append(week_rolls[lift])
+        previous_rolls = week_rolls
+        previous_total = week_total({lift: OUTCOME_NL[week_rolls[lift]] for lift in lifts})
+
+    return rolls
@@ -0,0 +1,164 @@
+"""
+Packed storage for a program's dice rolls.
+
+A die only ever shows one of the four DICE_VALUES, so it takes two bits. All of
+a program's rolls live in one bit string (ProgramConfig.dice): week by week,
+each week lift by lift in assign_lifts() order, each lift's two dice in order,
+most significant bits first and zero-padded to a whole byte. A 6-lift, 8-week
+program is 24 bytes (12 for 3 lifts); the week count follows from the length.
+
+Nothing derived is stored. A week's NL values (its ``weekly_data``) come from
+the rolls through the Battleship lookup table when they are read, and
+PackedWeek presents one week with the attributes of the old program_weeks rows,
+so responses, exports and history read it as before.
+"""
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.programs.battleship import DICE_VALUES, assign_lifts
+from app.programs.constraints import OUTCOME_NL
+
+BITS_PER_DIE = 2
+DICE_PER_LIFT = 2
+DIE_MASK = (1 << BITS_PER_DIE) - 1
+DICE_CODES = {value: code for code, value in enumerate(DICE_VALUES)}
+
+# Week rows have no table of their own any more; their ids are derived from the program id
+WEEK_NAMESPACE = uuid.UUID("5b0f3c2e-8d41-4a7b-9e26-71c4d8a0f613")
+
+
+def _week_bits(lifts: Sequence[str]) -> int:
+    return len(lifts) * DICE_PER_LIFT * BITS_PER_DIE
+
+
+def week_count(data: bytes, lifts: Sequence[str]) -> int:
+    """Number of weeks packed in `data` (padding is always shorter than a week)."""
+    return len(data) * 8 // _week_bits(lifts) if lifts else 0
+
+
+def pack_rolls(rolls: Dict[str, Sequence[Sequence[int]]], lifts: Sequence[str]) -> bytes:
+    """Pack {lift: [(r1, r2) per week]} for `lifts` (every lift needs the same number of weeks)."""
+    weeks = len(rolls[lifts[0]]) if lifts else 0
+    value = 0
+    for week in range(weeks):
+        for lift in lifts:
+            for die in rolls[lift][week]:
+                if die not in DICE_CODES:
+                    raise ValueError(f"Invalid dice value for {lift}: {die}")
+                value = (value << BITS_PER_DIE) | DICE_CODES[die]
+    bits = weeks * _week_bits(lifts)
+    padding = -bits % 8
+    return (value << padding).to_bytes((bits + padding) // 8, "big")
+
+
+def _dice_at(data: bytes, lifts: Sequence[str], week_number: int) -> Dict[str, List[int]]:
+    value = int.from_bytes(data, "big")
+    shift = len(data) * 8 - (week_number - 1) * _week_bits(lifts)
+    rolls = {}
+    for lift in lifts:
+        roll = []
+        for _ in range(DICE_PER_LIFT):
+            shift -= BITS_PER_DIE
+            roll.append(DICE_VALUES[(value >> shift) & DIE_MASK])
+        rolls[lift] = roll
+    return rolls
+
+
+def week_rolls(data: bytes, lifts: Sequence[str], week_number: int) -> Dict[str, List[int]]:
+    """{lift: [r1, r2]} for one week (1-based), without decoding the others."""
+    if not 1 <= week_number <= week_count(data, lifts):
+        raise IndexError(f"Week {week_number} is not in the packed rolls")
+    return _dice_at(data, lifts, week_number)
+
+
+def unpack_rolls(data: bytes, lifts: Sequence[str]) -> Dict[str, List[List[int]]]:
+    """{lift: [[r1, r2] per week]}, the inverse of pack_rolls."""
+    rolls: Dict[str, List[List[int]]] = {lift: [] for lift in lifts}
+    for week_number in range(1, week_count(data, lifts) + 1):
+        for lift, roll in _dice_at(data, lifts, week_number).items():
+            rolls[lift].append(roll)
+    return rolls
+
+
+def replace_week_rolls(data: bytes, lifts: Sequence[str], week_number: int, rolls: Dict[str, Sequence[int]]) -> bytes:
+    """`data` with some lifts of one week rerolled (lifts not in `rolls` keep their dice)."""
+    unknown = set(rolls) - set(lifts)
+    if unknown:
+        raise ValueError(f"Unknown lift: {sorted(unknown)[0]}")
+    unpacked = unpack_rolls(data, lifts)
+    if not 1 <= week_number <= week_count(data, lifts):
+        raise IndexError(f"Week {week_number} is not in the packed rolls")
+    for lift, roll in rolls.items():
+        unpacked[lift][week_number - 1] = list(roll)
+    return pack_rolls(unpacked, lifts)
+
+
+def week_nl(dice_rolls: Dict[str, Sequence[int]]) -> Dict[str, Dict[str, int]]:
+    """A week's weekly_data ({lift: {"H": nl, "M": nl, "L": nl}}) from its rolls."""
+    return {lift: dict(OUTCOME_NL[tuple(roll)]) for lift, roll in dice_rolls.items()}
+
+
+def week_id(program_id: uuid.UUID, week_number: int) -> uuid.UUID:
+    """Stable id for a week (weeks used to be rows with their own ids)."""
+    return uuid.uuid5(WEEK_NAMESPACE, f"{program_id}:{week_number}")
+
+
+class PackedWeek:
+    """
+    One week of a program's packed rolls, read through its config. Attributes
+    are decoded on access, so a week reflects the config's current dice.
+    """
+
+    def __init__(self, config: Any, week_number: int):
+        self.config = config
+        self.week_number = week_number
+
+    @property
+    def id(self) -> uuid.UUID:
+        return week_id(self.program_id, self.week_number)
+
+    @property
+    def program_id(self) -> uuid.UUID:
+        return self.config.program_id
+
+    @property
+    def created_at(self) -> Any:
+        return self.config.created_at
+
+    @property
+    def dice_rolls(self) -> Dict[str, List[int]]:
+        return week_rolls(self.config.dice, assign_lifts(self.config.num_lifts), self.week_number)
+
+    @property
+    def weekly_data(self) -> Dict[str, Dict[str, int]]:
+        return week_nl(self.dice_rolls)
+
+    @property
+    def dice_roll_1(self) -> Optional[int]:  # Deprecated: the first lift's rolls
+        return next(iter(self.dice_rolls.values()), [None, None])[0]
+
+    @property
+    def dice_roll_2(self) -> Optional[int]:  # Deprecated
+        return next(iter(self.dice_rolls.values()), [None, None])[1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        dice_rolls = self.dice_rolls
+        first = next(iter(dice_rolls.values()), [None, None])
+        return {
+            "id": self.id,
+            "program_id": self.program_id,
+            "week_number": self.week_number,
+            "dice_roll_1": first[0],
+            "dice_roll_2": first[1],
+            "dice_rolls": dice_rolls,
+            "weekly_data": week_nl(dice_rolls),
+            "created_at": self.created_at,
+        }
+
+
+def packed_weeks(config: Any) -> List[PackedWeek]:
+    """The weeks of a config (anything with program_id, num_lifts, dice and created_at)."""
+    if config is None or not config.dice:
+        return []
+    return [PackedWeek(config, week_number)
+            for week_number in range(1, week_count(config.dice, assign_lifts(config.num_lifts)) + 1)]
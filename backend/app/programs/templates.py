@@ -1,7 +1,14 @@
 """
 Weekly templates for The Battleship program.
 Each template defines which lifts are performed at which intensity on each session.
+
+These are the built-in templates. Programs reference templates stored once in
+the program_templates table (see app.services.template_service), which also
+holds custom ones.
 """
+import hashlib
+import json
+from typing import Dict, Optional
 
 # Template for 3 lifts, 3 sessions/week
 TEMPLATE_3_LIFTS_3_DAYS = {
@@ -163,3 +170,43 @@ def get_available_templates():
         for key, template in TEMPLATES.items()
     ]
 
+
+
+def template_key(template: Dict) -> Optional[str]:
+    """Key of a built-in template (by content), or None for anything else."""
+    for key, builtin in TEMPLATES.items():
+        if builtin is template or builtin == template:
+            return key
+    return None
+
+
+def template_hash(template: Dict) -> str:
+    """sha256 of a template's canonical JSON, so equal templates hash alike whatever their key order."""
+    canonical = json.dumps(template, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def validate_template(template: Dict) -> None:
+    """
+    Check that a template fits The Battleship: sessions map lifts of its lift
+    count to H/M/L, and every lift is trained at each intensity exactly once a
+    week (each weekly NL value lands in one session). Raises ValueError.
+    """
+    from app.programs.battleship import DAYS, assign_lifts
+
+    lifts = assign_lifts(template["num_lifts"])
+    slots = []
+    for session, session_lifts in template["sessions"].items():
+        for lift, intensity in session_lifts.items():
+            if lift not in lifts:
+                raise ValueError(f"Session {session}: unknown lift {lift} (expected one of: {', '.join(lifts)})")
+            if intensity not in DAYS:
+                raise ValueError(f"Session {session}: intensity for {lift} must be one of {', '.join(DAYS)}")
+            slots.append((lift, intensity))
+    for lift in lifts:
+        for intensity in DAYS:
+            count = slots.count((lift, intensity))
+            if count != 1:
+                raise ValueError(f"{lift} must be trained at {intensity} exactly once a week (found {count})")
+    if len(template["sessions"]) != template["sessions_per_week"]:
+        raise ValueError(f"Expected {template['sessions_per_week']} sessions, found {len(template['sessions'])}")
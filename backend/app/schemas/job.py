@@ -0,0 +1,51 @@
+from pydantic import BaseModel, Field
+from uuid import UUID
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.models.job import JobStatus
+from app.schemas.program import ProgramCreate, ProgramBulkRequest
+from app.exports.render import ExportFormat, ExportView
+
+
+class CreateProgramsParams(BaseModel):
+    """Params of a `create_programs` job."""
+    programs: List[ProgramCreate] = Field(min_length=1)
+
+
+class ExportProgramsParams(BaseModel):
+    """Params of an `export_programs` job: the zip is kept on disk for download."""
+    selection: ProgramBulkRequest
+    format: ExportFormat = ExportFormat.MARKDOWN
+    view: ExportView = ExportView.COACH
+
+
+class ArchiveOldProgramsParams(BaseModel):
+    """Params of an `archive_old_programs` backfill job."""
+    older_than_days: int = Field(default=30, ge=0)
+    batch_size: int = Field(default=100, ge=1)
+
+
+class JobCreate(BaseModel):
+    kind: str  # create_programs, export_programs or archive_old_programs
+    params: Dict[str, Any] = {}
+    idempotency_key: Optional[str] = None
+    max_attempts: Optional[int] = Field(default=None, ge=1)
+    created_by: Optional[UUID] = None
+
+
+class JobResponse(BaseModel):
+    id: UUID
+    kind: str
+    status: JobStatus
+    progress_done: int
+    progress_total: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
 from datetime import date, datetime
 from typing import Dict, List, Optional, Union
@@ -11,7 +11,8 @@ class ProgramConfigBase(BaseModel):
     lift_weights: Optional[Dict[str, Dict[str, Union[float, str]]]] = None  # {"squat": {"H": 225, "M": 185, "L": "Push Ups"}, ...}
     lift_intensity_rms: Optional[Dict[str, Dict[str, int]]] = None  # {"squat": {"H": 10, "M": 12, "L": 15}, ...}
     lift_names: Optional[Dict[str, str]] = None  # {"squat": "Bench Press", "deadlift": "Conventional Deadlift", ...}
-    weekly_template: Optional[Dict] = None
+    weekly_template: Optional[Dict] = None  # The referenced template's structure
+    template_id: Optional[int] = None  # program_templates row (GET /programs/templates)
 
 
 class ProgramWeekBase(BaseModel):
@@ -40,6 +41,20 @@ class ProgramConfigResponse(ProgramConfigBase):
         from_attributes = True
 
 
+class RepRange(BaseModel):
+    min: Optional[int] = None
+    max: Optional[int] = None
+
+
+class ProgramConstraints(BaseModel):
+    """Volume constraints for constraint-guided dice rolls (see app.programs.constraints)."""
+    week_reps: Optional[RepRange] = None  # Total reps in a week
+    week_delta: Optional[RepRange] = None  # Change in total reps vs. the previous week
+    lift_reps: Optional[Dict[str, RepRange]] = None  # {"squat": {"max": 120}, ...} weekly reps per lift
+    intensity_reps: Optional[Dict[str, RepRange]] = None  # {"L": {"max": 150}} weekly reps per intensity
+    session_reps: Optional[Dict[str, RepRange]] = None  # {"A": {"max": 90}} or {"*": ...} for every session
+
+
 class ProgramCreate(BaseModel):
     name: Optional[str] = None
     athlete_id: UUID
@@ -50,7 +65,9 @@ class ProgramCreate(BaseModel):
     lift_intensity_rms: Optional[Dict[str, Dict[str, int]]] = None  # {"squat": {"H": 10, "M": 12, "L": 15}, ...}
     lift_names: Optional[Dict[str, str]] = None  # {"squat": "Bench Press", "deadlift": "Conventional Deadlift", ...}
     sessions_per_week: Optional[int] = None
+    template_id: Optional[int] = None  # A stored template (built-in or custom); overrides sessions_per_week
     start_date: Optional[date] = None
+    constraints: Optional[ProgramConstraints] = None
 
 
 class ProgramResponse(BaseModel):
@@ -61,9 +78,118 @@ class ProgramResponse(BaseModel):
     created_by: UUID
     start_date: Optional[date]
     status: ProgramStatus
+    version: int = 1
     created_at: datetime
     config: Optional[ProgramConfigResponse] = None
     weeks: List[ProgramWeekResponse] = []
     
     class Config:
         from_attributes = True
+
+
+# Parts of a ProgramResponse that live in other tables and can be left out of detail reads
+PROGRAM_PARTS = ("config", "weeks")
+
+
+class ProgramSummary(BaseModel):
+    """Program list row: program columns plus the lift count, without config or weeks."""
+    id: UUID
+    name: Optional[str] = None
+    athlete_id: UUID
+    program_type: ProgramType
+    created_by: UUID
+    start_date: Optional[date]
+    status: ProgramStatus
+    version: int = 1
+    created_at: datetime
+    num_lifts: Optional[int] = None  # None once archived (the config is in cold storage)
+    
+    class Config:
+        from_attributes = True
+
+
+class ProgramTemplateCreate(BaseModel):
+    """A custom weekly template; posting new content under one of your keys adds its next version."""
+    key: str = Field(..., min_length=1, max_length=64, pattern=r"^[a-z0-9_]+$")
+    name: str
+    num_lifts: int  # 3, 4, or 6
+    sessions: Dict[str, Dict[str, str]]  # {"A": {"squat": "H", ...}, ...}: lift -> intensity per session
+    created_by: UUID  # Keys are per creator; only the creator can list and use the template
+
+
+class ProgramTemplateResponse(BaseModel):
+    id: int
+    key: str
+    version: int
+    name: str
+    num_lifts: int
+    sessions_per_week: int
+    builtin: bool
+    structure: Dict
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class SessionLift(BaseModel):
+    """One lift of a session as the program view shows it."""
+    lift: str
+    name: str
+    intensity: str  # H, M or L
+    total_reps: int
+    weight: Union[float, str]  # 0 when no weight is set
+    rm: int
+    rep_scheme: str  # "3 sets: 5, 5, 3"
+
+
+class ProgramWeekView(BaseModel):
+    """A single week, with its sessions already laid out (GET /programs/{id}/weeks/{n})."""
+    program_id: UUID
+    version: int
+    week_number: int
+    dice_rolls: Optional[Dict[str, List[int]]] = None
+    sessions: Dict[str, List[SessionLift]]  # Covers every lift/intensity of the week's weekly_data
+
+
+class ProgramSessionView(BaseModel):
+    """A single session of one week (GET /programs/{id}/weeks/{n}/sessions/{session})."""
+    program_id: UUID
+    version: int
+    week_number: int
+    session: str
+    lifts: List[SessionLift]
+
+
+class ProgramEventResponse(BaseModel):
+    """One entry of a program's history (data shapes: see app.services.history_service)."""
+    version: int
+    type: str
+    data: Dict
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class ProgramStateResponse(BaseModel):
+    """A program's name, status and weeks as they were at a version, rebuilt from its history."""
+    program_id: UUID
+    version: int
+    name: Optional[str] = None
+    status: ProgramStatus
+    weeks: List[ProgramWeekBase]
+
+
+class ProgramBulkRequest(BaseModel):
+    """Selects programs for bulk operations; criteria are combined with AND."""
+    program_ids: Optional[List[UUID]] = None
+    status: Optional[ProgramStatus] = None
+    athlete_id: Optional[UUID] = None
+    created_by: Optional[UUID] = None
+    coach_id: Optional[UUID] = None
+    created_before: Optional[datetime] = None
+
+
+class ProgramBulkResult(BaseModel):
+    count: int
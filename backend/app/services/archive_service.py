@@ -0,0 +1,207 @@
+"""
+Cold storage for archived programs.
+
+Archiving moves a program's config (which holds its packed dice) out of the
+hot program_configs table into a zlib-compressed JSON blob in
+program_archives. Reads decompress on demand and decode the weeks from the
+dice; restoring (un-archiving) moves the row back. Archives written before the
+dice were packed (format version 1) also stored every week row, and archives
+from before templates were interned hold the template inline; both are still
+read and restored.
+
+Run the batched job over programs archived in bulk (which stay hot until then):
+
+    python -m app.services.archive_service --older-than-days 30
+"""
+import argparse
+import json
+import uuid
+import zlib
+from datetime import datetime, date, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session, object_session, selectinload
+
+from app.models.program import Program, ProgramConfig, ProgramArchive, ProgramStatus
+from app.programs.battleship import assign_lifts
+from app.programs.dice import pack_rolls, packed_weeks
+from app.services.template_service import TemplateService, template_structure
+
+ARCHIVE_FORMAT_VERSION = 2
+READABLE_FORMAT_VERSIONS = (1, 2)
+COMPRESSION_LEVEL = 9
+
+
+def _row_to_dict(row) -> Dict[str, Any]:
+    """All column values of an ORM row."""
+    return {column.name: getattr(row, column.name) for column in row.__table__.columns}
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def pack_program(config: Optional[ProgramConfig]) -> tuple:
+    """Compress a program's config (packed dice as hex). Returns (payload, raw_size)."""
+    data = {"config": _row_to_dict(config) if config else None}
+    raw = json.dumps(data, default=_json_default, separators=(",", ":")).encode()
+    return zlib.compress(raw, COMPRESSION_LEVEL), len(raw)
+
+
+def _legacy_dice(config: Dict[str, Any], weeks: List[Dict[str, Any]]) -> bytes:
+    """Pack the week rows of a version 1 archive (weeks without per-lift rolls used the deprecated pair)."""
+    lifts = assign_lifts(config["num_lifts"])
+    rolls = {lift: [] for lift in lifts}
+    for week in sorted(weeks, key=lambda week: week["week_number"]):
+        legacy = [week.get("dice_roll_1") or 1, week.get("dice_roll_2") or 1]
+        for lift in lifts:
+            rolls[lift].append((week.get("dice_rolls") or {}).get(lift, legacy))
+    return pack_rolls(rolls, lifts)
+
+
+def _parse_row(model, data: Dict[str, Any]):
+    """Rebuild an ORM row from archived column values."""
+    values = dict(data)
+    for key in ("id", "program_id"):
+        if values.get(key):
+            values[key] = uuid.UUID(values[key])
+    if values.get("created_at"):
+        values["created_at"] = datetime.fromisoformat(values["created_at"])
+    if isinstance(values.get("dice"), str):
+        values["dice"] = bytes.fromhex(values["dice"])
+    return model(**values)
+
+
+def _archived_config(archive: ProgramArchive) -> tuple:
+    """
+    The archived config as a detached ProgramConfig (with dice, whatever the
+    format version), and the template archived inline with it by older
+    versions (None once configs reference a stored template). Returns (None, None) without a config.
+    """
+    if archive.format_version not in READABLE_FORMAT_VERSIONS:
+        raise ValueError(f"Unsupported archive format version: {archive.format_version}")
+    data = json.loads(zlib.decompress(archive.payload))
+    if not data["config"]:
+        return None, None
+    if archive.format_version == 1:
+        data["config"]["dice"] = _legacy_dice(data["config"], data["weeks"])
+    inline_template = data["config"].pop("weekly_template", None)
+    return _parse_row(ProgramConfig, data["config"]), inline_template
+
+
+def unpack_program(archive: ProgramArchive) -> Dict[str, Any]:
+    """Decompress an archive into {"config": {...} or None, "weeks": [...]}, the weeks decoded from the dice."""
+    config, inline_template = _archived_config(archive)
+    if config is None:
+        return {"config": None, "weeks": []}
+    data = _row_to_dict(config)
+    data["weekly_template"] = inline_template or template_structure(object_session(archive), config.template_id)
+    return {"config": data, "weeks": [week.to_dict() for week in packed_weeks(config)]}
+
+
+class ArchiveService:
+    """Service for moving archived programs to and from cold storage."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def archive_program(self, program: Program) -> ProgramArchive:
+        """Move a program's config into cold storage (the caller commits)."""
+        if program.archive is not None:
+            return program.archive
+
+        payload, raw_size = pack_program(program.config)
+        archive = ProgramArchive(
+            program_id=program.id,
+            format_version=ARCHIVE_FORMAT_VERSION,
+            payload=payload,
+            raw_size=raw_size
+        )
+        self.db.add(archive)
+        program.status = ProgramStatus.ARCHIVED
+
+        self.db.execute(delete(ProgramConfig).where(ProgramConfig.program_id == program.id))
+        self.db.flush()
+        self.db.expire(program, ["config", "archive"])
+        return archive
+
+    def restore_program(self, program: Program) -> None:
+        """Move a program's config back from cold storage (the caller commits)."""
+        if program.archive is None:
+            return
+
+        config, inline_template = _archived_config(program.archive)
+        if config is not None:
+            if inline_template is not None:
+                config.template_id = TemplateService(self.db).intern_any(inline_template)
+            self.db.add(config)
+
+        self.db.delete(program.archive)
+        self.db.flush()
+        self.db.expire(program, ["config", "archive"])
+
+    def archive_old_programs(
+        self,
+        older_than: datetime,
+        batch_size: int = 100,
+        on_batch: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """
+        Move archived programs last updated before `older_than` into cold storage.
+
+        Works in batches, committing after each (and calling `on_batch` with the
+        running total). Returns the number of programs moved.
+        """
+        moved = 0
+        while True:
+            programs = (
+                self.db.query(Program)
+                .options(selectinload(Program.config))
+                .outerjoin(ProgramArchive)
+                .filter(
+                    Program.status == ProgramStatus.ARCHIVED,
+                    ProgramArchive.program_id.is_(None),
+                    (Program.updated_at < older_than)
+                    | (Program.updated_at.is_(None) & (Program.created_at < older_than))
+                )
+                .limit(batch_size)
+                .all()
+            )
+            if not programs:
+                return moved
+
+            for program in programs:
+                self.archive_program(program)
+            self.db.commit()
+            moved += len(programs)
+            if on_batch is not None:
+                on_batch(moved)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old archived programs into cold storage.")
+    parser.add_argument("--older-than-days", type=int, default=30,
+                        help="Only programs archived/updated more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    from app.db.base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        older_than = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+        moved = ArchiveService(db).archive_old_programs(older_than, batch_size=args.batch_size)
+        print(f"Moved {moved} archived programs to cold storage")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
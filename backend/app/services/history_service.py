@@ -0,0 +1,169 @@
+"""
+Append-only program history.
+
+Every change to a program is stored as a compact event in program_events,
+keyed by the program version it produced:
+
+    created         {"name", "status", "rolls": {lift: [[r1, r2], ...one pair per week]}}
+    week_rerolled   {"week": 3, "rolls": {lift: [[old r1, r2], [new r1, r2]]}}
+    status_changed  {"from": "draft", "to": "active"}
+    renamed         {"from": "Old name", "to": "New name"}
+
+An undo appends the inverse change with "undo_of": <version>. A program's state
+at a version (name, status and dice rolls; weekly NL values follow from the
+rolls) is rebuilt from the latest snapshot or `created` event at or before it,
+plus the events since. A snapshot is written every PROGRAM_SNAPSHOT_INTERVAL
+versions, which keeps replays short. Programs created before the log existed
+get a baseline snapshot on their first logged change.
+"""
+import copy
+from sqlalchemy import exists, or_, select
+from sqlalchemy.orm import Session, selectinload
+from uuid import UUID
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.models.program import Program
+from app.models.program_event import ProgramEvent, ProgramSnapshot
+from app.programs.battleship import DAYS, lookup_nl
+from app.services.archive_service import unpack_program
+
+UNDOABLE_TYPES = ("week_rerolled", "status_changed", "renamed")
+
+
+def weeks_rolls(weeks: List[Any]) -> Dict[str, List[List[int]]]:
+    """{lift: [[r1, r2] per week]} from a program's (packed) weeks or archived week dicts."""
+    rolls: Dict[str, List[List[int]]] = {}
+    for week in sorted(weeks, key=lambda week: _field(week, "week_number")):
+        dice_rolls = _field(week, "dice_rolls") or {}
+        for lift, roll in dice_rolls.items():
+            rolls.setdefault(lift, []).append(list(roll))
+    return rolls
+
+
+def _field(row: Any, name: str) -> Any:
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def apply_event(state: Dict[str, Any], event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """The state after an event (`state` is modified in place, and returned)."""
+    if event_type == "created":
+        return copy.deepcopy({"name": data["name"], "status": data["status"], "rolls": data["rolls"]})
+    if event_type == "week_rerolled":
+        for lift, (_old, new) in data["rolls"].items():
+            state["rolls"][lift][data["week"] - 1] = list(new)
+    elif event_type == "status_changed":
+        state["status"] = data["to"]
+    elif event_type == "renamed":
+        state["name"] = data["to"]
+    return state
+
+
+def state_weeks(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Week rows (week_number, dice_rolls, weekly_data) for a rebuilt state."""
+    weeks = []
+    week_count = max((len(rolls) for rolls in state["rolls"].values()), default=0)
+    for index in range(week_count):
+        dice_rolls = {lift: rolls[index] for lift, rolls in state["rolls"].items()}
+        weekly_data = {lift: {day: lookup_nl(roll[0], roll[1], day) for day in DAYS} for lift, roll in dice_rolls.items()}
+        weeks.append({"week_number": index + 1, "dice_rolls": dice_rolls, "weekly_data": weekly_data})
+    return weeks
+
+
+class HistoryService:
+    """Service for a program's event log, snapshots and point-in-time state."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, program_id: UUID, version: int, event_type: str, data: Dict[str, Any]) -> None:
+        """Append an event (in the caller's transaction) and snapshot if the last one is far enough behind."""
+        self.db.add(ProgramEvent(program_id=program_id, version=version, type=event_type, data=data))
+        if event_type == "created":
+            return
+        self.db.flush()
+        base = self._base(program_id, version)
+        if base is not None and version - base[0] >= settings.PROGRAM_SNAPSHOT_INTERVAL:
+            state = self.state_at(program_id, version)
+            self.db.add(ProgramSnapshot(program_id=program_id, version=version, state=state))
+
+    def ensure_baseline(self, program: Program) -> None:
+        """Snapshot a program's current state if its history has no starting point yet (pre-log programs)."""
+        if self._base(program.id, program.version) is not None:
+            return
+        self.db.add(self._baseline(program))
+
+    def ensure_baselines(self, *criteria) -> None:
+        """
+        ensure_baseline for every program matching `criteria` (bulk changes):
+        one query finds and locks those without a starting point, and their
+        snapshots are added together.
+        """
+        has_history = or_(
+            exists().where(ProgramSnapshot.program_id == Program.id),
+            exists().where(ProgramEvent.program_id == Program.id, ProgramEvent.type == "created"),
+        )
+        programs = self.db.execute(
+            select(Program)
+            .where(*criteria, ~has_history)
+            .options(selectinload(Program.config), selectinload(Program.archive))
+            .with_for_update(of=Program)
+        ).scalars().all()
+        self.db.add_all(self._baseline(program) for program in programs)
+        self.db.flush()
+
+    def _baseline(self, program: Program) -> ProgramSnapshot:
+        weeks = unpack_program(program.archive)["weeks"] if program.archive is not None else program.weeks
+        state = {"name": program.name, "status": program.status.value, "rolls": weeks_rolls(weeks)}
+        return ProgramSnapshot(program_id=program.id, version=program.version, state=state)
+
+    def _base(self, program_id: UUID, version: int) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """(version, state) of the latest snapshot or created event at or before `version`."""
+        snapshot = self.db.execute(
+            select(ProgramSnapshot.version, ProgramSnapshot.state)
+            .where(ProgramSnapshot.program_id == program_id, ProgramSnapshot.version <= version)
+            .order_by(ProgramSnapshot.version.desc())
+            .limit(1)
+        ).first()
+        if snapshot is not None:
+            return snapshot.version, snapshot.state
+        created = self.db.execute(
+            select(ProgramEvent.version, ProgramEvent.data)
+            .where(ProgramEvent.program_id == program_id, ProgramEvent.type == "created", ProgramEvent.version <= version)
+        ).first()
+        if created is not None:
+            return created.version, apply_event({}, "created", created.data)
+        return None
+
+    def state_at(self, program_id: UUID, version: int) -> Optional[Dict[str, Any]]:
+        """{"name", "status", "rolls"} as of `version`, or None if history does not reach back that far."""
+        base = self._base(program_id, version)
+        if base is None:
+            return None
+        base_version, state = base
+        state = copy.deepcopy(state)
+        events = self.db.execute(
+            select(ProgramEvent.type, ProgramEvent.data)
+            .where(ProgramEvent.program_id == program_id, ProgramEvent.version > base_version, ProgramEvent.version <= version)
+            .order_by(ProgramEvent.version)
+        ).all()
+        for event_type, data in events:
+            state = apply_event(state, event_type, data)
+        return state
+
+    def list_events(self, program_id: UUID) -> List[ProgramEvent]:
+        return (
+            self.db.query(ProgramEvent)
+            .filter(ProgramEvent.program_id == program_id)
+            .order_by(ProgramEvent.version)
+            .all()
+        )
+
+    def last_undoable(self, program_id: UUID) -> Optional[ProgramEvent]:
+        """The most recent change not yet undone (undos themselves are not undone; there is no redo)."""
+        undone = set()
+        for event in reversed(self.list_events(program_id)):
+            if "undo_of" in event.data:
+                undone.add(event.data["undo_of"])
+            elif event.type in UNDOABLE_TYPES and event.version not in undone:
+                return event
+        return None
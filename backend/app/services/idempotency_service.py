@@ -0,0 +1,103 @@
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from random import random
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.models.idempotency import IdempotencyKey
+
+# Fraction of claims that also sweep every expired key
+PURGE_PROBABILITY = 0.01
+
+
+class ClaimLost(Exception):
+    """Raised when a request's claim on its key was taken over by a retry."""
+
+
+class IdempotencyService:
+    """Service for claiming idempotency keys and storing the responses they replay."""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_key(self, key: str) -> Optional[IdempotencyKey]:
+        return self.db.query(IdempotencyKey).filter(IdempotencyKey.key == key).first()
+    
+    def claim(self, key: str, fingerprint: str) -> Tuple[IdempotencyKey, bool]:
+        """
+        Claim a key for a new request. Returns (record, claimed).
+
+        When the key is already taken (and neither expired nor abandoned by a
+        request that never finished), the existing record is returned instead.
+        """
+        now = datetime.now(timezone.utc)
+        expired = IdempotencyKey.expires_at <= now
+        abandoned = and_(
+            IdempotencyKey.status_code.is_(None),
+            IdempotencyKey.created_at <= now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+        )
+        if random() < PURGE_PROBABILITY:
+            self.db.execute(delete(IdempotencyKey).where(expired))
+        self.db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key, or_(expired, abandoned)))
+        
+        record = IdempotencyKey(
+            key=key,
+            fingerprint=fingerprint,
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        )
+        self.db.add(record)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Already claimed, possibly by a concurrent retry
+            self.db.rollback()
+            existing = self.get_key(key)
+            if existing is None:
+                raise
+            return existing, False
+        return record, True
+    
+    def lock(self, key: str, claimed_at: datetime) -> bool:
+        """
+        Lock this request's claim (created at `claimed_at`) until the session's
+        transaction ends, so a retry that finds it old enough to take over waits
+        for the outcome instead. False if a retry took it over already.
+        """
+        return self.db.execute(
+            select(IdempotencyKey.key)
+            .where(self._claim(key, claimed_at))
+            .with_for_update()
+        ).first() is not None
+    
+    def complete(self, key: str, claimed_at: datetime, status_code: int, body: bytes) -> None:
+        """
+        Store the response of a claimed key so retries replay it (committed
+        with the session, so in the same transaction as the request's writes).
+        Raises ClaimLost if the claim is no longer this request's.
+        """
+        result = self.db.execute(
+            update(IdempotencyKey)
+            .where(self._claim(key, claimed_at))
+            .values(status_code=status_code, response_body=body),
+            execution_options={"synchronize_session": False}
+        )
+        if result.rowcount != 1:
+            raise ClaimLost(key)
+        self.db.commit()
+    
+    def release(self, key: str, claimed_at: datetime) -> None:
+        """Give up a claimed key after the request failed, discarding the request's uncommitted changes."""
+        self.db.rollback()
+        self.db.execute(delete(IdempotencyKey).where(self._claim(key, claimed_at)))
+        self.db.commit()
+    
+    @staticmethod
+    def _claim(key: str, claimed_at: datetime):
+        # A retry that takes a claim over replaces the row, with a new created_at
+        return and_(
+            IdempotencyKey.key == key,
+            IdempotencyKey.created_at == claimed_at,
+            IdempotencyKey.status_code.is_(None)
+        )
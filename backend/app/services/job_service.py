@@ -0,0 +1,60 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from uuid import UUID
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.jobs.handlers import JOB_KINDS
+from app.models.job import Job
+from app.schemas.job import JobCreate
+
+
+class JobService:
+    """Service for creating and looking up background jobs."""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_job(self, job_id: UUID) -> Optional[Job]:
+        """Get a job by ID."""
+        return self.db.query(Job).filter(Job.id == job_id).first()
+    
+    def get_job_by_key(self, idempotency_key: str) -> Optional[Job]:
+        return self.db.query(Job).filter(Job.idempotency_key == idempotency_key).first()
+    
+    def create_job(self, job_data: JobCreate) -> Tuple[Job, bool]:
+        """
+        Persist a new QUEUED job after validating its params.
+
+        With an idempotency key that was already used, the existing job is returned
+        instead. Returns (job, created).
+        """
+        kind = JOB_KINDS.get(job_data.kind)
+        if kind is None:
+            raise ValueError(f"Unknown job kind '{job_data.kind}'. Expected one of: {', '.join(JOB_KINDS)}")
+        params = kind.params.model_validate(job_data.params)
+        
+        if job_data.idempotency_key:
+            existing = self.get_job_by_key(job_data.idempotency_key)
+            if existing is not None:
+                return existing, False
+        
+        job = Job(
+            kind=job_data.kind,
+            params=params.model_dump(mode="json"),
+            idempotency_key=job_data.idempotency_key,
+            max_attempts=job_data.max_attempts or settings.JOB_MAX_ATTEMPTS,
+            created_by=job_data.created_by
+        )
+        self.db.add(job)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent submit using the same key
+            self.db.rollback()
+            existing = self.get_job_by_key(job_data.idempotency_key) if job_data.idempotency_key else None
+            if existing is None:
+                raise
+            return existing, False
+        
+        self.db.refresh(job)
+        return job, True
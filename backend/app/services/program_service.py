@@ -1,27 +1,66 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session, selectinload
+from datetime import datetime
 from uuid import UUID
-from typing import List, Optional, Dict, Any
-from app.models.program import Program, ProgramConfig, ProgramWeek, ProgramType, ProgramStatus
-from app.schemas.program import ProgramCreate
-from app.programs.battleship import generate_battleship_program
+from typing import Iterable, Iterator, List, Optional, Dict, Any
+from app.models.athlete import Athlete
+from app.models.program import Program, ProgramArchive, ProgramConfig, ProgramType, ProgramStatus
+from app.schemas.program import PROGRAM_PARTS, ProgramCreate, ProgramResponse, ProgramSummary
+from app.programs.battleship import generate_battleship_program, assign_lifts, DICE_VALUES, WEEKS
+from app.programs.dice import PackedWeek, pack_rolls, replace_week_rolls, week_count, week_nl, week_rolls
+from app.programs.constraints import sample_week_rolls, week_total
+from app.services.archive_service import ArchiveService, unpack_program
+from app.services.history_service import HistoryService
+from app.services.template_service import TemplateService, template_structure
+from app.models.program_event import ProgramEvent
+from app.exports import pdf_cache
+from app.core.events import event_bus
 from random import choice
 
 
+def program_topic(program_id: UUID) -> str:
+    """Pub/sub topic carrying a program's live updates (GET /programs/{id}/events)."""
+    return f"program:{program_id}"
+
+
 class ProgramService:
     """Service for managing strength programs."""
     
     def __init__(self, db: Session):
         self.db = db
     
-    def create_battleship_program(self, program_data: ProgramCreate) -> Program:
-        """Create a new Battleship program with all weeks generated."""
+    def _publish(self, program_id: UUID, event_type: str, **delta) -> None:
+        """Announce a committed change to live subscribers as a compact delta."""
+        event_bus.publish(program_topic(program_id), {"type": event_type, "program_id": program_id, **delta})
+    
+    def create_battleship_program(self, program_data: ProgramCreate, program_id: Optional[UUID] = None) -> Program:
+        """
+        Create a new Battleship program with all weeks generated.
+
+        `program_id` lets callers that may retry (background jobs) choose the id up front.
+        Raises TemplateNotFound if template_id is neither a built-in nor the creator's own.
+        """
+        template = None
+        if program_data.template_id is not None:
+            template = TemplateService(self.db).usable_structure(program_data.template_id, program_data.created_by)
+            if template["num_lifts"] != program_data.num_lifts:
+                raise ValueError(f"Template {program_data.template_id} is for {template['num_lifts']} lifts")
+        
         # Generate the program using Battleship logic
         sessions_per_week = getattr(program_data, 'sessions_per_week', None)
+        constraints = program_data.constraints.model_dump(exclude_none=True) if program_data.constraints else None
         battleship_data = generate_battleship_program(
             num_lifts=program_data.num_lifts,
             lift_rms=program_data.lift_rms,
-            sessions_per_week=sessions_per_week
+            sessions_per_week=sessions_per_week,
+            constraints=constraints,
+            template=template
         )
+        if template is not None:
+            template_id = program_data.template_id
+        else:
+            # Built-in templates are stored once and shared by every program using them
+            template_id = TemplateService(self.db).intern_any(battleship_data["template"])
         
         # Create Program record
         program = Program(
@@ -32,10 +71,14 @@ class ProgramService:
             start_date=program_data.start_date,
             status=ProgramStatus.DRAFT
         )
+        if program_id is not None:
+            program.id = program_id
         self.db.add(program)
         self.db.flush()  # Get the program ID
         
-        # Create ProgramConfig
+        # Create ProgramConfig; the weeks are its packed dice, their NL values are decoded when read
+        lifts = battleship_data["lifts"]
+        rolls = {lift: [list(roll) for roll in battleship_data["rolls"][lift][:WEEKS]] for lift in lifts}
         config = ProgramConfig(
             program_id=program.id,
             num_lifts=program_data.num_lifts,
@@ -43,56 +86,212 @@ class ProgramService:
             lift_weights=program_data.lift_weights,
             lift_intensity_rms=program_data.lift_intensity_rms,
             lift_names=program_data.lift_names,
-            weekly_template=battleship_data["template"]
+            template_id=template_id,
+            dice=pack_rolls(rolls, lifts)
         )
         self.db.add(config)
         
-        # Create ProgramWeeks
-        for week_num in range(8):  # 8 weeks for Battleship
-            week_data = battleship_data["weeks"][week_num]
-            
-            # Store dice rolls for each lift
-            week_dice_rolls = {}
-            for lift in battleship_data["lifts"]:
-                roll1, roll2 = battleship_data["rolls"][lift][week_num]
-                week_dice_rolls[lift] = [roll1, roll2]
-            
-            # For backward compatibility, store first lift's rolls in old columns
-            first_lift = battleship_data["lifts"][0]
-            roll1, roll2 = battleship_data["rolls"][first_lift][week_num]
-            
-            program_week = ProgramWeek(
-                program_id=program.id,
-                week_number=week_num + 1,
-                dice_roll_1=roll1,
-                dice_roll_2=roll2,
-                dice_rolls=week_dice_rolls,
-                weekly_data=week_data
-            )
-            self.db.add(program_week)
-        
+        HistoryService(self.db).record(program.id, program.version, "created", {
+            "name": program.name,
+            "status": program.status.value,
+            "rolls": rolls,
+        })
         self.db.commit()
         self.db.refresh(program)
         
         return program
     
-    def get_program(self, program_id: UUID) -> Optional[Program]:
-        """Get a program by ID."""
-        return self.db.query(Program).filter(Program.id == program_id).first()
+    def get_program(self, program_id: UUID, include: Optional[Iterable[str]] = None) -> Optional[Program]:
+        """
+        Get a program by ID.
+
+        With `include` (a subset of PROGRAM_PARTS), the config and archive are
+        loaded up front if any part is included (weeks are decoded from the
+        config's dice), and nothing else is queried.
+        """
+        query = self.db.query(Program).filter(Program.id == program_id)
+        if include is not None and list(include):
+            query = query.options(selectinload(Program.config), selectinload(Program.archive))
+        return query.first()
     
-    def list_programs(self, skip: int = 0, limit: int = 100) -> List[Program]:
-        """List all programs."""
-        return self.db.query(Program).offset(skip).limit(limit).all()
+    def get_program_version(self, program_id: UUID) -> Optional[int]:
+        """A program's current version (primary-key lookup only), or None if it does not exist."""
+        return self.db.execute(select(Program.version).where(Program.id == program_id)).scalar()
+    
+    def get_week(self, program_id: UUID, week_number: int) -> Optional[Dict[str, Any]]:
+        """
+        One week of a program with the config columns needed to lay out its
+        sessions, shaped like a serialized program ({"id", "version", "config",
+        "week"}), or None if the program or week does not exist.
+
+        Reads one programs/program_configs row and decodes only that week from
+        the packed dice; archived programs fall back to their cold-storage copy.
+        """
+        row = self.db.execute(
+            select(
+                Program.version,
+                ProgramConfig.num_lifts,
+                ProgramConfig.dice,
+                ProgramConfig.template_id,
+                ProgramConfig.lift_rms,
+                ProgramConfig.lift_weights,
+                ProgramConfig.lift_intensity_rms,
+                ProgramConfig.lift_names,
+            )
+            .join(ProgramConfig, ProgramConfig.program_id == Program.id)
+            .where(Program.id == program_id)
+        ).mappings().first()
+        
+        if row is not None:
+            lifts = assign_lifts(row["num_lifts"])
+            if not 1 <= week_number <= week_count(row["dice"], lifts):
+                return None
+            dice_rolls = week_rolls(row["dice"], lifts, week_number)
+            week = {"week_number": week_number, "dice_rolls": dice_rolls, "weekly_data": week_nl(dice_rolls)}
+            config = {name: row[name] for name in row.keys() if name not in ("version", "num_lifts", "dice")}
+            config["weekly_template"] = template_structure(self.db, row["template_id"])
+            return {"id": program_id, "version": row["version"], "config": config, "week": week}
+        
+        archive = self.db.get(ProgramArchive, program_id)
+        if archive is None:
+            return None
+        data = unpack_program(archive)
+        week = next((week for week in data["weeks"] if week["week_number"] == week_number), None)
+        if week is None or data["config"] is None:
+            return None
+        return {"id": program_id, "version": archive.program.version, "config": data["config"], "week": week}
+    
+    def list_program_summaries(self, skip: int = 0, limit: int = 100) -> List[ProgramSummary]:
+        """List programs as summaries: one query on programs and program_configs, no weeks or templates."""
+        columns = [getattr(Program, name) for name in ProgramSummary.model_fields if name != "num_lifts"]
+        rows = self.db.execute(
+            select(*columns, ProgramConfig.num_lifts)
+            .outerjoin(ProgramConfig, ProgramConfig.program_id == Program.id)
+            .offset(skip)
+            .limit(limit)
+        ).mappings()
+        return [ProgramSummary.model_validate(row) for row in rows]
+    
+    def to_response(self, program: Program, include: Iterable[str] = PROGRAM_PARTS) -> ProgramResponse:
+        """
+        Serialize a program with the `include`d parts (config, weeks),
+        decompressing them from cold storage if archived. Parts left out keep
+        their defaults and are not loaded.
+        """
+        include = list(include)
+        if len(include) == len(PROGRAM_PARTS) and program.archive is None:
+            return ProgramResponse.model_validate(program)
+        
+        fields = {name: getattr(program, name) for name in ProgramResponse.model_fields if name not in PROGRAM_PARTS}
+        if include:
+            if program.archive is not None:
+                data = unpack_program(program.archive)
+            else:
+                data = {part: getattr(program, part) for part in include}
+            fields.update((part, data[part]) for part in include)
+        return ProgramResponse.model_validate(fields, from_attributes=True)
     
     def delete_program(self, program_id: UUID) -> bool:
-        """Delete a program."""
-        program = self.get_program(program_id)
-        if not program:
-            return False
+        """Delete a program (config and weeks go with it via ON DELETE CASCADE)."""
+        result = self.db.execute(delete(Program).where(Program.id == program_id))
+        self.db.commit()
+        pdf_cache.prune(program_id)
+        if result.rowcount:
+            self._publish(program_id, "program_deleted")
+        return result.rowcount > 0
+    
+    def _bulk_criteria(
+        self,
+        program_ids: Optional[List[UUID]] = None,
+        status: Optional[ProgramStatus] = None,
+        athlete_id: Optional[UUID] = None,
+        created_by: Optional[UUID] = None,
+        coach_id: Optional[UUID] = None,
+        created_before: Optional[datetime] = None
+    ) -> list:
+        """Build the WHERE clauses for a bulk operation, refusing an empty selection."""
+        criteria = []
+        if program_ids is not None:
+            criteria.append(Program.id.in_(program_ids))
+        if status is not None:
+            criteria.append(Program.status == status)
+        if athlete_id is not None:
+            criteria.append(Program.athlete_id == athlete_id)
+        if created_by is not None:
+            criteria.append(Program.created_by == created_by)
+        if coach_id is not None:
+            criteria.append(Program.athlete_id.in_(select(Athlete.id).where(Athlete.coach_id == coach_id)))
+        if created_before is not None:
+            criteria.append(Program.created_at < created_before)
+        
+        if not criteria:
+            raise ValueError("At least one selection criterion is required")
+        return criteria
+    
+    def iter_programs(self, batch_size: int = 50, **criteria) -> Iterator[ProgramResponse]:
+        """
+        Yield the selected programs (oldest first) as responses.
+
+        Ids are resolved up front; programs are then loaded a batch at a time and
+        expunged afterwards, so a large roster never sits in the session at once.
+        """
+        program_ids = self.db.execute(
+            select(Program.id).where(*self._bulk_criteria(**criteria)).order_by(Program.created_at, Program.id)
+        ).scalars().all()
         
-        self.db.delete(program)
+        for start in range(0, len(program_ids), batch_size):
+            batch = program_ids[start:start + batch_size]
+            programs = self.db.execute(
+                select(Program)
+                .where(Program.id.in_(batch))
+                .options(selectinload(Program.config), selectinload(Program.archive))
+            ).scalars().all()
+            by_id = {program.id: program for program in programs}
+            for program_id in batch:
+                # Skip programs deleted since the ids were read
+                if program_id in by_id:
+                    yield self.to_response(by_id[program_id])
+            self.db.expunge_all()
+    
+    def delete_programs(self, **criteria) -> int:
+        """Delete every program matching the criteria in one statement. Returns the number deleted."""
+        statement = delete(Program).where(*self._bulk_criteria(**criteria)).returning(Program.id)
+        program_ids = self.db.execute(statement, execution_options={"synchronize_session": False}).scalars().all()
+        self.db.commit()
+        for program_id in program_ids:
+            pdf_cache.prune(program_id)
+            self._publish(program_id, "program_deleted")
+        return len(program_ids)
+    
+    def archive_programs(self, **criteria) -> int:
+        """Archive every program matching the criteria in one statement. Returns the number archived."""
+        selection = (*self._bulk_criteria(**criteria), Program.status != ProgramStatus.ARCHIVED)
+        # Programs from before the event log need a baseline under their status_changed event
+        HistoryService(self.db).ensure_baselines(*selection)
+        # Selected separately so RETURNING can report each program's previous status for its history
+        previous = (
+            select(Program.id, Program.status)
+            .where(*selection)
+            .with_for_update()
+            .subquery()
+        )
+        statement = (
+            update(Program)
+            .where(Program.id == previous.c.id)
+            .values(status=ProgramStatus.ARCHIVED, version=Program.version + 1)
+            .returning(Program.id, Program.version, previous.c.status)
+        )
+        rows = self.db.execute(statement, execution_options={"synchronize_session": False}).all()
+        self.db.add_all(
+            ProgramEvent(program_id=program_id, version=version, type="status_changed",
+                         data={"from": ProgramStatus(old_status).value, "to": ProgramStatus.ARCHIVED.value})
+            for program_id, version, old_status in rows
+        )
         self.db.commit()
-        return True
+        for program_id, version, _old_status in rows:
+            pdf_cache.prune(program_id, version)
+            self._publish(program_id, "program_updated", version=version, changes={"status": ProgramStatus.ARCHIVED.value})
+        return len(rows)
     
     def update_program(self, program_id: UUID, update_data: Dict[str, Any]) -> Optional[Program]:
         """Update a program's fields (name, status, etc.)."""
@@ -100,22 +299,59 @@ class ProgramService:
         if not program:
             return None
         
+        history = HistoryService(self.db)
+        history.ensure_baseline(program)
+        logged = 0
+        
         # Update allowed fields
-        if 'name' in update_data:
-            program.name = update_data['name']
+        if 'name' in update_data and update_data['name'] != program.name:
+            previous_name, program.name = program.name, update_data['name']
+            logged += 1
+            history.record(program.id, program.version + logged, "renamed", {"from": previous_name, "to": program.name})
         if 'status' in update_data:
             # Convert string to enum if needed
-            if isinstance(update_data['status'], str):
-                program.status = ProgramStatus(update_data['status'])
-            else:
-                program.status = update_data['status']
+            new_status = ProgramStatus(update_data['status'])
+            if new_status != program.status:
+                previous_status = program.status
+                self._set_status(program, new_status)
+                logged += 1
+                history.record(program.id, program.version + logged, "status_changed",
+                               {"from": previous_status.value, "to": new_status.value})
         
+        program.version += max(logged, 1)
         self.db.commit()
         self.db.refresh(program)
+        pdf_cache.prune(program.id, program.version)
+        changes = {name: getattr(program, name) for name in ("name", "status") if name in update_data}
+        self._publish(program.id, "program_updated", version=program.version, changes=changes)
         return program
     
-    def reroll_week(self, program_id: UUID, week_number: int, specific_lift: Optional[str] = None) -> Optional[Program]:
-        """Reroll the dice for a specific week (all lifts or a specific lift) and regenerate that week's data."""
+    def _set_status(self, program: Program, new_status: ProgramStatus) -> None:
+        """Change a program's status; archived programs live in cold storage, any other status brings them back."""
+        program.status = new_status
+        archive_service = ArchiveService(self.db)
+        if new_status == ProgramStatus.ARCHIVED:
+            archive_service.archive_program(program)
+        else:
+            archive_service.restore_program(program)
+    
+    def _set_week_rolls(self, config: ProgramConfig, week_number: int, rolls: Dict[str, List[int]]) -> None:
+        """Store new dice rolls for some lifts of a week (their NL values follow when read)."""
+        config.dice = replace_week_rolls(config.dice, assign_lifts(config.num_lifts), week_number, rolls)
+    
+    def reroll_week(
+        self,
+        program_id: UUID,
+        week_number: int,
+        specific_lift: Optional[str] = None,
+        constraints: Optional[Dict[str, Any]] = None
+    ) -> Optional[Program]:
+        """
+        Reroll the dice for a specific week (all lifts or a specific lift) and regenerate that week's data.
+
+        With constraints, the new rolls are sampled uniformly among those satisfying them
+        (week deltas are checked against both neighbouring weeks). Raises ValueError if none do.
+        """
         program = self.get_program(program_id)
         if not program or not program.config:
             return None
@@ -125,57 +361,137 @@ class ProgramService:
         if not week:
             return None
         
-        from app.programs.battleship import lookup_nl
+        lifts = assign_lifts(program.config.num_lifts)
+        if specific_lift and specific_lift not in lifts:
+            raise ValueError(f"Unknown lift: {specific_lift}")
         
-        lifts = list(program.config.lift_rms.keys())
-        
-        # Initialize dice_rolls if it doesn't exist (for old programs)
-        if week.dice_rolls is None:
-            week.dice_rolls = {}
-            for lift in lifts:
-                week.dice_rolls[lift] = [week.dice_roll_1 or 1, week.dice_roll_2 or 1]
+        history = HistoryService(self.db)
+        history.ensure_baseline(program)
         
         # Determine which lifts to reroll
         lifts_to_reroll = [specific_lift] if specific_lift else lifts
         
+        constrained_rolls = None
+        if constraints:
+            constrained_rolls = self._sample_constrained_rolls(program, week, lifts, lifts_to_reroll, constraints)
+        
         # Generate new dice rolls
+        current_rolls = week.dice_rolls
+        new_rolls = {}
         for lift in lifts_to_reroll:
-            # Get current roll for this lift
-            current_roll = tuple(week.dice_rolls.get(lift, [1, 1]))
-            print(f"Rerolling {lift}: current roll = {current_roll}")
-            
-            # Generate new roll (ensure it's different)
-            # Using 4-sided dice with values [1, 2, 4, 6]
-            DICE_VALUES = [1, 2, 4, 6]
-            new_roll = current_roll
-            while new_roll == current_roll:
-                new_roll = (choice(DICE_VALUES), choice(DICE_VALUES))
-            
-            print(f"Rerolling {lift}: new roll = {new_roll}")
-            
-            # Store new roll
-            week.dice_rolls[lift] = list(new_roll)
-            
-            # Calculate NL values for this lift with new roll
-            if lift not in week.weekly_data:
-                week.weekly_data[lift] = {}
-            
-            for day_intensity in ['H', 'M', 'L']:
-                nl = lookup_nl(new_roll[0], new_roll[1], day_intensity)
-                week.weekly_data[lift][day_intensity] = nl
-        
-        # Update backward compatibility fields with first lift's rolls
-        first_lift = lifts[0]
-        week.dice_roll_1, week.dice_roll_2 = week.dice_rolls[first_lift]
-        
-        # Force SQLAlchemy to detect JSONB changes
-        from sqlalchemy.orm.attributes import flag_modified
-        flag_modified(week, 'dice_rolls')
-        flag_modified(week, 'weekly_data')
+            current_roll = tuple(current_rolls[lift])
+            if constrained_rolls is not None:
+                new_roll = constrained_rolls[lift]
+            else:
+                # Generate new roll (ensure it's different)
+                new_roll = current_roll
+                while new_roll == current_roll:
+                    new_roll = (choice(DICE_VALUES), choice(DICE_VALUES))
+            new_rolls[lift] = list(new_roll)
+        
+        # Logged as old -> new rolls so the change can be audited and undone
+        history.record(program.id, program.version + 1, "week_rerolled", {
+            "week": week_number,
+            "rolls": {lift: [current_rolls[lift], roll] for lift, roll in new_rolls.items()},
+        })
+        self._set_week_rolls(program.config, week_number, new_rolls)
         
+        program.version += 1
         self.db.commit()
         self.db.refresh(program)
+        pdf_cache.prune(program.id, program.version)
+        dice_rolls = week.dice_rolls
+        self._publish(
+            program.id,
+            "week_rerolled",
+            version=program.version,
+            week_number=week_number,
+            dice_rolls=dice_rolls,
+            weekly_data=week_nl(dice_rolls),
+        )
         
-        print(f"After commit - Week {week_number} dice_rolls: {week.dice_rolls}")
+        return program
+    
+    def undo_last_change(self, program_id: UUID) -> Optional[Program]:
+        """
+        Undo the most recent change not already undone (a reroll, rename or
+        status change) by appending its inverse to the history. Repeated calls
+        walk further back. Raises ValueError if there is nothing to undo.
+        """
+        program = self.get_program(program_id)
+        if not program:
+            return None
+        
+        history = HistoryService(self.db)
+        event = history.last_undoable(program_id)
+        if event is None:
+            raise ValueError("Nothing to undo")
         
+        version = program.version + 1
+        if event.type == "week_rerolled":
+            week = next((w for w in program.weeks if w.week_number == event.data["week"]), None)
+            if week is None:
+                raise ValueError("Restore the program from the archive before undoing a reroll")
+            old_rolls = {lift: rolls[0] for lift, rolls in event.data["rolls"].items()}
+            current_rolls = week.dice_rolls
+            history.record(program.id, version, "week_rerolled", {
+                "week": week.week_number,
+                "rolls": {lift: [current_rolls[lift], roll] for lift, roll in old_rolls.items()},
+                "undo_of": event.version,
+            })
+            self._set_week_rolls(program.config, week.week_number, old_rolls)
+            dice_rolls = week.dice_rolls
+            delta = {"week_number": week.week_number, "dice_rolls": dice_rolls, "weekly_data": week_nl(dice_rolls)}
+        elif event.type == "renamed":
+            history.record(program.id, version, "renamed",
+                           {"from": program.name, "to": event.data["from"], "undo_of": event.version})
+            program.name = event.data["from"]
+            delta = {"changes": {"name": program.name}}
+        else:
+            previous_status = program.status
+            self._set_status(program, ProgramStatus(event.data["from"]))
+            history.record(program.id, version, "status_changed",
+                           {"from": previous_status.value, "to": program.status.value, "undo_of": event.version})
+            delta = {"changes": {"status": program.status}}
+        
+        program.version = version
+        self.db.commit()
+        self.db.refresh(program)
+        pdf_cache.prune(program.id, program.version)
+        self._publish(program.id, "week_rerolled" if event.type == "week_rerolled" else "program_updated",
+                      version=program.version, **delta)
         return program
+    
+    def _sample_constrained_rolls(
+        self,
+        program: Program,
+        week: PackedWeek,
+        lifts: List[str],
+        lifts_to_reroll: List[str],
+        constraints: Dict[str, Any]
+    ) -> Dict[str, tuple]:
+        """Sample new rolls for a week's rerolled lifts that satisfy the constraints."""
+        for lift in lifts_to_reroll:
+            if lift not in lifts:
+                raise ValueError(f"Unknown lift: {lift}")
+        
+        neighbours = {w.week_number: w for w in program.weeks}
+        previous_week = neighbours.get(week.week_number - 1)
+        next_week = neighbours.get(week.week_number + 1)
+        
+        current_rolls = {lift: tuple(roll) for lift, roll in week.dice_rolls.items()}
+        new_rolls = sample_week_rolls(
+            lifts,
+            program.config.weekly_template or {"sessions": {}},
+            constraints,
+            previous_rolls={lift: current_rolls[lift] for lift in lifts_to_reroll},
+            fixed_rolls={lift: roll for lift, roll in current_rolls.items() if lift not in lifts_to_reroll},
+            neighbour_totals=(
+                week_total(previous_week.weekly_data) if previous_week else None,
+                week_total(next_week.weekly_data) if next_week else None,
+            )
+        )
+        if new_rolls is None:
+            raise ValueError(f"No dice rolls satisfy the constraints for week {week.week_number}")
+        
+        return new_rolls
@@ -0,0 +1,173 @@
+"""
+Interned weekly templates.
+
+Program configs reference a row of program_templates instead of carrying a
+copy of the template. Interning a template returns the id of the row with the
+same creator, key and content, adding it (as the key's next version) when
+there is none, so each distinct template is stored once however many programs
+use it. Custom keys are per creator; built-in and legacy ones have no creator.
+
+Rows never change, so the per-process caches below cannot go stale: structures
+by id (reads) and ids by (creator, key, content hash) (interning). Only rows read back
+from the database are cached, never ones inserted by a transaction that might
+still roll back.
+"""
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.program_template import ProgramTemplate
+from app.programs.templates import TEMPLATES, template_hash, template_key, validate_template
+
+# Entries only ever leave the caches to bound memory
+TEMPLATE_CACHE_TTL_SECONDS = 24 * 3600
+INTERN_ATTEMPTS = 3
+# Templates from before interning that match no current built-in each get their own key
+LEGACY_KEY_PREFIX = "legacy-"
+
+template_cache = TTLCache(settings.TEMPLATE_CACHE_SIZE, TEMPLATE_CACHE_TTL_SECONDS)
+_interned_ids = TTLCache(settings.TEMPLATE_CACHE_SIZE, TEMPLATE_CACHE_TTL_SECONDS)
+
+
+class TemplateNotFound(ValueError):
+    """No stored template with that id that the caller may use."""
+
+
+def template_structure(db: Optional[Session], template_id: Optional[int]) -> Optional[Dict[str, Any]]:
+    """A template's structure by id: from the cache, else one primary-key read (None without a session)."""
+    if template_id is None:
+        return None
+    structure = template_cache.get(template_id)
+    if structure is None and db is not None:
+        structure = db.execute(select(ProgramTemplate.structure).where(ProgramTemplate.id == template_id)).scalar()
+        if structure is not None:
+            template_cache.set(template_id, structure)
+    return structure
+
+
+def legacy_key(template: Dict[str, Any]) -> str:
+    """Key of a legacy template, from its content (so each is a template of its own, not a version of another)."""
+    return LEGACY_KEY_PREFIX + template_hash(template)[:12]
+
+
+class TemplateService:
+    """Service for storing templates once and looking them up."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def usable_structure(self, template_id: int, user_id: Optional[UUID]) -> Dict[str, Any]:
+        """
+        Structure of a template the user may build programs from: a built-in or
+        one they created. Raises TemplateNotFound for any other id, so other
+        coaches' templates are indistinguishable from missing ones.
+        """
+        row = self.db.execute(
+            select(ProgramTemplate.structure, ProgramTemplate.builtin, ProgramTemplate.created_by)
+            .where(ProgramTemplate.id == template_id)
+        ).first()
+        if row is None or not (row.builtin or (user_id is not None and row.created_by == user_id)):
+            raise TemplateNotFound(f"Unknown template: {template_id}")
+        template_cache.set(template_id, row.structure)
+        return row.structure
+
+    def intern(
+        self,
+        template: Dict[str, Any],
+        key: str,
+        builtin: bool = False,
+        created_by: Optional[UUID] = None
+    ) -> int:
+        """
+        Id of the stored template with this creator, key and content, adding it
+        as the next version of the creator's key if new (in the caller's
+        transaction; a concurrent insert of the same template is picked up
+        instead of failing).
+        """
+        content_hash = template_hash(template)
+        cache_key = (created_by, key, content_hash)
+        template_id = _interned_ids.get(cache_key)
+        if template_id is not None:
+            return template_id
+
+        same_key = (ProgramTemplate.created_by.is_not_distinct_from(created_by), ProgramTemplate.key == key)
+        for _ in range(INTERN_ATTEMPTS):
+            template_id = self.db.execute(
+                select(ProgramTemplate.id).where(*same_key, ProgramTemplate.content_hash == content_hash)
+            ).scalar()
+            if template_id is not None:
+                _interned_ids.set(cache_key, template_id)
+                return template_id
+
+            version = self.db.execute(
+                select(func.coalesce(func.max(ProgramTemplate.version), 0)).where(*same_key)
+            ).scalar() + 1
+            row = ProgramTemplate(
+                key=key,
+                version=version,
+                name=template["name"],
+                num_lifts=template["num_lifts"],
+                sessions_per_week=template["sessions_per_week"],
+                structure=template,
+                content_hash=content_hash,
+                builtin=builtin,
+                created_by=created_by,
+            )
+            try:
+                # A savepoint, so losing the race only undoes this insert
+                with self.db.begin_nested():
+                    self.db.add(row)
+            except IntegrityError:
+                continue
+            return row.id
+        raise RuntimeError(f"Could not store template {key}")
+
+    def intern_any(self, template: Dict[str, Any]) -> int:
+        """Id for a template of unknown origin: the built-in it matches, else a legacy one."""
+        key = template_key(template)
+        if key is None:
+            return self.intern(template, legacy_key(template))
+        return self.intern(template, key, builtin=True)
+
+    def intern_builtins(self) -> Dict[str, int]:
+        """{key: id} of the current built-in templates, storing any that changed since last run."""
+        return {key: self.intern(template, key, builtin=True) for key, template in TEMPLATES.items()}
+
+    def create_custom(self, template: Dict[str, Any], key: str, created_by: UUID) -> ProgramTemplate:
+        """
+        Store a custom template under its creator's key (or return their identical
+        stored one). Raises ValueError if it is invalid.
+        """
+        if key in TEMPLATES:
+            raise ValueError(f"{key} is a built-in template key")
+        validate_template(template)
+        template_id = self.intern(template, key, created_by=created_by)
+        self.db.commit()
+        return self.db.get(ProgramTemplate, template_id)
+
+    def list_templates(self, user_id: Optional[UUID] = None) -> List[ProgramTemplate]:
+        """
+        The latest stored version of the built-in templates and of the user's
+        own, built-ins first (read-only; safe on a replica).
+        """
+        visible = ProgramTemplate.builtin
+        if user_id is not None:
+            visible = visible | (ProgramTemplate.created_by == user_id)
+        latest = (
+            select(ProgramTemplate.created_by, ProgramTemplate.key, func.max(ProgramTemplate.version).label("version"))
+            .where(visible)
+            .group_by(ProgramTemplate.created_by, ProgramTemplate.key)
+            .subquery()
+        )
+        return (
+            self.db.query(ProgramTemplate)
+            .join(latest, ProgramTemplate.created_by.is_not_distinct_from(latest.c.created_by)
+                  & (ProgramTemplate.key == latest.c.key) & (ProgramTemplate.version == latest.c.version))
+            .order_by(ProgramTemplate.builtin.desc(), ProgramTemplate.key)
+            .all()
+        )
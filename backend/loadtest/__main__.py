@@ -0,0 +1,149 @@
+"""
+Load generator CLI.
+
+    python -m loadtest --base-url http://localhost:8000 --users 50 --duration 60 --output run.json
+    python -m loadtest --users 50 --duration 60 --compare run.json
+
+Sets up a pool of coach accounts and seed programs, then runs --users virtual
+users for --duration seconds, each repeatedly picking a scenario by the --mix
+weights. Reports throughput, p50/p95/p99 latency and error rate per endpoint
+as JSON (stdout, or --output), and with --compare prints the change against a
+previous report.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import httpx
+
+from loadtest.scenarios import DEFAULT_MIX, SCENARIOS, Client, World, create_program, sign_up
+from loadtest.stats import Recorder
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}'. Expected one of: {', '.join(SCENARIOS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+async def setup(http: httpx.AsyncClient, world: World, coaches: int, seed_programs: int) -> None:
+    """Create the coach accounts and programs the read/write scenarios work on (not measured)."""
+    client = Client(http, Recorder())
+    accounts = await asyncio.gather(*(sign_up(client, world) for _ in range(coaches)))
+    world.accounts = [account for account in accounts if account is not None]
+    if not world.accounts:
+        raise SystemExit("Setup failed: could not register any coach accounts")
+    await asyncio.gather(*(create_program(client, world) for _ in range(seed_programs)))
+    if not world.program_ids:
+        raise SystemExit("Setup failed: could not create any programs")
+
+
+async def virtual_user(client: Client, world: World, mix: Dict[str, int], deadline: float, delay: float) -> None:
+    await asyncio.sleep(delay)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.perf_counter() < deadline:
+        name = random.choices(names, weights)[0]
+        await SCENARIOS[name](client, world)
+        client.recorder.scenario_done(name)
+
+
+async def run(
+    base_url: str,
+    users: int,
+    duration: float,
+    ramp_up: float,
+    coaches: int,
+    seed_programs: int,
+    mix: Dict[str, int],
+    timeout: float,
+    transport: Optional[httpx.AsyncBaseTransport] = None
+) -> Dict[str, Any]:
+    """Run a load test and return the report (`transport` lets it target an in-process app)."""
+    world = World(uuid.uuid4().hex[:8])
+    limits = httpx.Limits(max_connections=users + coaches, max_keepalive_connections=users + coaches)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits, transport=transport) as http:
+        await setup(http, world, coaches, seed_programs)
+
+        recorder = Recorder()
+        client = Client(http, recorder)
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            virtual_user(client, world, mix, deadline, ramp_up * index / users) for index in range(users)
+        ))
+        recorder.finished = time.perf_counter()
+
+    return recorder.report({
+        "base_url": base_url,
+        "users": users,
+        "duration_seconds": duration,
+        "ramp_up_seconds": ramp_up,
+        "coaches": coaches,
+        "seed_programs": seed_programs,
+        "mix": mix,
+    })
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> str:
+    """Human-readable per-endpoint comparison of two reports."""
+    def change(before: float, after: float) -> str:
+        return f"{(after - before) / before * 100:+.0f}%" if before else "n/a"
+
+    lines = [f"{'endpoint':<48} {'rps':>16} {'p95 ms':>22} {'errors':>14}"]
+    for label, now in current["endpoints"].items():
+        before = baseline["endpoints"].get(label)
+        if before is None:
+            lines.append(f"{label:<48} {'(new)':>16}")
+            continue
+        lines.append(
+            f"{label:<48} "
+            f"{before['throughput_rps']:6.1f}->{now['throughput_rps']:6.1f} {change(before['throughput_rps'], now['throughput_rps']):>3} "
+            f"{before['latency_ms']['p95']:7.1f}->{now['latency_ms']['p95']:7.1f} {change(before['latency_ms']['p95'], now['latency_ms']['p95']):>5} "
+            f"{before['error_rate']:6.1%}->{now['error_rate']:6.1%}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Strength Programs API with realistic traffic.")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="API root (docker-compose default)")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run after setup")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Seconds over which users start")
+    parser.add_argument("--coaches", type=int, default=10, help="Coach accounts created during setup")
+    parser.add_argument("--seed-programs", type=int, default=20, help="Programs created during setup")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Scenario weights, e.g. view=5,reroll=2 (scenarios: " + ", ".join(SCENARIOS) + ")")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(
+        args.base_url, args.users, args.duration, args.ramp_up,
+        args.coaches, args.seed_programs, args.mix, args.timeout
+    ))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            print(compare(json.load(baseline), report), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
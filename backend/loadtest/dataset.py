@@ -0,0 +1,283 @@
+"""
+Synthetic production-scale dataset, bulk-loaded with COPY.
+
+    python -m loadtest.dataset --users 100000 --programs 1000000 --workers 8 --seed 42
+
+The data is split into shards. Each shard is generated and loaded by one worker
+process in a single transaction (COPY into users, athletes, programs and
+program_configs, in FK order), so shards run in parallel without
+touching each other's rows. Every shard derives its RNG state from
+(--seed, shard index), which makes the dataset identical on every run with the
+same arguments, whatever the worker count. Programs come from the real
+Battleship engine.
+
+Shape, mirroring how the app is used:
+- every user has an athlete row (as on registration);
+- --coach-ratio of users are coaches, and most other athletes have a coach in their shard;
+- program counts per athlete are heavy-tailed (log-normal activity);
+- 3/4/6-lift programs are split 30/50/20;
+- statuses follow program age: recent programs are DRAFT or ACTIVE, older ones COMPLETED or ARCHIVED.
+
+Load into a freshly migrated database (or pass --truncate). Emails are
+user<N>@<domain>, so two runs with overlapping ranges conflict.
+"""
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import random
+import string
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+WEEKS = 8
+LIFT_COUNT_WEIGHTS = {3: 30, 4: 50, 6: 20}
+HISTORY_DAYS = 3 * 365
+BLOCK_NAMES = ["Off-Season", "Pre-Season", "In-Season", "Strength", "Hypertrophy", "Peaking", "Base", "Summer"]
+BASE_LOADS = {
+    "squat": 275, "hinge": 315, "hip_hinge": 315, "horz_press": 205, "vert_press": 125,
+    "upper_body_press": 185, "horz_pull": 165, "vert_pull": 45, "upper_body_pull": 155,
+}
+BCRYPT_ALPHABET = "./" + string.ascii_uppercase + string.ascii_lowercase + string.digits
+
+TABLES = {
+    "users": ["id", "email", "hashed_password", "full_name", "role", "created_at"],
+    "athletes": ["id", "user_id", "coach_id", "created_at"],
+    "programs": ["id", "name", "athlete_id", "program_type", "created_by", "start_date", "status", "version", "created_at"],
+    "program_configs": ["id", "program_id", "num_lifts", "lift_rms", "lift_weights", "template_id", "dice", "created_at"],
+}
+
+
+class ShardSpec:
+    """Everything a worker needs to build one shard (picklable)."""
+
+    def __init__(self, index: int, first_user: int, users: int, programs: int, args: argparse.Namespace,
+                 hashed_password: str, now: datetime, template_ids: Dict[str, int]):
+        self.index = index
+        self.first_user = first_user
+        self.users = users
+        self.programs = programs
+        self.seed = args.seed
+        self.coach_ratio = args.coach_ratio
+        self.coached_ratio = args.coached_ratio
+        self.domain = args.email_domain
+        self.hashed_password = hashed_password
+        self.now = now
+        self.template_ids = template_ids
+
+
+def split(total: int, parts: int) -> List[int]:
+    """`total` split into `parts` sizes differing by at most one."""
+    base, extra = divmod(total, parts)
+    return [base + (1 if index < extra else 0) for index in range(parts)]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _json(value) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _lift_weights(rng: random.Random, lifts: List[str]) -> Optional[Dict[str, Dict[str, object]]]:
+    if rng.random() >= 0.6:
+        return None
+    weights = {}
+    for lift in lifts:
+        heavy = round(BASE_LOADS.get(lift, 135) * rng.uniform(0.6, 1.4) / 5) * 5
+        weights[lift] = {"H": heavy, "M": round(heavy * 0.85 / 5) * 5, "L": rng.choice(["Tempo", "Paused", round(heavy * 0.7 / 5) * 5])}
+    return weights
+
+
+def _status(rng: random.Random, age_days: float) -> str:
+    if age_days < 14:
+        return rng.choices(["DRAFT", "ACTIVE"], [3, 7])[0]
+    if age_days < 8 * 7:
+        return rng.choices(["ACTIVE", "DRAFT", "COMPLETED"], [8, 1, 1])[0]
+    return rng.choices(["COMPLETED", "ARCHIVED", "ACTIVE"], [70, 25, 5])[0]
+
+
+def build_shard(spec: ShardSpec) -> Dict[str, io.StringIO]:
+    """Generate one shard's rows as CSV buffers, one per table."""
+    from app.programs.battleship import assign_lifts, generate_battleship_program
+    from app.programs.dice import pack_rolls
+    from app.programs.templates import template_key
+
+    rng = random.Random(f"{spec.seed}:{spec.index}")
+    # The Battleship engine draws from the global RNG; seeding it per shard keeps programs deterministic
+    random.seed(f"{spec.seed}:{spec.index}:engine")
+
+    buffers = {table: io.StringIO() for table in TABLES}
+    writers = {table: csv.writer(buffer, lineterminator="\n") for table, buffer in buffers.items()}
+
+    athletes: List[Tuple[str, str, datetime]] = []  # (athlete_id, program author user_id, joined)
+    coaches: List[str] = []
+    pending_athletes = []
+    for offset in range(spec.users):
+        number = spec.first_user + offset
+        user_id = _uuid(rng)
+        joined = spec.now - timedelta(days=rng.uniform(0, HISTORY_DAYS))
+        is_coach = rng.random() < spec.coach_ratio or offset == 0
+        writers["users"].writerow([
+            user_id, f"user{number}@{spec.domain}", spec.hashed_password,
+            f"Synthetic {'Coach' if is_coach else 'Athlete'} {number}", "COACH" if is_coach else "ATHLETE",
+            joined.isoformat(),
+        ])
+        if is_coach:
+            coaches.append(user_id)
+        pending_athletes.append((user_id, is_coach, joined))
+
+    for user_id, is_coach, joined in pending_athletes:
+        athlete_id = _uuid(rng)
+        coach_id = None if is_coach or rng.random() >= spec.coached_ratio else rng.choice(coaches)
+        writers["athletes"].writerow([athlete_id, user_id, coach_id, joined.isoformat()])
+        athletes.append((athlete_id, coach_id or user_id, joined))
+
+    activity = [rng.lognormvariate(0, 1.0) for _ in athletes]
+    lift_counts = list(LIFT_COUNT_WEIGHTS)
+    lift_weights = list(LIFT_COUNT_WEIGHTS.values())
+    for athlete_id, author_id, joined in rng.choices(athletes, weights=activity, k=spec.programs):
+        program_id = _uuid(rng)
+        created = joined + (spec.now - joined) * rng.random()
+        num_lifts = rng.choices(lift_counts, lift_weights)[0]
+        lifts = assign_lifts(num_lifts)
+        lift_rms = {lift: rng.randint(5, 15) for lift in lifts}
+        generated = generate_battleship_program(num_lifts, lift_rms, sessions_per_week=rng.choice((3, 4)))
+        age_days = (spec.now - created).total_seconds() / 86400
+        created_at = created.isoformat()
+
+        writers["programs"].writerow([
+            program_id, f"{rng.choice(BLOCK_NAMES)} Block {created.year}", athlete_id, "BATTLESHIP", author_id,
+            (created + timedelta(days=rng.randint(0, 14))).date().isoformat(), _status(rng, age_days), 1, created_at,
+        ])
+        weights = _lift_weights(rng, lifts)
+        rolls = {lift: generated["rolls"][lift][:WEEKS] for lift in lifts}
+        writers["program_configs"].writerow([
+            _uuid(rng), program_id, num_lifts, _json(lift_rms), _json(weights) if weights else None,
+            spec.template_ids[template_key(generated["template"])], "\\x" + pack_rolls(rolls, lifts).hex(), created_at,
+        ])
+
+    return buffers
+
+
+_connection = None
+
+
+def _dsn() -> str:
+    from sqlalchemy.engine import make_url
+
+    return make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def _init_worker() -> None:
+    global _connection
+    import psycopg2
+
+    _connection = psycopg2.connect(_dsn())
+    with _connection.cursor() as cursor:
+        # A lost shard is simply regenerated; don't wait on WAL flushes per commit
+        cursor.execute("SET synchronous_commit = off")
+    _connection.commit()
+
+
+def load_shard(spec: ShardSpec) -> Dict[str, int]:
+    """Build a shard and COPY it in one transaction. Returns rows per table."""
+    buffers = build_shard(spec)
+    counts = {}
+    with _connection.cursor() as cursor:
+        for table, columns in TABLES.items():
+            buffer = buffers[table]
+            counts[table] = buffer.getvalue().count("\n")
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    _connection.commit()
+    return counts
+
+
+def _hashed_password(password: str, seed: int) -> str:
+    """bcrypt hash with a seed-derived salt, so the users table is deterministic too."""
+    from passlib.hash import bcrypt
+
+    rng = random.Random(f"{seed}:password")
+    salt = "".join(rng.choice(BCRYPT_ALPHABET) for _ in range(21)) + "."
+    return bcrypt.using(rounds=settings.BCRYPT_ROUNDS, salt=salt).hash(password)
+
+
+def _template_ids() -> Dict[str, int]:
+    """Ids of the built-in templates, which every synthetic config references."""
+    from app.db.base import SessionLocal
+    from app.services.template_service import TemplateService
+
+    db = SessionLocal()
+    try:
+        template_ids = TemplateService(db).intern_builtins()
+        db.commit()
+        return template_ids
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic dataset with COPY.")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--programs", type=int, default=1_000_000)
+    parser.add_argument("--shards", type=int, default=None, help="Default: one per 500 users (at least --workers)")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--coach-ratio", type=float, default=0.05, help="Fraction of users who are coaches")
+    parser.add_argument("--coached-ratio", type=float, default=0.9, help="Fraction of non-coach athletes with a coach")
+    parser.add_argument("--password", default="password", help="Password of every synthetic user")
+    parser.add_argument("--email-domain", default="synthetic.example.com")
+    parser.add_argument("--truncate", action="store_true",
+                        help="Empty users, athletes and all program tables first")
+    args = parser.parse_args()
+
+    shards = args.shards or max(args.workers, args.users // 500, 1)
+    shards = min(shards, args.users)
+    user_sizes = split(args.users, shards)
+    program_sizes = split(args.programs, shards)
+    hashed_password = _hashed_password(args.password, args.seed)
+    # Timestamps are relative to a fixed point so reruns with the same seed match exactly
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    if args.truncate:
+        import psycopg2
+
+        with psycopg2.connect(_dsn()) as connection, connection.cursor() as cursor:
+            cursor.execute("TRUNCATE users, athletes, programs, program_configs, program_archives, jobs CASCADE")
+
+    # Only after any truncate: program_templates references users, so the CASCADE empties it too
+    template_ids = _template_ids()
+    specs = []
+    first_user = 0
+    for index in range(shards):
+        specs.append(ShardSpec(index, first_user, user_sizes[index], program_sizes[index], args, hashed_password, now,
+                               template_ids))
+        first_user += user_sizes[index]
+
+    start = time.perf_counter()
+    totals: Dict[str, int] = {table: 0 for table in TABLES}
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.workers, initializer=_init_worker) as pool:
+        for done, counts in enumerate(pool.imap_unordered(load_shard, specs), start=1):
+            for table, count in counts.items():
+                totals[table] += count
+            rows = sum(totals.values())
+            elapsed = time.perf_counter() - start
+            print(f"[{done}/{shards}] {rows:,} rows in {elapsed:.0f}s ({rows / elapsed * 60:,.0f} rows/min)",
+                  file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": round(elapsed, 1), "rows": totals,
+                      "rows_per_minute": round(sum(totals.values()) / elapsed * 60)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Traffic scenarios for the load generator.
+
+Each scenario is one "visit" by a virtual user, mirroring what the frontend
+does: register/login bursts, program creation with 3/4/6 lifts, polling the
+program view, reroll storms and paging through the program list.
+"""
+import itertools
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app.programs.battleship import assign_lifts
+from loadtest.stats import Recorder
+
+PASSWORD = "loadtest-password"
+MAX_TRACKED_PROGRAMS = 500
+
+
+class Account:
+    def __init__(self, email: str, token: str, user_id: str, athlete_id: Optional[str]):
+        self.email = email
+        self.token = token
+        self.user_id = user_id
+        self.athlete_id = athlete_id
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+class World:
+    """State shared by all virtual users: the coach accounts and programs created so far."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.accounts: List[Account] = []
+        self.program_ids: List[str] = []
+        self._emails = itertools.count()
+
+    def next_email(self) -> str:
+        return f"loadtest+{self.run_id}-{next(self._emails)}@example.com"
+
+    def add_program(self, program_id: str) -> None:
+        self.program_ids.append(program_id)
+        if len(self.program_ids) > MAX_TRACKED_PROGRAMS:
+            del self.program_ids[:len(self.program_ids) - MAX_TRACKED_PROGRAMS]
+
+
+class Client:
+    """Thin wrapper that times every request and records it under an endpoint label."""
+
+    def __init__(self, http: httpx.AsyncClient, recorder: Recorder):
+        self.http = http
+        self.recorder = recorder
+
+    async def request(self, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.http.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(label, time.perf_counter() - start, None)
+            return None
+        self.recorder.record(label, time.perf_counter() - start, response.status_code)
+        return response
+
+
+async def sign_up(client: Client, world: World) -> Optional[Account]:
+    """Register a coach, log in and fetch /me, as the frontend does on first visit."""
+    email = world.next_email()
+    response = await client.request("POST /api/auth/register", "POST", "/api/auth/register", json={
+        "email": email, "password": PASSWORD, "full_name": "Load Test Coach", "role": "coach",
+    })
+    if response is None or response.status_code != 201:
+        return None
+    response = await client.request("POST /api/auth/login", "POST", "/api/auth/login",
+                                    data={"username": email, "password": PASSWORD})
+    if response is None or response.status_code != 200:
+        return None
+    token = response.json()["access_token"]
+    response = await client.request("GET /api/auth/me", "GET", "/api/auth/me",
+                                    headers={"Authorization": f"Bearer {token}"})
+    if response is None or response.status_code != 200:
+        return None
+    me = response.json()
+    return Account(email, token, me["id"], me.get("athlete_id"))
+
+
+def program_body(account: Account, num_lifts: int) -> Dict[str, Any]:
+    lifts = assign_lifts(num_lifts)
+    body: Dict[str, Any] = {
+        "name": f"Load test {num_lifts}-lift block",
+        "athlete_id": account.athlete_id,
+        "created_by": account.user_id,
+        "num_lifts": num_lifts,
+        "lift_rms": {lift: random.randint(6, 15) for lift in lifts},
+    }
+    if random.random() < 0.5:
+        body["lift_weights"] = {lift: {"H": 225, "M": 185, "L": "Tempo"} for lift in lifts}
+    return body
+
+
+async def auth_burst(client: Client, world: World) -> None:
+    account = await sign_up(client, world)
+    if account is not None and random.random() < 0.5:
+        # Returning visit: log in again
+        await client.request("POST /api/auth/login", "POST", "/api/auth/login",
+                             data={"username": account.email, "password": PASSWORD})
+
+
+async def create_program(client: Client, world: World) -> None:
+    account = random.choice(world.accounts)
+    body = program_body(account, random.choice((3, 4, 6)))
+    response = await client.request(f"POST /api/programs ({body['num_lifts']} lifts)", "POST", "/api/programs",
+                                    json=body, headers=account.headers)
+    if response is not None and response.status_code == 201:
+        program_id = response.json()["id"]
+        world.add_program(program_id)
+        await client.request("GET /api/programs/{id}", "GET", f"/api/programs/{program_id}", headers=account.headers)
+
+
+async def view_program(client: Client, world: World) -> None:
+    """An athlete keeps the program view open and it is fetched again and again."""
+    account = random.choice(world.accounts)
+    program_id = random.choice(world.program_ids)
+    for _ in range(random.randint(3, 8)):
+        await client.request("GET /api/programs/{id}", "GET", f"/api/programs/{program_id}", headers=account.headers)
+
+
+async def reroll_storm(client: Client, world: World) -> None:
+    """A coach rerolls a week over and over until they like it."""
+    account = random.choice(world.accounts)
+    program_id = random.choice(world.program_ids)
+    week = random.randint(1, 8)
+    for _ in range(random.randint(3, 10)):
+        await client.request("POST /api/programs/{id}/reroll-week/{week}", "POST",
+                             f"/api/programs/{program_id}/reroll-week/{week}", headers=account.headers)
+
+
+async def browse(client: Client, world: World) -> None:
+    account = random.choice(world.accounts)
+    limit = random.choice((10, 20, 50))
+    for page in range(random.randint(1, 5)):
+        await client.request("GET /api/programs", "GET", "/api/programs",
+                             params={"skip": page * limit, "limit": limit}, headers=account.headers)
+
+
+Scenario = Callable[[Client, World], Awaitable[None]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "auth": auth_burst,
+    "create": create_program,
+    "view": view_program,
+    "reroll": reroll_storm,
+    "browse": browse,
+}
+
+DEFAULT_MIX = {"auth": 1, "create": 2, "view": 5, "reroll": 2, "browse": 2}
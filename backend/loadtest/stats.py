@@ -0,0 +1,76 @@
+"""Per-endpoint latency/error bookkeeping and the JSON report."""
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+
+    def record(self, seconds: float, status: Optional[int]) -> None:
+        self.latencies.append(seconds)
+        key = str(status) if status is not None else "transport_error"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "count": count,
+            "throughput_rps": count / elapsed if elapsed else 0.0,
+            "errors": self.errors,
+            "error_rate": self.errors / count if count else 0.0,
+            "statuses": dict(sorted(self.statuses.items())),
+            "latency_ms": {
+                "mean": sum(latencies) / count * 1000 if count else 0.0,
+                "p50": percentile(latencies, 0.50) * 1000,
+                "p95": percentile(latencies, 0.95) * 1000,
+                "p99": percentile(latencies, 0.99) * 1000,
+                "max": latencies[-1] * 1000 if count else 0.0,
+            },
+        }
+
+
+class Recorder:
+    """Collects results keyed by endpoint label ("GET /api/programs/{id}")."""
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.scenarios: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, label: str, seconds: float, status: Optional[int]) -> None:
+        self.endpoints.setdefault(label, EndpointStats()).record(seconds, status)
+
+    def scenario_done(self, name: str) -> None:
+        self.scenarios[name] = self.scenarios.get(name, 0) + 1
+
+    def report(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        total = EndpointStats()
+        for stats in self.endpoints.values():
+            total.latencies.extend(stats.latencies)
+            total.errors += stats.errors
+            for status, count in stats.statuses.items():
+                total.statuses[status] = total.statuses.get(status, 0) + count
+        return {
+            "config": config,
+            "elapsed_seconds": elapsed,
+            "scenarios": dict(sorted(self.scenarios.items())),
+            "total": total.summary(elapsed),
+            "endpoints": {label: stats.summary(elapsed) for label, stats in sorted(self.endpoints.items())},
+        }
@@ -0,0 +1,43 @@
+import asyncio
+
+from app.core.compression import CompressionMiddleware
+
+
+def run(app, headers=((b"accept-encoding", b"gzip"),)):
+    """Run an ASGI app through the middleware and return the messages it sent."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": list(headers), "extensions": {}}
+    asyncio.run(CompressionMiddleware(app, minimum_size=10)(scope, receive, send))
+    return sent
+
+
+def test_zerocopysend_response_is_passed_through_with_its_start():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/pdf")]})
+        await send({"type": "http.response.zerocopysend", "file": 3, "more_body": False})
+
+    sent = run(app)
+
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.zerocopysend"]
+    assert (b"content-encoding", b"gzip") not in sent[0]["headers"]
+
+
+def test_json_body_is_gzipped():
+    body = b'{"values": [' + b"1, " * 200 + b"1]}"
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    sent = run(app)
+
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.body"]
+    assert (b"content-encoding", b"gzip") in sent[0]["headers"]
+    assert len(sent[1]["body"]) < len(body)
@@ -0,0 +1,110 @@
+import importlib.util
+import random
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.programs import dice
+from app.programs.battleship import DICE_VALUES, assign_lifts
+from app.programs.constraints import OUTCOME_NL
+
+MIGRATION = (Path(__file__).resolve().parents[1] / "alembic" / "versions"
+             / "2026_10_19_1230-c5a81f3d6e27_pack_dice_into_program_configs.py")
+
+
+def random_rolls(lifts, weeks, seed=0):
+    rng = random.Random(seed)
+    return {lift: [[rng.choice(DICE_VALUES), rng.choice(DICE_VALUES)] for _ in range(weeks)] for lift in lifts}
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("pack_dice_migration", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("num_lifts, size", [(3, 12), (4, 16), (6, 24)])
+def test_pack_round_trip(num_lifts, size):
+    lifts = assign_lifts(num_lifts)
+    rolls = random_rolls(lifts, 8)
+
+    data = dice.pack_rolls(rolls, lifts)
+
+    assert len(data) == size
+    assert dice.week_count(data, lifts) == 8
+    assert dice.unpack_rolls(data, lifts) == rolls
+    assert dice.week_rolls(data, lifts, 5) == {lift: rolls[lift][4] for lift in lifts}
+
+
+def test_week_count_ignores_padding():
+    # A 3-lift week is 12 bits, so an odd number of weeks is padded by half a byte
+    lifts = assign_lifts(3)
+    rolls = random_rolls(lifts, 3)
+
+    data = dice.pack_rolls(rolls, lifts)
+
+    assert len(data) == 5
+    assert dice.week_count(data, lifts) == 3
+    assert dice.unpack_rolls(data, lifts) == rolls
+    with pytest.raises(IndexError):
+        dice.week_rolls(data, lifts, 4)
+
+
+def test_pack_rejects_invalid_dice():
+    lifts = assign_lifts(3)
+    rolls = random_rolls(lifts, 1)
+    rolls[lifts[1]][0] = [3, 1]
+
+    with pytest.raises(ValueError):
+        dice.pack_rolls(rolls, lifts)
+
+
+def test_replace_week_rolls_only_changes_the_given_lifts():
+    lifts = assign_lifts(4)
+    rolls = random_rolls(lifts, 8)
+    data = dice.pack_rolls(rolls, lifts)
+    rerolled = [6, 6] if rolls[lifts[2]][2] != [6, 6] else [1, 1]
+
+    replaced = dice.unpack_rolls(dice.replace_week_rolls(data, lifts, 3, {lifts[2]: rerolled}), lifts)
+
+    rolls[lifts[2]][2] = rerolled
+    assert replaced == rolls
+    with pytest.raises(ValueError):
+        dice.replace_week_rolls(data, lifts, 3, {"deadlift": [1, 1]})
+    with pytest.raises(IndexError):
+        dice.replace_week_rolls(data, lifts, 9, {lifts[0]: [1, 1]})
+
+
+def test_packed_week_reads_through_the_config():
+    lifts = assign_lifts(6)
+    rolls = random_rolls(lifts, 8)
+    config = SimpleNamespace(program_id=uuid.uuid4(), num_lifts=6, dice=dice.pack_rolls(rolls, lifts),
+                             created_at=datetime.now(timezone.utc))
+
+    weeks = dice.packed_weeks(config)
+    week = weeks[1].to_dict()
+
+    assert [week.week_number for week in weeks] == list(range(1, 9))
+    assert week["id"] == dice.week_id(config.program_id, 2) == weeks[1].id
+    assert week["dice_rolls"] == {lift: rolls[lift][1] for lift in lifts}
+    assert week["weekly_data"] == {lift: OUTCOME_NL[tuple(rolls[lift][1])] for lift in lifts}
+    assert (week["dice_roll_1"], week["dice_roll_2"]) == tuple(rolls[lifts[0]][1])
+    assert dice.packed_weeks(SimpleNamespace(dice=None)) == []
+
+
+def test_migration_codec_matches_the_app():
+    migration = load_migration()
+
+    assert migration.DICE_VALUES == DICE_VALUES
+    assert migration.WEEK_NAMESPACE == dice.WEEK_NAMESPACE
+    assert migration.LIFTS == {num_lifts: assign_lifts(num_lifts) for num_lifts in (3, 4, 6)}
+    # The migration keeps (H, M, L) tuples, the app {"H": .., "M": .., "L": ..}
+    assert {roll: dict(zip(("H", "M", "L"), nl)) for roll, nl in migration.OUTCOME_NL.items()} == OUTCOME_NL
+    for num_lifts, lifts in migration.LIFTS.items():
+        rolls = random_rolls(lifts, 8, seed=num_lifts)
+        assert migration.pack_rolls(rolls, lifts) == dice.pack_rolls(rolls, lifts)
+        assert migration.unpack_rolls(dice.pack_rolls(rolls, lifts), lifts) == rolls
@@ -0,0 +1,27 @@
+"""
+Building the app must stay lazy: heavy modules and the DB engine are loaded on
+first use, not at import or create_app(). Checked in a fresh interpreter, since
+other tests import these modules into this one. (The startup time itself is
+reported by `python -m app.core.importtime`.)
+"""
+import json
+import os
+import subprocess
+import sys
+
+DEFERRED_MODULES = ("reportlab", "multiprocessing", "app.exports.pdf")
+
+PROBE = (
+    "import json, sys; import app.main; app.main.create_app(); import app.db.base; "
+    f"print(json.dumps({{'loaded': [name for name in {DEFERRED_MODULES!r} if name in sys.modules], "
+    "'engine': app.db.base._engine is not None}))"
+)
+
+
+def test_create_app_defers_heavy_imports_and_the_engine():
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=backend_dir, capture_output=True, text=True, check=True)
+    state = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert state["loaded"] == []
+    assert state["engine"] is False
@@ -0,0 +1,48 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.jobs import runner
+from app.jobs.runner import JobRunner
+from app.models.job import JobStatus
+
+
+def failing_job(job_id):
+    raise RuntimeError("boom")
+
+
+def run_failing_job(monkeypatch, stopping):
+    """Run one failing job (attempt 1 of 3) and return the runner and the job-table updates it made."""
+    updates = []
+    job_runner = JobRunner(workers=1)
+    monkeypatch.setattr(runner, "run_job", failing_job)
+    monkeypatch.setattr(job_runner, "_claim", lambda job_id: (1, 3))
+    monkeypatch.setattr(job_runner, "_finish", lambda job_id, **values: updates.append(values))
+
+    async def run():
+        job_runner._executor = ThreadPoolExecutor(max_workers=1)
+        job_runner._stopping = stopping
+        try:
+            await job_runner._run(uuid.uuid4())
+        finally:
+            job_runner._executor.shutdown()
+            for handle in job_runner._retries.values():
+                handle.cancel()
+
+    asyncio.run(run())
+    return job_runner, updates
+
+
+def test_failed_job_is_retried_with_backoff(monkeypatch):
+    job_runner, updates = run_failing_job(monkeypatch, stopping=False)
+
+    assert [values["status"] for values in updates] == [JobStatus.QUEUED]
+    assert len(job_runner._retries) == 1
+
+
+def test_failed_job_stays_queued_for_the_next_start_while_draining(monkeypatch):
+    job_runner, updates = run_failing_job(monkeypatch, stopping=True)
+
+    assert [values["status"] for values in updates] == [JobStatus.QUEUED]
+    assert "finished_at" not in updates[0]
+    assert job_runner._retries == {}
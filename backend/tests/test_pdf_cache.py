@@ -0,0 +1,58 @@
+import asyncio
+import os
+import time
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.exports import pdf_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def cached(program_id, version, idle_seconds, view="athlete"):
+    path = pdf_cache.cache_path(program_id, version, view)
+    path.write_bytes(b"%PDF")
+    used = time.time() - idle_seconds
+    os.utime(path, (used, used))
+    return path
+
+
+def test_prune_keeps_recently_used_files():
+    program_id = uuid.uuid4()
+    stale = cached(program_id, 1, settings.PDF_CACHE_GRACE_SECONDS + 60)
+    recent = cached(program_id, 2, 1)
+    other = cached(uuid.uuid4(), 1, settings.PDF_CACHE_GRACE_SECONDS + 60)
+
+    pdf_cache.prune(program_id, 3)
+
+    assert not stale.exists()
+    assert recent.exists()
+    assert other.exists()
+
+
+def test_cache_hit_protects_the_file_from_pruning():
+    program_id = uuid.uuid4()
+    path = cached(program_id, 1, settings.PDF_CACHE_GRACE_SECONDS + 60)
+
+    served = asyncio.run(pdf_cache.get_pdf({"id": program_id, "version": 1}, "athlete"))
+    pdf_cache.prune(program_id)
+
+    assert served == path
+    assert path.exists()
+
+
+def test_prune_keeps_the_current_version():
+    program_id = uuid.uuid4()
+    old = cached(program_id, 9, settings.PDF_CACHE_GRACE_SECONDS + 60)
+    current = cached(program_id, 10, settings.PDF_CACHE_GRACE_SECONDS + 60, view="coach")
+
+    pdf_cache.prune(program_id, 10)
+
+    assert not old.exists()
+    assert current.exists()
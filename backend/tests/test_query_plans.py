@@ -0,0 +1,113 @@
+"""
+Query plans of the main lookups against a seeded Postgres.
+
+Set TEST_DATABASE_URL to a Postgres database to run them (otherwise they are
+skipped). They build and seed the tables in a scratch schema inside one
+transaction, which they roll back, so the database is left as it was.
+"""
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+
+from app.db.base import Base
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.models.athlete import Athlete
+from app.models.program import Program, ProgramConfig, ProgramStatus, ProgramType
+from app.models.user import User, UserRole
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SCHEMA = "query_plan_tests"
+
+COACHES = 200
+ATHLETES = 2_000
+PROGRAMS_PER_ATHLETE = 10
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    """A connection whose search_path is a freshly seeded scratch schema, and ids to look up."""
+    engine = create_engine(DATABASE_URL)
+    with engine.connect() as connection:
+        connection.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+        connection.exec_driver_sql(f"SET search_path TO {SCHEMA}")
+        Base.metadata.create_all(connection)
+
+        users = [
+            {"id": uuid.uuid4(), "email": f"user{index}@example.com", "hashed_password": "x",
+             "full_name": f"User {index}", "role": UserRole.COACH if index < COACHES else UserRole.ATHLETE}
+            for index in range(COACHES + ATHLETES)
+        ]
+        coaches, athlete_users = users[:COACHES], users[COACHES:]
+        athletes = [
+            {"id": uuid.uuid4(), "user_id": user["id"], "coach_id": coaches[index % COACHES]["id"]}
+            for index, user in enumerate(athlete_users)
+        ]
+        programs = [
+            {"id": uuid.uuid4(), "name": "Program", "athlete_id": athlete["id"], "created_by": athlete["coach_id"],
+             "program_type": ProgramType.BATTLESHIP,
+             "status": ProgramStatus.ACTIVE if index == 0 else ProgramStatus.COMPLETED}
+            for athlete in athletes
+            for index in range(PROGRAMS_PER_ATHLETE)
+        ]
+        configs = [
+            {"id": uuid.uuid4(), "program_id": program["id"], "num_lifts": 3, "lift_rms": {}, "dice": bytes(12)}
+            for program in programs
+        ]
+        connection.execute(insert(User), users)
+        connection.execute(insert(Athlete), athletes)
+        connection.execute(insert(Program), programs)
+        connection.execute(insert(ProgramConfig), configs)
+        connection.exec_driver_sql("ANALYZE users, athletes, programs, program_configs")
+        # A bitmap scan over the same index is fine too, but plain index scans are simpler to assert on
+        connection.exec_driver_sql("SET enable_bitmapscan = off")
+
+        yield connection, {"user": athlete_users[0]["id"], "coach": coaches[0]["id"],
+                           "athlete": athletes[0]["id"], "program": programs[0]["id"]}
+
+        connection.rollback()
+    engine.dispose()
+
+
+def index_scans(connection, statement):
+    """Names of the indexes the plan reads through an Index Scan or Index Only Scan."""
+    sql = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()[0]["Plan"]
+    found, nodes = set(), [plan]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] in ("Index Scan", "Index Only Scan"):
+            found.add(node["Index Name"])
+        nodes.extend(node.get("Plans", []))
+    return found
+
+
+QUERIES = {
+    # load_principal: a user with their athlete profile
+    "ix_athletes_user_id": lambda ids: (
+        select(User, Athlete.id).outerjoin(Athlete, Athlete.user_id == User.id).where(User.id == ids["user"])
+    ),
+    "ix_athletes_coach_id": lambda ids: select(Athlete).where(Athlete.coach_id == ids["coach"]),
+    "ix_programs_athlete_id": lambda ids: select(Program).where(Program.athlete_id == ids["athlete"]),
+    "ix_programs_created_by": lambda ids: select(Program).where(Program.created_by == ids["coach"]),
+    "ix_programs_athlete_id_active": lambda ids: (
+        select(Program).where(Program.athlete_id == ids["athlete"], Program.status == ProgramStatus.ACTIVE)
+    ),
+    "ix_programs_created_by_active": lambda ids: (
+        select(Program).where(Program.created_by == ids["coach"], Program.status == ProgramStatus.ACTIVE)
+    ),
+    # Loading a program's config (selectinload)
+    "ix_program_configs_program_id": lambda ids: (
+        select(ProgramConfig).where(ProgramConfig.program_id.in_([ids["program"]]))
+    ),
+}
+
+
+@pytest.mark.parametrize("index", sorted(QUERIES))
+def test_query_uses_index(seeded, index):
+    connection, ids = seeded
+
+    assert index in index_scans(connection, QUERIES[index](ids))
@@ -0,0 +1,47 @@
+import asyncio
+
+from app.db import base
+from app.db.base import ReplicaRoutingMiddleware
+
+
+def request(app, method, authorization=b"Bearer writer"):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": method, "path": "/", "headers": [(b"authorization", authorization)],
+             "client": ("127.0.0.1", 1234)}
+    asyncio.run(ReplicaRoutingMiddleware(app)(scope, receive, send))
+
+
+def test_writer_sticks_to_primary_before_its_response_is_sent():
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(base._recent_writers.get(b"Bearer writer"))
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    base._recent_writers.clear()
+    request(app, "POST")
+
+    assert seen == [True]
+
+
+def test_reads_after_a_write_go_to_the_primary():
+    routed = []
+
+    async def app(scope, receive, send):
+        routed.append(base._read_from_primary.get())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    base._recent_writers.clear()
+    request(app, "GET")
+    request(app, "POST")
+    request(app, "GET")
+    request(app, "GET", authorization=b"Bearer someone-else")
+
+    assert routed == [False, False, True, False]
@@ -0,0 +1,41 @@
+import asyncio
+import gc
+
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.01)
+        return object()
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", load) for _ in range(3)))
+
+    results = asyncio.run(main())
+
+    assert results[0] is results[1] is results[2]
+    assert (flights.executions, flights.coalesced) == (1, 2)
+
+
+def test_failure_with_no_caller_left_is_not_reported_as_unretrieved():
+    flights = SingleFlight()
+    reported = []
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("load failed")
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda _loop, context: reported.append(context))
+        caller = asyncio.ensure_future(flights.do("key", fail))
+        await asyncio.sleep(0)
+        caller.cancel()  # The client went away while the load was running
+        await asyncio.sleep(0.05)
+        gc.collect()
+
+    asyncio.run(main())
+
+    assert reported == []
@@ -2,12 +2,12 @@ import { useState, useEffect } from 'react';
 import { useAuth } from '../contexts/AuthContext';
 import { useNavigate } from 'react-router-dom';
 import { programsAPI } from '../services/api';
-import { Program } from '../types';
+import { ProgramSummary } from '../types';
 
 export default function DashboardPage() {
   const { user, logout } = useAuth();
   const navigate = useNavigate();
-  const [programs, setPrograms] = useState<Program[]>([]);
+  const [programs, setPrograms] = useState<ProgramSummary[]>([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -118,7 +118,7 @@ export default function DashboardPage() {
                         <span className="font-medium">Type:</span> {program.program_type}
                       </p>
                       <p>
-                        <span className="font-medium">Lifts:</span> {program.config?.num_lifts || 'N/A'}
+                        <span className="font-medium">Lifts:</span> {program.num_lifts || 'N/A'}
                       </p>
                       <p>
                         <span className="font-medium">Created:</span> {formatDate(program.created_at)}
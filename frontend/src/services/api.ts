@@ -61,6 +61,16 @@ export const programsAPI = {
     return response.data;
   },
 
+  getWeek: async (id: string, weekNumber: number) => {
+    const response = await api.get(`/api/programs/${id}/weeks/${weekNumber}`);
+    return response.data;
+  },
+
+  getSession: async (id: string, weekNumber: number, session: string) => {
+    const response = await api.get(`/api/programs/${id}/weeks/${weekNumber}/sessions/${session}`);
+    return response.data;
+  },
+
   delete: async (id: string) => {
     await api.delete(`/api/programs/${id}`);
   },
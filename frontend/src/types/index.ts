@@ -32,6 +32,20 @@ export interface Program {
   weeks?: ProgramWeek[];
 }
 
+// Row of GET /api/programs (no config or weeks)
+export interface ProgramSummary {
+  id: string;
+  name?: string;
+  athlete_id: string;
+  program_type: string;
+  created_by: string;
+  start_date: string | null;
+  status: 'draft' | 'active' | 'completed' | 'archived';
+  version: number;
+  created_at: string;
+  num_lifts: number | null;
+}
+
 export interface ProgramConfig {
   id: string;
   program_id: string;
@@ -40,7 +54,8 @@ export interface ProgramConfig {
   lift_weights?: Record<string, Record<string, number | string>>;
   lift_intensity_rms?: Record<string, Record<string, number>>;
   lift_names?: Record<string, string>;
-  weekly_template: any;
+  weekly_template: any;  // The referenced template's structure
+  template_id?: number;
   created_at: string;
 }
 